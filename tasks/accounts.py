@@ -0,0 +1,55 @@
+"""
+Read-through cache of users and their profiles.
+
+Every authenticated request needs its User, and most pages read the
+profile too. Both are cached together under the user's id and dropped
+whenever either row is saved or deleted (see signals.py); writes that
+bypass signals, such as QuerySet.update(), are seen once the entry
+expires after USER_CACHE_TIMEOUT seconds.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from .models import UserProfile
+
+
+def user_cache_key(user_id):
+    return f'user:{user_id}'
+
+
+def get_cached_user(user_id):
+    """Return the user with its profile loaded, or None if there is no such user."""
+    try:
+        user_id = User._meta.pk.to_python(user_id)
+    except Exception:
+        return None
+    key = user_cache_key(user_id)
+    user = cache.get(key) if settings.USER_CACHE_TIMEOUT else None
+    if user is None:
+        user = User.objects.select_related('profile').filter(pk=user_id).first()
+        if user is not None and settings.USER_CACHE_TIMEOUT:
+            cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_user(user_id):
+    """Drop a cached user now and again once the current transaction commits."""
+    key = user_cache_key(user_id)
+    cache.delete(key)
+    # A request could cache the old row between now and the commit
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def get_profile(user):
+    """
+    Return the user's profile without writing in the common case.
+    
+    Registration creates the profile with the user; only accounts made
+    elsewhere (createsuperuser, the admin) may still need one.
+    """
+    try:
+        return user.profile
+    except UserProfile.DoesNotExist:
+        profile, created = UserProfile.objects.get_or_create(user=user)
+        return profile
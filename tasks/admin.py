@@ -1,10 +1,15 @@
 """
 Admin configuration for tasks application.
 """
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
-from .models import Task, UserProfile
+from django.db.models import BooleanField, Case, F, Q, Value, When
+from django.utils import timezone
+from .deletion import BATCHED_MODELS, request_account_deletion
+from .models import ArchivedTask, Task, TaskSeries, UserProfile
+from .pagination import EstimatedCountPaginator
 
 
 class UserProfileInline(admin.StackedInline):
@@ -16,15 +21,69 @@ class UserProfileInline(admin.StackedInline):
 
 
 class UserAdmin(BaseUserAdmin):
-    """Extended user admin."""
+    """
+    Extended user admin.
+    
+    Deleting users deactivates them and leaves the deletion of their tasks
+    to tasks.deletion, in batches and in the background.
+    """
     inlines = (UserProfileInline,)
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'date_joined')
     list_filter = ('is_staff', 'is_superuser', 'is_active', 'date_joined')
+    
+    def get_deleted_objects(self, objs, request):
+        # Counts instead of the collector, which would load every task of
+        # every account just to list them on the confirmation page
+        users = list(objs)
+        user_ids = [user.pk for user in users]
+        model_count = {User._meta.verbose_name_plural: len(users)}
+        perms_needed = set()
+        for model in BATCHED_MODELS:
+            count = model.objects.filter(user_id__in=user_ids).count()
+            if not count:
+                continue
+            opts = model._meta
+            model_count[opts.verbose_name_plural] = count
+            if self.admin_site.is_registered(model) and not request.user.has_perm(
+                f'{opts.app_label}.delete_{opts.model_name}'
+            ):
+                perms_needed.add(opts.verbose_name)
+        deleted_objects = [f'{User._meta.verbose_name.capitalize()}: {user}' for user in users]
+        return deleted_objects, model_count, perms_needed, []
+    
+    def delete_model(self, request, obj):
+        request_account_deletion(obj)
+        self.notify_background_deletion(request)
+    
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            request_account_deletion(user)
+        self.notify_background_deletion(request)
+    
+    def notify_background_deletion(self, request):
+        self.message_user(
+            request,
+            'Deleted accounts are deactivated now; their tasks are removed in the background.',
+            messages.INFO,
+        )
+
+
+class TaskChangeList(ChangeList):
+    """Change list that leaves descriptions unloaded; no column shows them."""
+    
+    def get_queryset(self, request, exclude_parameters=None):
+        return super().get_queryset(request, exclude_parameters).defer('description')
 
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
-    """Admin configuration for Task model."""
+    """
+    Admin configuration for Task model.
+    
+    The changelist has to stay fast with millions of tasks: owners are
+    joined in, overdue is computed by the database, the default ordering
+    walks the primary key and the unfiltered total is an estimate.
+    """
     
     list_display = (
         'title',
@@ -33,12 +92,18 @@ class TaskAdmin(admin.ModelAdmin):
         'status',
         'due_date',
         'created_at',
-        'is_overdue'
+        'overdue'
     )
     list_filter = ('status', 'priority', 'created_at', 'due_date')
+    list_select_related = ('user',)
     search_fields = ('title', 'description', 'user__username')
     readonly_fields = ('created_at', 'updated_at', 'completed_at')
-    date_hierarchy = 'created_at'
+    # Newest first, like Meta.ordering, but served by the primary key; an
+    # ORDER BY created_at over every user's tasks would sort the whole table
+    ordering = ('-pk',)
+    # No date_hierarchy: its drill-down runs a DISTINCT over every date
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('Basic Information', {
@@ -55,15 +120,38 @@ class TaskAdmin(admin.ModelAdmin):
     
     actions = ['mark_as_completed', 'mark_as_pending', 'set_high_priority']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            overdue_flag=Case(
+                When(Q(due_date__lt=timezone.now().date()) & ~Q(status='completed'), then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            )
+        )
+    
+    def get_changelist(self, request, **kwargs):
+        return TaskChangeList
+    
+    @admin.display(boolean=True, description='Is overdue', ordering='overdue_flag')
+    def overdue(self, obj):
+        return obj.overdue_flag
+    
     def mark_as_completed(self, request, queryset):
         """Bulk action to mark tasks as completed."""
-        updated = queryset.update(status='completed')
+        # Tasks that were already completed keep their completion time
+        updated = queryset.update(
+            status='completed',
+            completed_at=Case(
+                When(status='completed', completed_at__isnull=False, then=F('completed_at')),
+                default=Value(timezone.now()),
+            ),
+        )
         self.message_user(request, f'{updated} task(s) marked as completed.')
     mark_as_completed.short_description = "Mark selected tasks as completed"
     
     def mark_as_pending(self, request, queryset):
         """Bulk action to mark tasks as pending."""
-        updated = queryset.update(status='pending')
+        updated = queryset.update(status='pending', completed_at=None)
         self.message_user(request, f'{updated} task(s) marked as pending.')
     mark_as_pending.short_description = "Mark selected tasks as pending"
     
@@ -74,11 +162,56 @@ class TaskAdmin(admin.ModelAdmin):
     set_high_priority.short_description = "Set high priority for selected tasks"
 
 
+@admin.register(TaskSeries)
+class TaskSeriesAdmin(admin.ModelAdmin):
+    """Admin configuration for recurring task series."""
+    
+    list_display = ('title', 'user', 'priority', 'rule', 'start_date', 'created_at')
+    list_filter = ('priority', 'start_date')
+    list_select_related = ('user',)
+    search_fields = ('title', 'description', 'user__username')
+    # The rule is fixed: stored and virtual occurrences depend on it
+    readonly_fields = ('rule', 'start_date', 'created_at', 'updated_at')
+    
+    def get_readonly_fields(self, request, obj=None):
+        return self.readonly_fields if obj is not None else ('created_at', 'updated_at')
+
+
+@admin.register(ArchivedTask)
+class ArchivedTaskAdmin(admin.ModelAdmin):
+    """
+    Read-only admin for archived tasks.
+    
+    Rows are only written by tasks.archive, which keeps TaskStats in step.
+    """
+    
+    list_display = ('title', 'user', 'priority', 'completed_at', 'archived_at')
+    list_filter = ('priority', 'archived_at')
+    list_select_related = ('user',)
+    search_fields = ('title', 'description', 'user__username')
+    ordering = ('-pk',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def get_changelist(self, request, **kwargs):
+        return TaskChangeList
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     """Admin configuration for UserProfile model."""
     
     list_display = ('user', 'phone_number', 'birth_date', 'created_at')
+    list_select_related = ('user',)
     search_fields = ('user__username', 'user__email', 'phone_number')
     readonly_fields = ('created_at', 'updated_at')
 
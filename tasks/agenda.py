@@ -0,0 +1,201 @@
+"""
+The task calendar: a month or week of tasks, by due date.
+
+A calendar range is read with a fixed number of queries whatever its size:
+
+* per-day counts by status and priority come from one GROUP BY due_date,
+* the tasks themselves from one range scan of the (user, due_date, id)
+  index; month grids show the first DAY_LIMIT tasks of a day, picked by a
+  window function in the same query, and link to the week for the rest,
+* the user's recurring series, whose virtual occurrences are expanded for
+  the range (see tasks.series).
+
+The counts and series also make up the range's ETag, so revalidating a
+month costs two small queries and is unaffected by changes elsewhere.
+"""
+import calendar
+import hashlib
+from datetime import date, timedelta
+from django.conf import settings
+from django.db.models import Count, F, Max, Q
+from django.db.models.functions import RowNumber
+from django.db.models.expressions import Window
+from .models import Task, TaskSeries
+from .series import occurrences
+
+
+# Tasks listed per day in the month grid
+DAY_LIMIT = 3
+
+STATUS_COUNTS = ('pending', 'in_progress', 'completed')
+PRIORITY_COUNTS = ('low', 'medium', 'high')
+
+
+class InvalidRange(ValueError):
+    """A month or week parameter that is not a valid date."""
+
+
+class CalendarDay:
+    """The tasks, occurrences and counts of one day of a calendar range."""
+    
+    def __init__(self, day, today):
+        self.date = day
+        self.is_today = day == today
+        self.is_past = day < today
+        self.counts = dict.fromkeys(('total', *STATUS_COUNTS, *PRIORITY_COUNTS), 0)
+        self.tasks = []
+        self.occurrences = []
+    
+    @property
+    def overdue(self):
+        if not self.is_past:
+            return 0
+        return self.counts['total'] - self.counts['completed']
+    
+    @property
+    def more(self):
+        """Tasks of the day that were left out of the listing."""
+        return self.counts['total'] - len(self.tasks) - len(self.occurrences)
+    
+    def add_counts(self, counts):
+        for name, value in counts.items():
+            self.counts[name] += value
+
+
+class CalendarRange:
+    """
+    A month grid (whole weeks around the month) or a single week.
+    
+    Built from the ``month`` (YYYY-MM) or ``week`` (any date of the week,
+    YYYY-MM-DD) query parameter; the current month by default.
+    """
+    
+    def __init__(self, kind, first, last, month=None):
+        self.kind = kind
+        self.first = first
+        self.last = last
+        self.month = month
+    
+    @classmethod
+    def from_params(cls, params, today):
+        try:
+            if params.get('week'):
+                return cls.week(date.fromisoformat(params['week']))
+            if params.get('month'):
+                year, month = map(int, params['month'].split('-'))
+                return cls.month_grid(date(year, month, 1))
+        except ValueError:
+            raise InvalidRange('Expected month=YYYY-MM or week=YYYY-MM-DD.') from None
+        return cls.month_grid(today.replace(day=1))
+    
+    @classmethod
+    def week(cls, day):
+        first = day - timedelta(days=day.weekday())
+        return cls('week', first, first + timedelta(days=6))
+    
+    @classmethod
+    def month_grid(cls, month):
+        length = calendar.monthrange(month.year, month.month)[1]
+        first = month - timedelta(days=month.weekday())
+        end = month.replace(day=length)
+        return cls('month', first, end + timedelta(days=6 - end.weekday()), month)
+    
+    @property
+    def days(self):
+        return [self.first + timedelta(days=offset) for offset in range((self.last - self.first).days + 1)]
+    
+    @property
+    def param(self):
+        """The query string that selects this range."""
+        if self.kind == 'week':
+            return f'week={self.first.isoformat()}'
+        return f'month={self.month:%Y-%m}'
+    
+    @property
+    def previous(self):
+        if self.kind == 'week':
+            return CalendarRange.week(self.first - timedelta(days=7))
+        return CalendarRange.month_grid((self.month - timedelta(days=1)).replace(day=1))
+    
+    @property
+    def next(self):
+        if self.kind == 'week':
+            return CalendarRange.week(self.first + timedelta(days=7))
+        return CalendarRange.month_grid(self.month + timedelta(days=calendar.monthrange(self.month.year, self.month.month)[1]))
+    
+    @property
+    def per_day(self):
+        return DAY_LIMIT if self.kind == 'month' else None
+
+
+def day_counts(user, first, last):
+    """
+    Per-day task counts by status and priority, in one GROUP BY query.
+    
+    Each row also has the day's latest updated_at, which the ETag uses.
+    """
+    aggregates = {
+        'total': Count('id'),
+        **{status: Count('id', filter=Q(status=status)) for status in STATUS_COUNTS},
+        **{priority: Count('id', filter=Q(priority=priority)) for priority in PRIORITY_COUNTS},
+        'updated': Max('updated_at'),
+    }
+    rows = (
+        Task.objects.filter(user=user, due_date__range=(first, last))
+        .order_by()
+        .values('due_date')
+        .annotate(**aggregates)
+    )
+    return {row.pop('due_date'): row for row in rows}
+
+
+def range_tasks(user, first, last, per_day=None):
+    """
+    The tasks due within [first, last], in one range query.
+    
+    With per_day, only the first per_day tasks of each day (highest
+    priority first) are returned.
+    """
+    queryset = (
+        Task.objects.filter(user=user, due_date__range=(first, last))
+        .only('id', 'title', 'status', 'priority', 'due_date', 'series_id', 'occurrence_date')
+    )
+    if per_day is None:
+        return queryset.order_by('due_date', 'id')
+    return queryset.annotate(
+        day_rank=Window(RowNumber(), partition_by=F('due_date'), order_by=[F('priority_rank').desc(), F('id')])
+    ).filter(day_rank__lte=per_day).order_by('due_date', '-priority_rank', 'id')
+
+
+def user_series(user):
+    """The user's recurring series, as needed for the calendar."""
+    return list(TaskSeries.objects.filter(user=user).defer('description').order_by('pk'))
+
+
+def calendar_etag(calendar_range, counts, series_list, today, extra=''):
+    """A validator that changes when anything shown for the range does."""
+    parts = [calendar_range.first.isoformat(), calendar_range.last.isoformat(), today.isoformat(), extra]
+    for day in sorted(counts):
+        row = counts[day]
+        parts.append(f'{day}:' + ','.join(str(row[name]) for name in sorted(row)))
+    for series in series_list:
+        parts.append(f's{series.pk}:{series.updated_at.isoformat()}')
+    digest = hashlib.sha256('|'.join(parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def build_days(calendar_range, counts, tasks, series_list, today):
+    """The CalendarDay of every date of the range, in order."""
+    days = {day: CalendarDay(day, today) for day in calendar_range.days}
+    for day, row in counts.items():
+        days[day].add_counts({name: value for name, value in row.items() if name != 'updated'})
+    for task in tasks:
+        days[task.due_date].tasks.append(task)
+    
+    # Occurrences older than the lookback window count as missed
+    first = max(calendar_range.first, today - timedelta(days=settings.TASK_RECURRENCE_LOOKBACK_DAYS))
+    for occurrence in occurrences(series_list, first, calendar_range.last):
+        day = days[occurrence.occurrence_date]
+        day.occurrences.append(occurrence)
+        day.add_counts({'total': 1, 'pending': 1, occurrence.priority: 1})
+    return list(days.values())
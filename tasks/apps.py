@@ -1,7 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class TasksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tasks'
     verbose_name = 'Task Management'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
+        if settings.TASK_METRICS:
+            from . import metrics
+            metrics.install()
@@ -0,0 +1,135 @@
+"""
+Moving old completed tasks out of the task table.
+
+Tasks completed more than TASK_ARCHIVE_DAYS ago are copied to ArchivedTask
+and deleted from Task in batches. Each batch is one transaction that also
+moves the tasks from their owners' counters to ``archived_count``. An
+interrupted run therefore leaves every task in exactly one of the two
+tables, and the next run picks up where it stopped.
+
+The task list, search, counters and sync API only read the task table;
+the archive is read by its own view when a user asks for it. Archived
+tasks keep their ids and are not tombstoned: sync clients may keep their
+copies, which no longer change.
+"""
+from datetime import timedelta
+from django.db import router, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .events import publish_task_event
+from .models import ArchivedTask, Task, TaskStats
+from .search import icontains_search
+from .series import skip_occurrences
+
+
+ARCHIVE_FIELDS = (
+    'id',
+    'user_id',
+    'title',
+    'description',
+    'excerpt',
+    'priority',
+    'status',
+    'due_date',
+    'created_at',
+    'updated_at',
+    'completed_at',
+)
+
+ARCHIVE_BATCH_SIZE = 1000
+
+
+def archivable(before):
+    """Completed tasks finished before the given time."""
+    # Tasks imported without a completion time count from their last update
+    return Q(status='completed') & (
+        Q(completed_at__lt=before) |
+        Q(completed_at__isnull=True, updated_at__lt=before)
+    )
+
+
+def archivable_tasks(days, user_ids=None):
+    """Tasks completed more than days ago, optionally only for some users."""
+    queryset = Task.objects.filter(archivable(timezone.now() - timedelta(days=days)))
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    return queryset
+
+
+def archive_batch(queryset, batch_size):
+    """
+    Move the first batch_size tasks of queryset to the archive.
+    
+    Returns the moved ids, in ascending order.
+    """
+    using = router.db_for_write(Task)
+    now = timezone.now()
+    with transaction.atomic(using=using):
+        # Locked so that a task reopened meanwhile is not archived
+        rows = list(
+            queryset.using(using).select_for_update().order_by('pk')
+            .values(*ARCHIVE_FIELDS, 'series_id', 'occurrence_date')[:batch_size]
+        )
+        if not rows:
+            return []
+        ids = [row['id'] for row in rows]
+        occurrences = {}
+        for row in rows:
+            series_id, day = row.pop('series_id'), row.pop('occurrence_date')
+            if series_id is not None:
+                occurrences.setdefault(series_id, []).append(day)
+        ArchivedTask.objects.using(using).bulk_create(ArchivedTask(archived_at=now, **row) for row in rows)
+        # A plain DELETE: the per-task delete signals would write tombstones
+        # and one counter update per task
+        Task.objects.filter(pk__in=ids)._raw_delete(using)
+        # Archived occurrences of recurring tasks stay done
+        for series_id, days in occurrences.items():
+            skip_occurrences(series_id, days)
+        
+        today = now.date()
+        for user_id, deltas in archive_deltas(rows).items():
+            TaskStats.objects.update_counters(user_id, deltas, today)
+            publish_task_event(user_id, 'refresh')
+    return ids
+
+
+def archive_deltas(rows):
+    """Counter changes for moving the given completed task rows to the archive."""
+    deltas = {}
+    for row in rows:
+        user_deltas = deltas.setdefault(row['user_id'], {
+            **dict.fromkeys(TaskStats.COUNTER_FIELDS, 0),
+            'archived_count': 0,
+        })
+        user_deltas['total_count'] -= 1
+        user_deltas['completed_count'] -= 1
+        user_deltas['high_priority_count'] -= row['priority'] == 'high'
+        user_deltas['archived_count'] += 1
+    return deltas
+
+
+def archive_tasks(days, batch_size=ARCHIVE_BATCH_SIZE, user_ids=None, limit=None):
+    """
+    Archive tasks completed more than days ago, a batch at a time.
+    
+    Yields the number of tasks moved by each batch; stops after limit
+    tasks, if given.
+    """
+    queryset = archivable_tasks(days, user_ids)
+    moved, last_id = 0, 0
+    while limit is None or moved < limit:
+        size = batch_size if limit is None else min(batch_size, limit - moved)
+        # Everything up to last_id has been moved or was not archivable
+        ids = archive_batch(queryset.filter(pk__gt=last_id), size)
+        if not ids:
+            return
+        moved += len(ids)
+        last_id = ids[-1]
+        yield len(ids)
+
+
+def search_archive(queryset, query):
+    """Filter archived tasks by a search query."""
+    # The full-text index only covers the task table; a user's archive is
+    # read through its (user, completed_at) index and scanned
+    return icontains_search(queryset, query)
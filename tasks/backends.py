@@ -0,0 +1,13 @@
+"""
+Authentication backends for the tasks application.
+"""
+from django.contrib.auth.backends import ModelBackend
+from .accounts import get_cached_user
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend that loads the session's user from the user cache."""
+    
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
@@ -0,0 +1,125 @@
+"""
+Deleting user accounts in the background, a batch of rows at a time.
+
+Deleting a User directly makes Django's collector load every task of the
+account into memory and delete them, with a counter update, tombstone and
+event each, in one long write transaction. Instead:
+
+* request_account_deletion() deactivates the account at once, which logs
+  it out everywhere, and records an AccountDeletion.
+* delete_account() then removes the user's tasks, archived tasks and
+  tombstones DELETION_BATCH_SIZE rows at a time, each batch in its own
+  short transaction. The plain DELETEs skip the per-task signals: the
+  counters, tombstones and events they maintain all belong to the account
+  being deleted. Last, the user is deleted with the few rows that remain,
+  the AccountDeletion among them.
+
+The work runs in a background thread once the request commits. A run cut
+short by a restart leaves its AccountDeletion behind, and
+``manage.py delete_accounts`` finishes it.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, router, transaction
+from .models import AccountDeletion, ArchivedTask, Task, TaskTombstone
+
+
+logger = logging.getLogger('tasks.deletion')
+
+DELETION_BATCH_SIZE = 1000
+
+# Models with a row per task, emptied in batches before the user goes
+BATCHED_MODELS = (Task, ArchivedTask, TaskTombstone)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide deletion thread pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ACCOUNT_DELETION_WORKERS,
+                thread_name_prefix='account-deletion',
+            )
+        return _executor
+
+
+def request_account_deletion(user, schedule=True):
+    """
+    Deactivate a user now and delete the account in the background.
+    
+    With schedule=False the deletion is only recorded, for the caller to
+    run with delete_account().
+    """
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        AccountDeletion.objects.get_or_create(user=user)
+    if schedule:
+        user_id = user.pk
+        transaction.on_commit(lambda: schedule_account_deletion(user_id))
+
+
+def schedule_account_deletion(user_id):
+    """Delete an account in the pool, or inline without workers."""
+    if settings.ACCOUNT_DELETION_WORKERS <= 0:
+        delete_account(user_id)
+    else:
+        get_executor().submit(_run_in_worker, user_id)
+
+
+def _run_in_worker(user_id):
+    try:
+        delete_account(user_id)
+    except Exception:
+        logger.exception('Could not delete user %s; `manage.py delete_accounts` will retry', user_id)
+    finally:
+        # Pool threads outlive requests, so nothing else closes their connections
+        connections.close_all()
+
+
+def delete_account(user_id, batch_size=DELETION_BATCH_SIZE):
+    """
+    Delete a user whose deletion was requested, and everything they own.
+    
+    Returns the number of task, archived task and tombstone rows deleted,
+    or None if no deletion of the user is pending.
+    """
+    if not AccountDeletion.objects.filter(user_id=user_id).exists():
+        return None
+    using = router.db_for_write(User)
+    deleted = 0
+    for model in BATCHED_MODELS:
+        while True:
+            count = delete_batch(model, user_id, batch_size, using)
+            if not count:
+                break
+            deleted += count
+    
+    with transaction.atomic(using=using):
+        user = User.objects.using(using).filter(pk=user_id).first()
+        if user is not None:
+            user.delete()
+    return deleted
+
+
+def delete_batch(model, user_id, batch_size, using):
+    """Delete up to batch_size of the user's rows of model; returns how many."""
+    with transaction.atomic(using=using):
+        ids = list(
+            model.objects.using(using).filter(user_id=user_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if ids:
+            model.objects.using(using).filter(pk__in=ids)._raw_delete(using)
+    return len(ids)
+
+
+def pending_deletions():
+    """The ids of users whose deletion was requested, oldest request first."""
+    return list(AccountDeletion.objects.order_by('requested_at').values_list('user_id', flat=True))
@@ -0,0 +1,190 @@
+"""
+Live task events for the user's open task pages.
+
+Task writes publish a small event (a type and the task id) for the task's
+owner once their transaction commits:
+
+* ``created``, ``updated`` and ``deleted`` from saving and deleting tasks,
+* ``toggled`` from ``Task.objects.toggle_status()``, which bypasses save(),
+* ``refresh`` from bulk writes (``update()``, ``bulk_create()``, the
+  archive), after which the page reloads instead of patching cards.
+
+TaskEventStreamView subscribes each open page to a broker and turns the
+events into server-sent events. The broker is chosen by
+``TASK_EVENTS_BROKER``:
+
+* ``local``: in-process fan-out. Only streams served by the worker that
+  made the write see it, so it suits a single ASGI worker.
+* ``redis``: writes are published to Redis and every worker relays them to
+  its own streams, for several workers or hosts (needs the redis package).
+* a dotted path to another broker class.
+"""
+import asyncio
+import json
+import logging
+import threading
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger('tasks.events')
+
+BROKERS = {
+    'local': 'tasks.events.LocalBroker',
+    'redis': 'tasks.events.RedisBroker',
+}
+
+CHANNEL_PREFIX = 'task_events'
+
+# Events buffered for a stream that is not being read; past this the
+# client is told to reload instead
+QUEUE_SIZE = 100
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the process-wide broker, creating it on first use."""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            name = settings.TASK_EVENTS_BROKER
+            _broker = import_string(BROKERS.get(name, name))()
+        return _broker
+
+
+def publish_task_event(user_id, event_type, task_id=None):
+    """Publish an event to the user's open pages once the current transaction commits."""
+    event = {'type': event_type}
+    if task_id is not None:
+        event['id'] = task_id
+    # A broker that is down must not fail the write; robust callbacks log
+    transaction.on_commit(lambda: get_broker().publish(user_id, event), robust=True)
+
+
+class Subscription:
+    """The events of one user for one stream, read on the stream's event loop."""
+    
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+    
+    def put(self, event):
+        """Queue an event; called on the subscription's loop."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The page has fallen behind, so it reloads instead
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({'type': 'refresh'})
+    
+    async def get(self, timeout):
+        """Wait up to timeout seconds for the next event (asyncio.TimeoutError otherwise)."""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+    
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """Fan events out to the streams open in this process."""
+    
+    def __init__(self):
+        self.subscriptions = {}
+        self.lock = threading.Lock()
+    
+    def subscribe(self, user_id):
+        """Start receiving the user's events; call from the stream's event loop."""
+        subscription = Subscription(self, user_id)
+        with self.lock:
+            self.subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscriptions.pop(subscription.user_id, None)
+    
+    def publish(self, user_id, event):
+        """Send an event to the user's streams; callable from any thread."""
+        self.deliver(user_id, event)
+    
+    def deliver(self, user_id, event):
+        """Hand an event to the user's streams in this process."""
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The loop has shut down without closing the stream
+                self.unsubscribe(subscription)
+
+
+class RedisBroker(LocalBroker):
+    """
+    Relay events between worker processes through Redis pub/sub.
+    
+    Writes publish to the owner's channel. Each process runs one listener,
+    started on its event loop by the first stream, that hands the events of
+    every channel to its local streams.
+    """
+    
+    # Seconds to wait before resubscribing after losing the connection
+    RECONNECT_DELAY = 1.0
+    
+    def __init__(self):
+        super().__init__()
+        import redis
+        self.url = settings.TASK_EVENTS_REDIS_URL
+        self.client = redis.Redis.from_url(self.url)
+        self.listener = None
+    
+    def subscribe(self, user_id):
+        subscription = super().subscribe(user_id)
+        with self.lock:
+            if self.listener is None or self.listener.done():
+                self.listener = subscription.loop.create_task(self.listen())
+        return subscription
+    
+    def publish(self, user_id, event):
+        self.client.publish(f'{CHANNEL_PREFIX}:{user_id}', json.dumps(event))
+    
+    async def listen(self):
+        import redis.asyncio
+        reconnected = False
+        while True:
+            try:
+                client = redis.asyncio.Redis.from_url(self.url)
+                async with client.pubsub() as pubsub:
+                    await pubsub.psubscribe(f'{CHANNEL_PREFIX}:*')
+                    if reconnected:
+                        # Events published while disconnected are lost
+                        self.refresh_all()
+                    async for message in pubsub.listen():
+                        if message['type'] != 'pmessage':
+                            continue
+                        user_id = int(message['channel'].rsplit(b':', 1)[1])
+                        self.deliver(user_id, json.loads(message['data']))
+            except (redis.RedisError, OSError):
+                logger.warning('Lost the task events subscription, reconnecting', exc_info=True)
+                reconnected = True
+                await asyncio.sleep(self.RECONNECT_DELAY)
+    
+    def refresh_all(self):
+        with self.lock:
+            user_ids = list(self.subscriptions)
+        for user_id in user_ids:
+            self.deliver(user_id, {'type': 'refresh'})
+
+
+def format_event(event_type, data):
+    """Encode an event in the text/event-stream format."""
+    return f'event: {event_type}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
@@ -5,6 +5,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from .models import Task, UserProfile
+from .recurrence import MAX_RULE_LENGTH, PRESETS, InvalidRule, parse_rule
 
 
 class TaskForm(forms.ModelForm):
@@ -46,6 +47,78 @@ class TaskForm(forms.ModelForm):
         self.fields['due_date'].label = 'Due Date'
 
 
+class TaskCreateForm(TaskForm):
+    """
+    Task form that can also create a recurring task.
+    
+    With a repeat choice, cleaned_data['recurrence'] holds the parsed rule
+    and the view creates a TaskSeries starting on the due date instead.
+    """
+    
+    REPEAT_CHOICES = [
+        ('', 'Does not repeat'),
+        *((name, name.capitalize()) for name in PRESETS),
+        ('custom', 'Custom rule'),
+    ]
+    
+    repeat = forms.ChoiceField(
+        choices=REPEAT_CHOICES,
+        required=False,
+        label='Repeat',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    rule = forms.CharField(
+        required=False,
+        max_length=MAX_RULE_LENGTH,
+        label='Custom Rule',
+        help_text='An iCalendar RRULE, e.g. FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH',
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'FREQ=MONTHLY;BYMONTHDAY=-1'
+        })
+    )
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        repeat = cleaned_data.get('repeat')
+        cleaned_data['recurrence'] = None
+        if repeat:
+            field = 'rule' if repeat == 'custom' else 'repeat'
+            try:
+                cleaned_data['recurrence'] = parse_rule(cleaned_data.get(field))
+            except InvalidRule as exc:
+                self.add_error(field, str(exc))
+        return cleaned_data
+
+
+class TaskImportForm(forms.Form):
+    """Upload of a CSV or JSON task export."""
+    
+    FORMAT_CHOICES = [
+        ('', 'From the file extension'),
+        ('csv', 'CSV'),
+        ('json', 'JSON'),
+    ]
+    
+    file = forms.FileField(label='Export File', widget=forms.FileInput(attrs={
+        'class': 'form-control',
+        'accept': '.csv,.json,text/csv,application/json'
+    }))
+    format = forms.ChoiceField(label='Format', choices=FORMAT_CHOICES, required=False, widget=forms.Select(attrs={
+        'class': 'form-control'
+    }))
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        upload = cleaned_data.get('file')
+        if upload and not cleaned_data.get('format'):
+            extension = upload.name.rsplit('.', 1)[-1].lower()
+            if extension not in ('csv', 'json'):
+                raise forms.ValidationError('Choose a format for files without a .csv or .json extension.')
+            cleaned_data['format'] = extension
+        return cleaned_data
+
+
 class UserRegisterForm(UserCreationForm):
     """Extended user registration form."""
     
@@ -0,0 +1,43 @@
+"""
+Move tasks completed long ago from the task table to the archive.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from tasks.archive import ARCHIVE_BATCH_SIZE, archivable_tasks, archive_tasks
+
+
+class Command(BaseCommand):
+    help = ('Archive tasks completed more than --days ago, one transaction per batch. '
+            'Safe to interrupt: a new run continues where the last one stopped.')
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.TASK_ARCHIVE_DAYS,
+            help='Archive tasks completed more than DAYS days ago (default: TASK_ARCHIVE_DAYS).',
+        )
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+                            help='Tasks moved per transaction.')
+        parser.add_argument('--limit', type=int, help='Stop after archiving this many tasks.')
+        parser.add_argument('--user', action='append', dest='usernames', metavar='USERNAME',
+                            help='Limit to the given user (may be repeated).')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the tasks that would move.')
+    
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            user_ids = list(User.objects.filter(username__in=options['usernames']).values_list('pk', flat=True))
+        
+        if options['dry_run']:
+            count = archivable_tasks(options['days'], user_ids).count()
+            self.stdout.write(f'{count} task(s) would be archived.')
+            return
+        
+        moved = 0
+        for count in archive_tasks(options['days'], options['batch_size'], user_ids, options['limit']):
+            moved += count
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Archived {moved} task(s)...')
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} task(s).'))
@@ -0,0 +1,192 @@
+"""
+Load-test the hot task views under sync WSGI workers and async ASGI workers.
+"""
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.cookies import SimpleCookie
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from tasks.models import Task
+from tasks.seeding import seed_tasks
+
+
+SERVERS = {
+    'wsgi': ['todo_project.wsgi:application'],
+    'asgi': ['todo_project.asgi:application', '-k', 'uvicorn.workers.UvicornWorker'],
+}
+
+USERNAME = 'benchmark_asgi'
+
+
+class Command(BaseCommand):
+    help = 'Compare requests/sec and latency of the WSGI and ASGI deployments at equal worker counts.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Gunicorn workers for both servers.')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent client connections.')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per endpoint.')
+        parser.add_argument('--tasks', type=int, default=2000, help='Tasks to seed for the benchmark user.')
+        parser.add_argument('--port', type=int, default=8765, help='Port the servers listen on.')
+        parser.add_argument('--server', choices=sorted(SERVERS), action='append',
+                            help='Only benchmark the given server (repeatable).')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded user and tasks.')
+    
+    def handle(self, *args, **options):
+        if User.objects.filter(username=USERNAME).exists():
+            raise CommandError(f'User {USERNAME!r} already exists; delete it before benchmarking.')
+        
+        # The servers run in separate processes, so the data has to be committed
+        user = User.objects.create_user(username=USERNAME)
+        try:
+            seed_tasks([user], options['tasks'], batch_size=5000, seed=0)
+            task_id = Task.objects.filter(user=user).values_list('pk', flat=True).first()
+            client = Client()
+            client.force_login(user)
+            session_cookie = client.cookies[settings.SESSION_COOKIE_NAME].value
+            
+            endpoints = [
+                ('list', 'GET', '/tasks/'),
+                ('list-page', 'GET', '/tasks/?sort=due_date&priority=high'),
+                ('detail', 'GET', f'/task/{task_id}/'),
+                ('home', 'GET', '/'),
+                ('toggle', 'POST', f'/task/{task_id}/toggle/'),
+            ]
+            self.stdout.write(
+                f'{options["workers"]} workers, {options["concurrency"]} connections, '
+                f'{options["duration"]:.0f}s per endpoint, {options["tasks"]} tasks'
+            )
+            self.stdout.write(f'{"server":<8}{"endpoint":<12}{"requests":>10}{"errors":>8}'
+                              f'{"req/s":>10}{"p50 ms":>10}{"p99 ms":>10}')
+            for name in options['server'] or sorted(SERVERS, reverse=True):
+                with self.server(name, options):
+                    cookies = self.cookies(options['port'], session_cookie)
+                    for endpoint, method, path in endpoints:
+                        result = self.load(method, path, cookies, options)
+                        self.stdout.write(
+                            f'{name:<8}{endpoint:<12}{result["requests"]:>10}{result["errors"]:>8}'
+                            f'{result["rps"]:>10.1f}{result["p50"]:>10.2f}{result["p99"]:>10.2f}'
+                        )
+        finally:
+            if not options['keep']:
+                user.delete()
+    
+    def server(self, name, options):
+        return GunicornServer(name, options['port'], options['workers'])
+    
+    def cookies(self, port, session_cookie):
+        """Fetch a CSRF cookie for the logged-in session."""
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        header = f'{settings.SESSION_COOKIE_NAME}={session_cookie}'
+        connection.request('GET', '/tasks/', headers={'Cookie': header})
+        response = connection.getresponse()
+        response.read()
+        connection.close()
+        if response.status != 200:
+            raise CommandError(f'Logged-in request failed with status {response.status}.')
+        
+        cookie = SimpleCookie()
+        for value in response.headers.get_all('Set-Cookie') or []:
+            cookie.load(value)
+        csrf_token = cookie[settings.CSRF_COOKIE_NAME].value
+        return {
+            'Cookie': f'{header}; {settings.CSRF_COOKIE_NAME}={csrf_token}',
+            'X-CSRFToken': csrf_token,
+        }
+    
+    def load(self, method, path, cookies, options):
+        """Drive one endpoint from several keep-alive connections for a fixed time."""
+        headers = dict(cookies)
+        if method == 'POST':
+            headers['Accept'] = 'application/json'
+            headers['Content-Length'] = '0'
+        latencies, errors = [], []
+        deadline = time.perf_counter() + options['duration']
+        
+        def worker():
+            connection = http.client.HTTPConnection('127.0.0.1', options['port'], timeout=30)
+            timings, failures = [], 0
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    connection.request(method, path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    ok = response.status == 200
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    ok = False
+                if ok:
+                    timings.append(time.perf_counter() - started)
+                else:
+                    failures += 1
+            connection.close()
+            latencies.extend(timings)
+            errors.append(failures)
+        
+        threads = [threading.Thread(target=worker) for _ in range(options['concurrency'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        
+        latencies.sort()
+        if latencies:
+            p50 = statistics.median(latencies) * 1000
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        else:
+            p50 = p99 = 0.0
+        return {
+            'requests': len(latencies),
+            'errors': sum(errors),
+            'rps': len(latencies) / elapsed,
+            'p50': p50,
+            'p99': p99,
+        }
+
+
+class GunicornServer:
+    """Run gunicorn for the given entry point for the duration of a with block."""
+    
+    def __init__(self, name, port, workers):
+        self.name = name
+        self.port = port
+        self.workers = workers
+    
+    def __enter__(self):
+        env = dict(os.environ, ASYNC_VIEWS='True' if self.name == 'asgi' else 'False')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', *SERVERS[self.name],
+             '--workers', str(self.workers), '--bind', f'127.0.0.1:{self.port}',
+             '--log-level', 'warning'],
+            cwd=settings.BASE_DIR,
+            env=env,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise CommandError(f'{self.name} server exited with status {self.process.returncode}.')
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise CommandError(f'{self.name} server did not start listening on port {self.port}.')
+    
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
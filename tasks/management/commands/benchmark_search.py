@@ -0,0 +1,58 @@
+"""
+Compare full-text search with the icontains scan on a large task list.
+"""
+import statistics
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from tasks.models import Task
+from tasks.search import get_backend, search_tasks
+from tasks.seeding import seed_tasks
+
+
+# Common and rare words, prefixes and multi-term queries from the seeding vocabulary
+QUERIES = ['invoice', 'presentation', 'rep', 'budget report', 'kalomi', 'rusavo', 'jaja', 'ti', 'travel kamine']
+
+
+class Command(BaseCommand):
+    help = 'Seed tasks for one user and compare full-text search against icontains.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=100000, help='Tasks to seed for the benchmark user.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query.')
+        parser.add_argument('--page-size', type=int, default=10, help='Rows fetched per query.')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded data.')
+    
+    def handle(self, *args, **options):
+        backend = get_backend()
+        if backend == 'icontains':
+            raise CommandError(f'No full-text search backend is available on {connection.vendor}.')
+        
+        with transaction.atomic():
+            user = User.objects.create_user(username='benchmark_search')
+            started = time.perf_counter()
+            seed_tasks([user], options['tasks'], batch_size=5000, seed=0)
+            self.stdout.write(f'Seeded {options["tasks"]} tasks in {time.perf_counter() - started:.1f}s '
+                              f'(search backend: {backend}).')
+            
+            self.stdout.write(f'{"query":<16}{"backend":<12}{"matches":>9}{"median ms":>12}{"max ms":>10}')
+            for query in QUERIES:
+                for name in (backend, 'icontains'):
+                    matches = search_tasks(Task.objects.filter(user=user), query, backend=name)
+                    ranked = search_tasks(Task.objects.filter(user=user), query, backend=name, rank=True)
+                    matches, median, worst = self.measure(matches, ranked.order_by('-search_rank'), options)
+                    self.stdout.write(f'{query:<16}{name:<12}{matches:>9}{median:>12.2f}{worst:>10.2f}')
+            
+            if not options['keep']:
+                transaction.set_rollback(True)
+    
+    def measure(self, matches, ranked, options):
+        """Time one search results page: count the matches, fetch the top rows."""
+        timings = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            count = matches.count()
+            list(ranked[:options['page_size']])
+            timings.append((time.perf_counter() - started) * 1000)
+        return count, statistics.median(timings), max(timings)
@@ -0,0 +1,106 @@
+"""
+Count the database queries each session and message storage costs the task list.
+"""
+import statistics
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from tasks.models import Task
+from tasks.seeding import create_users, seed_tasks
+
+
+SESSION_ENGINES = ('db', 'cached_db', 'cache', 'signed_cookies')
+MESSAGE_STORAGES = {
+    'fallback': 'django.contrib.messages.storage.fallback.FallbackStorage',
+    'session': 'django.contrib.messages.storage.session.SessionStorage',
+    'cookie': 'django.contrib.messages.storage.cookie.CookieStorage',
+}
+# Django's defaults, which the savings are measured against
+BASELINE = ('db', 'fallback')
+
+
+class Command(BaseCommand):
+    help = ('Request the task list under every session engine and message storage and report '
+            'the queries per request, and those saved compared with the database session.')
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=500, help='Tasks to seed for the benchmark user.')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per scenario.')
+    
+    def handle(self, *args, **options):
+        test_settings = override_settings(
+            TASK_CACHE_TIMEOUT=0,
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+        )
+        with transaction.atomic(), test_settings:
+            user = create_users(1, 'benchmark_sessions')[0]
+            seed_tasks([user], options['tasks'], seed=0)
+            task = Task.objects.filter(user=user).order_by('pk').first()
+            
+            results = {}
+            for engine in SESSION_ENGINES:
+                for storage in MESSAGE_STORAGES:
+                    with override_settings(
+                        SESSION_ENGINE=f'django.contrib.sessions.backends.{engine}',
+                        MESSAGE_STORAGE=MESSAGE_STORAGES[storage],
+                    ):
+                        results[engine, storage] = self.measure(user, task, options['repeat'])
+            transaction.set_rollback(True)
+        
+        self.report(results)
+    
+    def measure(self, user, task, repeat):
+        """Time plain task list requests and toggle-then-list round trips."""
+        client = Client()
+        client.force_login(user)
+        list_url = reverse('task-list')
+        toggle_url = reverse('task-toggle', kwargs={'pk': task.pk})
+        
+        timings, plain, flash = [], [], []
+        # The first round warms the caches and is not counted
+        for index in range(repeat + 1):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                client.get(list_url)
+                elapsed = time.perf_counter() - started
+            # The toggle redirects to the list, which shows its flash message
+            with CaptureQueriesContext(connection) as flashed:
+                client.post(toggle_url)
+                client.get(list_url)
+            if index:
+                timings.append(elapsed * 1000)
+                plain.append(count_queries(captured))
+                flash.append(count_queries(flashed))
+        return {
+            'p50': statistics.median(timings),
+            'list': max(plain),
+            'flash': max(flash),
+        }
+    
+    def report(self, results):
+        baseline = results[BASELINE]
+        self.stdout.write(f'{"session engine":<16}{"messages":<10}{"p50 ms":>8}'
+                          f'{"list queries":>14}{"session":>9}{"saved":>7}'
+                          f'{"toggle+list":>13}{"session":>9}{"saved":>7}')
+        for (engine, storage), result in results.items():
+            list_total, list_session = result['list']
+            flash_total, flash_session = result['flash']
+            self.stdout.write(
+                f'{engine:<16}{storage:<10}{result["p50"]:>8.2f}'
+                f'{list_total:>14}{list_session:>9}{baseline["list"][0] - list_total:>7}'
+                f'{flash_total:>13}{flash_session:>9}{baseline["flash"][0] - flash_total:>7}'
+            )
+        self.stdout.write(
+            '"saved" compares the total with the database session and fallback messages '
+            f'(Django\'s defaults); this project uses {settings.SESSION_BACKEND} sessions and '
+            f'{settings.MESSAGE_STORAGE.rsplit(".", 1)[-1]}.'
+        )
+
+
+def count_queries(captured):
+    """Return (all queries, queries on the session table) for a capture."""
+    return len(captured), sum('django_session' in query['sql'] for query in captured)
@@ -0,0 +1,166 @@
+"""
+Hammer a scratch SQLite database with task writes from several processes.
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from tasks.models import Task
+
+
+# SQLITE_PRODUCTION_MODE for each configuration
+MODES = {
+    'default': 'False',
+    'tuned': 'True',
+}
+
+TASKS_PER_WORKER = 20
+
+
+class Command(BaseCommand):
+    help = ('Run concurrent worker processes that create and toggle tasks through the views on a '
+            'scratch SQLite database, with Django\'s SQLite defaults and with SQLITE_PRODUCTION_MODE, '
+            'and report write throughput and "database is locked" errors.')
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8, help='Concurrent writer processes.')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds each process writes for.')
+        parser.add_argument('--mode', choices=sorted(MODES), action='append',
+                            help='Only benchmark the given configuration (repeatable).')
+        # Internal: run as one of the writer processes
+        parser.add_argument('--worker', type=int, help='Run as the writer process with this number.')
+        parser.add_argument('--start-at', type=float, help='Wall clock time the writers start at.')
+    
+    def handle(self, *args, **options):
+        if options['worker'] is not None:
+            return self.run_worker(options)
+        
+        with tempfile.TemporaryDirectory(prefix='benchmark_sqlite_writes') as directory:
+            template = os.path.join(directory, 'template.sqlite3')
+            # Migrate once with the default rollback journal and copy the file
+            if self.manage(['migrate', '--verbosity', '0'], template, 'default').wait():
+                raise CommandError('Could not migrate the scratch database.')
+            
+            self.stdout.write(f'{options["processes"]} processes, {options["duration"]:.0f}s, '
+                              f'busy timeout {settings.SQLITE_BUSY_TIMEOUT:g}s')
+            self.stdout.write(f'{"mode":<10}{"writes":>9}{"writes/s":>10}{"locked":>8}'
+                              f'{"p50 ms":>9}{"p99 ms":>9}{"journal":>9}')
+            for mode in options['mode'] or sorted(MODES):
+                path = os.path.join(directory, f'{mode}.sqlite3')
+                shutil.copy(template, path)
+                result = self.run_mode(mode, path, options)
+                self.stdout.write(
+                    f'{mode:<10}{result["writes"]:>9}{result["rps"]:>10.1f}{result["locked"]:>8}'
+                    f'{result["p50"]:>9.2f}{result["p99"]:>9.2f}{result["journal"]:>9}'
+                )
+    
+    def manage(self, arguments, path, mode, **kwargs):
+        """Start manage.py with the given arguments on the scratch database."""
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{path}', DATABASE_REPLICA_URL='',
+                   SQLITE_PRODUCTION_MODE=MODES[mode])
+        return subprocess.Popen(
+            [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), *arguments],
+            cwd=settings.BASE_DIR, env=env, **kwargs
+        )
+    
+    def run_mode(self, mode, path, options):
+        # Leave every writer time to start Django and set up its user
+        start_at = time.time() + 3 + options['processes'] * 0.2
+        workers = [
+            self.manage(
+                ['benchmark_sqlite_writes', '--worker', str(number), '--start-at', str(start_at),
+                 '--duration', str(options['duration'])],
+                # Locked requests are logged as server errors; only the counts matter
+                path, mode, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+            )
+            for number in range(options['processes'])
+        ]
+        results = []
+        for worker in workers:
+            output, errors = worker.communicate()
+            if worker.returncode:
+                self.stderr.write(errors)
+                raise CommandError(f'A {mode} writer exited with status {worker.returncode}.')
+            results.append(json.loads(output.strip().splitlines()[-1]))
+        
+        latencies = sorted(latency for result in results for latency in result['latencies'])
+        writes = len(latencies)
+        return {
+            'writes': writes,
+            'rps': writes / options['duration'],
+            'locked': sum(result['locked'] for result in results),
+            'p50': statistics.median(latencies) if latencies else 0.0,
+            'p99': latencies[min(writes - 1, int(writes * 0.99))] if latencies else 0.0,
+            'journal': results[0]['journal'],
+        }
+    
+    def run_worker(self, options):
+        """Create and toggle tasks until the deadline; print the results as JSON."""
+        test_settings = override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'])
+        with test_settings:
+            user, task_ids = retry(lambda: self.create_user(options['worker']))
+            client = Client()
+            retry(lambda: client.force_login(user))
+            create_url = reverse('task-create')
+            form = {'title': 'Stress task', 'description': '', 'priority': 'medium',
+                    'status': 'pending', 'due_date': ''}
+            
+            time.sleep(max(0.0, options['start_at'] - time.time()))
+            deadline = time.perf_counter() + options['duration']
+            latencies, locked, count = [], 0, 0
+            while time.perf_counter() < deadline:
+                count += 1
+                # Alternate creating tasks and toggling existing ones, with a
+                # read of the list every few writes
+                if count % 2:
+                    url, data = create_url, form
+                else:
+                    url, data = reverse('task-toggle', kwargs={'pk': task_ids[count % len(task_ids)]}), None
+                started = time.perf_counter()
+                try:
+                    response = client.post(url, data, secure=True)
+                except OperationalError as exc:
+                    if 'locked' not in str(exc):
+                        raise
+                    locked += 1
+                    continue
+                if response.status_code == 302:
+                    latencies.append((time.perf_counter() - started) * 1000)
+                if count % 5 == 0:
+                    try:
+                        client.get(reverse('task-list'), secure=True)
+                    except OperationalError:
+                        locked += 1
+            
+            with connection.cursor() as cursor:
+                journal = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+        self.stdout.write(json.dumps({'latencies': latencies, 'locked': locked, 'journal': journal}))
+    
+    @transaction.atomic
+    def create_user(self, number):
+        user = User.objects.create_user(username=f'benchmark_sqlite_writes_{number}')
+        tasks = Task.objects.bulk_create(
+            Task(user=user, title=f'Stress task {index}') for index in range(TASKS_PER_WORKER)
+        )
+        return user, [task.pk for task in tasks]
+
+
+def retry(function, attempts=100):
+    """Call function, retrying while another writer holds the lock during setup."""
+    for attempt in range(attempts):
+        try:
+            return function()
+        except OperationalError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.1)
@@ -0,0 +1,77 @@
+"""
+Seed tasks and report query plans and timings for the task list access paths.
+"""
+import itertools
+import statistics
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from tasks.models import Task, TaskQuerySet
+from tasks.seeding import seed_tasks
+
+
+# The filter and sort options offered by tasks/task_list.html
+STATUS_OPTIONS = ['all', 'active', 'completed']
+PRIORITY_OPTIONS = ['', 'low', 'medium', 'high']
+SORT_OPTIONS = list(TaskQuerySet.SORT_ORDERINGS)
+
+
+class Command(BaseCommand):
+    help = 'Seed synthetic tasks and print EXPLAIN output and timings for each task list query.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5, help='Number of benchmark users to create.')
+        parser.add_argument('--tasks', type=int, default=20000, help='Tasks per benchmark user.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query.')
+        parser.add_argument('--page-size', type=int, default=10, help='Rows fetched per query.')
+        parser.add_argument('--no-explain', action='store_true', help='Only print timings.')
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the seeded data instead of rolling it back.',
+        )
+    
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            users = [
+                User.objects.create_user(username=f'benchmark_{index}')
+                for index in range(options['users'])
+            ]
+            started = time.perf_counter()
+            created = seed_tasks(users, options['tasks'], seed=0)
+            self.stdout.write(f'Seeded {created} tasks in {time.perf_counter() - started:.1f}s '
+                              f'on {connection.vendor}.')
+            
+            self.run_queries(users[0], options)
+            
+            if not options['keep']:
+                transaction.set_rollback(True)
+    
+    def run_queries(self, user, options):
+        page_size = options['page_size']
+        explain_options = {'analyze': True} if connection.vendor == 'postgresql' else {}
+        
+        rows = []
+        for status, priority, sort in itertools.product(STATUS_OPTIONS, PRIORITY_OPTIONS, SORT_OPTIONS):
+            params = {'status': status, 'priority': priority, 'sort': sort}
+            queryset = Task.objects.filter(user=user).filter_for_list(params)
+            label = f'status={status} priority={priority or "any"} sort={sort}'
+            
+            if not options['no_explain']:
+                self.stdout.write(self.style.MIGRATE_HEADING(label))
+                self.stdout.write(queryset[:page_size].explain(**explain_options))
+            
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                # Same work as one page of the paginated list view
+                queryset.count()
+                list(queryset[:page_size])
+                timings.append((time.perf_counter() - started) * 1000)
+            rows.append((label, statistics.median(timings), max(timings)))
+        
+        self.stdout.write(self.style.MIGRATE_HEADING('Timings (ms, count + first page)'))
+        width = max(len(label) for label, _, _ in rows)
+        for label, median, worst in sorted(rows, key=lambda row: -row[1]):
+            self.stdout.write(f'{label:<{width}}  median {median:8.2f}  max {worst:8.2f}')
@@ -0,0 +1,99 @@
+"""
+Time streaming exports and batched imports of a large task list.
+"""
+import os
+import resource
+import tempfile
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from tasks.models import Task, TaskStats
+from tasks.seeding import create_users, seed_tasks
+from tasks.transfer import FORMATS, import_tasks
+
+
+class Command(BaseCommand):
+    help = ('Seed one user with many tasks, export them through the export view in every format '
+            'and import each file for a second user, reporting throughput and peak memory.')
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1_000_000, help='Tasks to seed and transfer.')
+        parser.add_argument('--format', choices=sorted(FORMATS), action='append',
+                            help='Only benchmark the given format (repeatable).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Tasks per import batch.')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded data and imported tasks.')
+    
+    def handle(self, *args, **options):
+        test_settings = override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            # With DEBUG on, every query is kept in connection.queries
+            DEBUG=False,
+        )
+        with transaction.atomic(), test_settings:
+            formats = options['format'] or sorted(FORMATS)
+            owner, *importers = create_users(1 + len(formats), 'benchmark_transfer')
+            started = time.perf_counter()
+            seed_tasks([owner], options['tasks'], batch_size=5000, seed=0)
+            self.stdout.write(f'Seeded {options["tasks"]} tasks in {time.perf_counter() - started:.1f}s.')
+            client = Client()
+            client.force_login(owner)
+            
+            self.stdout.write(f'{"step":<14}{"rows":>10}{"seconds":>10}{"rows/s":>10}'
+                              f'{"file MB":>9}{"max RSS MB":>12}')
+            for fmt, importer in zip(formats, importers):
+                with tempfile.NamedTemporaryFile(suffix=f'.{fmt}', delete=False) as output:
+                    path = output.name
+                try:
+                    self.export(client, fmt, path, options['tasks'])
+                    self.load(importer, fmt, path, options)
+                finally:
+                    os.unlink(path)
+            
+            if not options['keep']:
+                transaction.set_rollback(True)
+    
+    def export(self, client, fmt, path, rows):
+        with Measure() as measure, open(path, 'wb') as output:
+            response = client.get(reverse('task-export'), {'format': fmt})
+            if response.status_code != 200:
+                raise CommandError(f'Export failed with status {response.status_code}.')
+            for chunk in response.streaming_content:
+                output.write(chunk)
+        self.report(f'export {fmt}', rows, measure, os.path.getsize(path))
+    
+    def load(self, user, fmt, path, options):
+        with Measure() as measure, open(path, 'rb') as stream:
+            result = import_tasks(user, stream, fmt, options['batch_size'])
+        if result['error'] or result['skipped']:
+            raise CommandError(f'Import of the {fmt} export failed: {result}')
+        stats = TaskStats.objects.for_user(user)
+        if stats.total_count != Task.objects.filter(user=user).count():
+            raise CommandError('Task counters do not match the imported tasks.')
+        self.report(f'import {fmt}', result['created'], measure, os.path.getsize(path))
+    
+    def report(self, step, rows, measure, size):
+        self.stdout.write(
+            f'{step:<14}{rows:>10}{measure.elapsed:>10.1f}{rows / measure.elapsed:>10.0f}'
+            f'{size / 2**20:>9.1f}{measure.max_rss / 2**10:>12.1f}'
+        )
+
+
+class Measure:
+    """
+    Wall time of a with block and the process's peak resident memory after it.
+    
+    The peak never goes down, so it only grows between steps if a step
+    needed more memory than everything before it.
+    """
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.started
+        # Kilobytes on Linux
+        self.max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
@@ -0,0 +1,252 @@
+"""
+Drive every task URL in-process and check latency and query budgets.
+
+The live event stream (task-events) is left out: its response never ends.
+"""
+import itertools
+import statistics
+import time
+from datetime import timedelta
+from PIL import Image
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from tasks.archive import archive_tasks
+from tasks.models import Task, TaskSeries
+from tasks.pagination import KeysetPaginator
+from tasks.seeding import create_users, seed_tasks
+from tasks.thumbnails import AVATAR_SIZES, THUMBNAIL_DIR, THUMBNAIL_FORMATS, render_variant
+from tasks.views import TaskListView
+
+
+# Every option offered by tasks/task_list.html
+LIST_PARAMS = [
+    ('list', {}),
+    ('list-active', {'status': 'active'}),
+    ('list-completed', {'status': 'completed'}),
+    ('list-high', {'priority': 'high'}),
+    ('list-oldest', {'sort': 'created_at'}),
+    ('list-due', {'sort': 'due_date'}),
+    ('list-priority', {'sort': '-priority'}),
+    ('list-title', {'sort': 'title'}),
+    ('list-search', {'search': 'report'}),
+    ('list-search-relevance', {'search': 'report', 'sort': 'relevance'}),
+    ('list-search-filtered', {'search': 'meeting', 'status': 'active', 'priority': 'medium'}),
+]
+
+# Tasks in each file uploaded by the import scenario
+IMPORT_ROWS = 100
+
+
+class Command(BaseCommand):
+    help = ('Seed a user, request every task URL with the test client and report throughput, '
+            'latency percentiles and query counts; fails when a view exceeds TASK_VIEW_BUDGETS.')
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=2000, help='Tasks to seed for the benchmark user.')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per scenario.')
+        parser.add_argument('--only', action='append', metavar='SCENARIO',
+                            help='Only run the given scenario (repeatable).')
+        parser.add_argument('--cache', action='store_true',
+                            help='Leave the page cache on (by default every request renders).')
+        parser.add_argument('--no-budgets', action='store_true', help='Report only, never fail.')
+    
+    def handle(self, *args, **options):
+        cache_timeout = settings.TASK_CACHE_TIMEOUT if options['cache'] else 0
+        test_settings = override_settings(
+            TASK_CACHE_TIMEOUT=cache_timeout,
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            # Serve /metrics/ for its scenario; the middleware is unaffected
+            TASK_METRICS=True,
+        )
+        # Files written for scenarios, removed again after the run
+        self.files = []
+        self.occurrence_days = itertools.count()
+        with transaction.atomic(), test_settings:
+            user = create_users(1, 'benchmark_views')[0]
+            seed_tasks([user], options['tasks'], seed=0)
+            client = Client()
+            client.force_login(user)
+            
+            results = []
+            try:
+                for name, method, path, data, extra in self.scenarios(user):
+                    if options['only'] and name not in options['only']:
+                        continue
+                    results.append((name, self.measure(client, method, path, data, extra, options['repeat'])))
+            finally:
+                for name in self.files:
+                    default_storage.delete(name)
+            transaction.set_rollback(True)
+        
+        failures = self.report(results, not options['no_budgets'])
+        if failures:
+            raise CommandError('Over budget: ' + '; '.join(failures))
+    
+    def scenarios(self, user):
+        """Yield (name, method, path, data, extra) for every URL in tasks/urls.py but task-events."""
+        task = Task.objects.filter(user=user).order_by('pk').first()
+        form = {'title': 'Benchmark task', 'description': 'Created by benchmark_views',
+                'priority': 'medium', 'status': 'pending', 'due_date': ''}
+        
+        yield 'home', 'get', reverse('home'), None, {}
+        yield 'about', 'get', reverse('about'), None, {}
+        yield 'register', 'get', reverse('register'), None, {'anonymous': True}
+        yield 'login', 'get', reverse('login'), None, {'anonymous': True}
+        yield 'logout', 'post', reverse('logout'), None, {'anonymous': True}
+        yield 'profile', 'get', reverse('profile'), None, {}
+        yield 'avatar', 'get', reverse('avatar-thumbnail', args=[self.avatar_variant()]), None, {'anonymous': True}
+        for name, params in LIST_PARAMS:
+            yield name, 'get', reverse('task-list'), params, {}
+        yield 'list-next-page', 'get', self.next_page(user), None, {}
+        yield 'list-deep-page', 'get', self.deep_page(user), None, {}
+        yield 'detail', 'get', reverse('task-detail', kwargs={'pk': task.pk}), None, {}
+        yield 'create-form', 'get', reverse('task-create'), None, {}
+        yield 'create', 'post', reverse('task-create'), form, {}
+        yield 'update-form', 'get', reverse('task-update', kwargs={'pk': task.pk}), None, {}
+        yield 'update', 'post', reverse('task-update', kwargs={'pk': task.pk}), form, {}
+        yield 'delete-form', 'get', reverse('task-delete', kwargs={'pk': task.pk}), None, {}
+        yield 'delete', 'post', self.new_task_url(user, 'task-delete'), None, {}
+        yield 'toggle', 'post', reverse('task-toggle', kwargs={'pk': task.pk}), None, {}
+        yield 'toggle-json', 'post', reverse('task-toggle', kwargs={'pk': task.pk}), None, {
+            'HTTP_ACCEPT': 'application/json'
+        }
+        series = TaskSeries.objects.create(user=user, title='Benchmark series', rule='FREQ=DAILY',
+                                           start_date=timezone.now().date())
+        yield 'occurrence-toggle', 'post', self.occurrence_url(series, 'toggle'), None, {}
+        yield 'occurrence-update-form', 'get', self.occurrence_url(series, 'update'), None, {}
+        yield 'occurrence-update', 'post', self.occurrence_url(series, 'update'), form, {}
+        yield 'occurrence-delete-form', 'get', self.occurrence_url(series, 'delete'), None, {}
+        yield 'occurrence-delete', 'post', self.occurrence_url(series, 'delete'), {'scope': 'occurrence'}, {}
+        yield 'calendar', 'get', reverse('task-calendar'), None, {}
+        yield 'calendar-week', 'get', reverse('task-calendar'), {'week': timezone.now().date().isoformat()}, {}
+        yield 'calendar-feed', 'get', reverse('task-calendar-feed'), None, {}
+        yield 'sync', 'get', reverse('task-sync'), {'limit': 100}, {}
+        yield 'export-csv', 'get', reverse('task-export'), {'format': 'csv'}, {}
+        yield 'export-json', 'get', reverse('task-export'), {'format': 'json'}, {}
+        yield 'import-form', 'get', reverse('task-import'), None, {}
+        yield 'import', 'post', reverse('task-import'), self.import_upload, {}
+        # Generators run lazily, so the earlier scenarios see the tasks unarchived
+        for _ in archive_tasks(0, user_ids=[user.pk]):
+            pass
+        yield 'archive', 'get', reverse('task-archive'), None, {}
+        yield 'archive-search', 'get', reverse('task-archive'), {'search': 'report'}, {}
+        yield 'health', 'get', reverse('health'), None, {'anonymous': True}
+        yield 'metrics', 'get', reverse('metrics'), None, {'anonymous': True}
+    
+    def next_page(self, user):
+        url = reverse('task-list')
+        if settings.TASK_LIST_PAGINATION != 'cursor':
+            return f'{url}?page=2'
+        queryset = Task.objects.filter(user=user).filter_for_list({})
+        page = KeysetPaginator(queryset, TaskListView.paginate_by).page()
+        return f'{url}?cursor={page.next_cursor}'
+    
+    def deep_page(self, user):
+        """The next-to-last page, whose cursor has to be seeked to rather than scanned for."""
+        url = reverse('task-list')
+        queryset = Task.objects.filter(user=user).filter_for_list({})
+        per_page = TaskListView.paginate_by
+        position = max(queryset.count() - 2 * per_page, 0)
+        if settings.TASK_LIST_PAGINATION != 'cursor':
+            return f'{url}?page={position // per_page + 1}'
+        paginator = KeysetPaginator(queryset, per_page)
+        task = queryset.order_by(*paginator._ordering())[position]
+        return f'{url}?cursor={paginator.encode_cursor(task, "next")}'
+    
+    def new_task_url(self, user, name):
+        """A path that needs a fresh task per request, e.g. deleting one."""
+        def path():
+            task = Task.objects.create(user=user, title='Benchmark task')
+            return reverse(name, kwargs={'pk': task.pk})
+        return path
+    
+    def occurrence_url(self, series, action):
+        """A path to a different virtual occurrence per request, as requests may store it."""
+        def path():
+            day = series.start_date + timedelta(days=next(self.occurrence_days))
+            return reverse(f'occurrence-{action}', args=[series.pk, day.isoformat()])
+        return path
+    
+    def avatar_variant(self):
+        """Write a resized avatar to serve and return its name."""
+        extension, pil_format, _, options = THUMBNAIL_FORMATS[0]
+        size = AVATAR_SIZES[0]
+        content = render_variant(Image.new('RGB', (size, size), 'white'), size, pil_format, options)
+        name = default_storage.save(f'{THUMBNAIL_DIR}/benchmark-{size}.{extension}', ContentFile(content))
+        self.files.append(name)
+        return name.rsplit('/', 1)[-1]
+    
+    def import_upload(self):
+        """A small CSV export to upload; every request needs a new file."""
+        rows = ''.join(f'Imported task {index},,medium,pending,\n' for index in range(IMPORT_ROWS))
+        content = f'title,description,priority,status,due_date\n{rows}'.encode()
+        return {'file': SimpleUploadedFile('tasks.csv', content, content_type='text/csv')}
+    
+    def measure(self, client, method, path, data, extra, repeat):
+        extra = dict(extra)
+        if extra.pop('anonymous', False):
+            client = Client()
+        timings, queries, statuses = [], [], set()
+        # The first request warms caches and is not counted
+        for index in range(repeat + 1):
+            url = path() if callable(path) else path
+            payload = data() if callable(data) else data
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = getattr(client, method)(url, payload, **extra)
+                if response.streaming:
+                    # Streamed bodies only query as they are consumed
+                    response.getvalue()
+                elapsed = time.perf_counter() - started
+            if index:
+                timings.append(elapsed * 1000)
+                queries.append(len(captured))
+                statuses.add(response.status_code)
+        timings.sort()
+        return {
+            'rps': len(timings) / (sum(timings) / 1000),
+            'p50': statistics.median(timings),
+            'p95': percentile(timings, 95),
+            'p99': percentile(timings, 99),
+            'queries': max(queries),
+            'statuses': sorted(statuses),
+        }
+    
+    def report(self, results, check_budgets):
+        budgets = settings.TASK_VIEW_BUDGETS
+        failures = []
+        self.stdout.write(f'{"scenario":<24}{"status":>8}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}'
+                          f'{"p99 ms":>9}{"queries":>9}  budget')
+        for name, result in results:
+            # 'list-search' falls back to the 'list' budget, then to 'default'
+            budget = budgets.get(name) or budgets.get(name.split('-')[0]) or budgets['default']
+            over = []
+            if result['p95'] > budget['p95_ms']:
+                over.append(f'p95 {result["p95"]:.1f}ms > {budget["p95_ms"]}ms')
+            if result['queries'] > budget['queries']:
+                over.append(f'{result["queries"]} queries > {budget["queries"]}')
+            status = '/'.join(map(str, result['statuses']))
+            if result['statuses'][-1] >= 400:
+                over.append(f'status {status}')
+            verdict = 'ok' if not over else 'OVER: ' + ', '.join(over)
+            self.stdout.write(
+                f'{name:<24}{status:>8}{result["rps"]:>9.1f}{result["p50"]:>9.2f}'
+                f'{result["p95"]:>9.2f}{result["p99"]:>9.2f}{result["queries"]:>9}  {verdict}'
+            )
+            if over and check_budgets:
+                failures.append(f'{name} ({", ".join(over)})')
+        return failures
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
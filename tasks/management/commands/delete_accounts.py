@@ -0,0 +1,38 @@
+"""
+Delete the user accounts whose deletion was requested, a batch at a time.
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from tasks.deletion import DELETION_BATCH_SIZE, delete_account, pending_deletions, request_account_deletion
+
+
+class Command(BaseCommand):
+    help = ('Finish pending account deletions (for example after a restart), deleting each '
+            'account\'s tasks in batches before the user. --user first deactivates the given '
+            'accounts and queues them for deletion.')
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames', metavar='USERNAME',
+                            help='Queue the given account for deletion first (may be repeated).')
+        parser.add_argument('--batch-size', type=int, default=DELETION_BATCH_SIZE,
+                            help='Rows deleted per transaction.')
+    
+    def handle(self, *args, **options):
+        usernames = options['usernames'] or []
+        users = list(User.objects.filter(username__in=usernames))
+        missing = set(usernames) - {user.username for user in users}
+        if missing:
+            raise CommandError(f'Unknown user(s): {", ".join(sorted(missing))}')
+        for user in users:
+            request_account_deletion(user, schedule=False)
+        
+        accounts = 0
+        for user_id in pending_deletions():
+            deleted = delete_account(user_id, options['batch_size'])
+            if deleted is None:
+                # Finished by another process meanwhile
+                continue
+            accounts += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Deleted user {user_id} and {deleted} task row(s).')
+        self.stdout.write(self.style.SUCCESS(f'Deleted {accounts} account(s).'))
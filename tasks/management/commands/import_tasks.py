@@ -0,0 +1,46 @@
+"""
+Import tasks for a user from a CSV or JSON export.
+"""
+import os
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from tasks.transfer import FORMATS, IMPORT_BATCH_SIZE, import_tasks
+
+
+class Command(BaseCommand):
+    help = ('Create tasks for a user from a CSV or JSON export, validating rows like the task form '
+            'and committing them in batches.')
+    
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Owner of the imported tasks.')
+        parser.add_argument('path', help='CSV or JSON file in the task export format.')
+        parser.add_argument('--format', choices=sorted(FORMATS),
+                            help='File format (default: from the file extension).')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                            help='Tasks per INSERT and transaction.')
+    
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'User {options["username"]!r} does not exist.')
+        
+        fmt = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if fmt not in FORMATS:
+            raise CommandError('Cannot tell the format from the file extension; pass --format.')
+        
+        try:
+            with open(options['path'], 'rb') as stream:
+                result = import_tasks(user, stream, fmt, options['batch_size'])
+        except OSError as exc:
+            raise CommandError(str(exc))
+        
+        for number, errors in result['errors']:
+            self.stderr.write(f'Row {number}: {" ".join(errors)}')
+        if result['skipped'] > len(result['errors']):
+            self.stderr.write(f'... and {result["skipped"] - len(result["errors"])} more invalid rows.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result["created"]} tasks for {user.username}, skipped {result["skipped"]} invalid rows.'
+        ))
+        if result['error']:
+            raise CommandError(f'Import stopped: {result["error"]}')
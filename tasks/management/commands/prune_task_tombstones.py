@@ -0,0 +1,22 @@
+"""
+Delete task tombstones that sync clients no longer need.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from tasks.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete tombstones of deleted tasks older than the sync retention period.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.TASK_SYNC_TOMBSTONE_DAYS,
+            help='Keep tombstones from the last DAYS days (default: TASK_SYNC_TOMBSTONE_DAYS).',
+        )
+    
+    def handle(self, *args, **options):
+        deleted = prune_tombstones(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstone(s).'))
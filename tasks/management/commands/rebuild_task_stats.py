@@ -0,0 +1,76 @@
+"""
+Rebuild or verify the per-user task statistics.
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from tasks.models import TaskStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user task counters, or verify them against the task table.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only compare stored counters with fresh ones and report mismatches.',
+        )
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='usernames',
+            metavar='USERNAME',
+            help='Limit to the given user (may be repeated).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of users processed per aggregate query.',
+        )
+    
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        user_ids = list(users.values_list('pk', flat=True))
+        batch_size = options['batch_size']
+        
+        mismatches = 0
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            if options['verify']:
+                mismatches += self.verify(batch)
+            else:
+                TaskStats.objects.rebuild(batch)
+        
+        if options['verify']:
+            if mismatches:
+                raise CommandError(f'{mismatches} user(s) have out-of-date task statistics.')
+            self.stdout.write(self.style.SUCCESS(f'Task statistics verified for {len(user_ids)} user(s).'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Task statistics rebuilt for {len(user_ids)} user(s).'))
+    
+    def verify(self, user_ids):
+        """Report users whose stored counters differ from a fresh aggregate."""
+        stored = {stats.user_id: stats for stats in TaskStats.objects.filter(user_id__in=user_ids)}
+        mismatches = 0
+        for user_id, expected in TaskStats.objects.compute(user_ids).items():
+            stats = stored.get(user_id)
+            if stats is None:
+                self.stdout.write(f'User {user_id}: no statistics row')
+                mismatches += 1
+                continue
+            fields = [*TaskStats.COUNTER_FIELDS, 'archived_count', 'series_count']
+            if stats.overdue_as_of != expected['overdue_as_of']:
+                # A stale overdue counter is recounted on the next read
+                fields.remove('overdue_count')
+            diff = [
+                f'{name}={getattr(stats, name)} (expected {expected[name]})'
+                for name in fields
+                if getattr(stats, name) != expected[name]
+            ]
+            if diff:
+                self.stdout.write(f'User {user_id}: ' + ', '.join(diff))
+                mismatches += 1
+        return mismatches
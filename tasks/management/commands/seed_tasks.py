@@ -0,0 +1,33 @@
+"""
+Generate synthetic users and tasks for load testing.
+"""
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from tasks.seeding import create_users, seed_tasks, seed_usernames
+
+
+class Command(BaseCommand):
+    help = 'Bulk-create N users with M tasks each, using realistic status, priority and due date mixes.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Number of users to create.')
+        parser.add_argument('--tasks', type=int, default=1000, help='Tasks per user.')
+        parser.add_argument('--prefix', default='seed_user', help='Usernames are <prefix>_<n>.')
+        parser.add_argument('--password', help='Password for every seeded user (default: no login).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Tasks per INSERT.')
+        parser.add_argument('--seed', type=int, help='Random seed, for reproducible data.')
+    
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__in=seed_usernames(options['users'], prefix)).exists():
+            raise CommandError(f'Users named {prefix}_<n> already exist; pick another --prefix.')
+        
+        started = time.perf_counter()
+        with transaction.atomic():
+            users = create_users(options['users'], prefix, options['password'])
+            created = seed_tasks(users, options['tasks'], options['batch_size'], options['seed'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(users)} users and {created} tasks in {time.perf_counter() - started:.1f}s.'
+        ))
@@ -0,0 +1,260 @@
+"""
+Per-request instrumentation: SQL, template and response metrics.
+
+Enabled with ``TASK_METRICS=True``. Each request gets a RequestMetrics
+collector in a context variable, which survives the hop into
+``sync_to_async`` threads, so async views are measured too:
+
+* SQL: every database connection gets an execute wrapper when it is opened
+  (``connection_created``), counting queries and their duration.
+* Templates: the instrumented template backend times top-level renders,
+  minus any SQL issued from inside the template.
+* MetricsMiddleware adds a ``Server-Timing`` header, writes one structured
+  log line per request to the ``tasks.metrics`` logger and aggregates the
+  numbers per URL name in REGISTRY, served in Prometheus text format by the
+  ``metrics`` URL.
+
+The registry lives in the process; with several gunicorn workers each one
+reports its own share of the traffic.
+"""
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates
+
+
+logger = logging.getLogger('tasks.metrics')
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Timings collected while a single request is handled."""
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.render_depth = 0
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper that adds each query to the current request."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def install_query_hook(sender=None, connection=None, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install():
+    """Hook into current and future database connections."""
+    connection_created.connect(install_query_hook, dispatch_uid='tasks.metrics')
+    for connection in connections.all(initialized_only=True):
+        install_query_hook(connection=connection)
+
+
+class InstrumentedTemplate:
+    """Wraps a backend template to time its rendering."""
+    
+    def __init__(self, template):
+        self.template = template
+    
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+    
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return self.template.render(context, request)
+        # Templates rendered from inside another one (crispy forms, widgets)
+        # are part of the outer render
+        metrics.render_depth += 1
+        started, db_time = time.perf_counter(), metrics.db_time
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics.render_depth -= 1
+            if not metrics.render_depth:
+                elapsed = time.perf_counter() - started
+                metrics.render_time += elapsed - (metrics.db_time - db_time)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render timing for RequestMetrics."""
+    
+    def from_string(self, template_code):
+        return InstrumentedTemplate(super().from_string(template_code))
+    
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name))
+
+
+class MetricsRegistry:
+    """Thread-safe per-view aggregates, rendered in Prometheus text format."""
+    
+    PREFIX = 'taskmaster'
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        with self._lock:
+            self._requests = {}
+            self._views = {}
+    
+    def observe(self, view, method, status, record):
+        key = (view, method)
+        request_key = (view, method, str(status))
+        with self._lock:
+            self._requests[request_key] = self._requests.get(request_key, 0) + 1
+            stats = self._views.get(key)
+            if stats is None:
+                stats = self._views[key] = {
+                    'buckets': [0] * len(self.BUCKETS),
+                    'count': 0,
+                    'duration': 0.0,
+                    'db_queries': 0,
+                    'db_time': 0.0,
+                    'render_time': 0.0,
+                    'response_bytes': 0,
+                }
+            duration = record['duration_ms'] / 1000
+            for index, bound in enumerate(self.BUCKETS):
+                if duration <= bound:
+                    stats['buckets'][index] += 1
+            stats['count'] += 1
+            stats['duration'] += duration
+            stats['db_queries'] += record['db_queries']
+            stats['db_time'] += record['db_ms'] / 1000
+            stats['render_time'] += record['template_ms'] / 1000
+            stats['response_bytes'] += record['response_bytes'] or 0
+    
+    def render(self):
+        with self._lock:
+            requests = sorted(self._requests.items())
+            views = sorted(
+                (key, dict(stats, buckets=list(stats['buckets'])))
+                for key, stats in self._views.items()
+            )
+        
+        prefix = self.PREFIX
+        lines = [
+            f'# HELP {prefix}_requests_total Requests handled, by URL name, method and status.',
+            f'# TYPE {prefix}_requests_total counter',
+        ]
+        for (view, method, status), count in requests:
+            lines.append(f'{prefix}_requests_total{labels(view=view, method=method, status=status)} {count}')
+        
+        name = f'{prefix}_request_duration_seconds'
+        lines += [f'# HELP {name} Time to produce the response.', f'# TYPE {name} histogram']
+        for (view, method), stats in views:
+            for bound, count in zip(self.BUCKETS, stats['buckets']):
+                lines.append(f'{name}_bucket{labels(view=view, method=method, le=repr(bound))} {count}')
+            lines.append(f'{name}_bucket{labels(view=view, method=method, le="+Inf")} {stats["count"]}')
+            lines.append(f'{name}_sum{labels(view=view, method=method)} {stats["duration"]:.6f}')
+            lines.append(f'{name}_count{labels(view=view, method=method)} {stats["count"]}')
+        
+        counters = [
+            ('db_queries_total', 'db_queries', 'SQL queries executed.', '{}'),
+            ('db_duration_seconds_total', 'db_time', 'Time spent in SQL queries.', '{:.6f}'),
+            ('template_render_seconds_total', 'render_time', 'Time spent rendering templates.', '{:.6f}'),
+            ('response_bytes_total', 'response_bytes', 'Response body bytes.', '{}'),
+        ]
+        for suffix, field, help_text, fmt in counters:
+            name = f'{prefix}_{suffix}'
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for (view, method), stats in views:
+                lines.append(f'{name}{labels(view=view, method=method)} {fmt.format(stats[field])}')
+        return '\n'.join(lines) + '\n'
+
+
+def labels(**values):
+    """Format Prometheus labels, escaping backslashes, quotes and newlines."""
+    pairs = []
+    for key, value in values.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+REGISTRY = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """
+    Measure each request and report it as Server-Timing, a log line and metrics.
+    
+    Put it first in MIDDLEWARE so that it times the rest of the stack.
+    """
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+    
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+    
+    def finish(self, request, response, metrics):
+        duration = time.perf_counter() - metrics.started
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else None) or 'unmatched'
+        size = None if response.streaming else len(response.content)
+        record = {
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'db_queries': metrics.db_queries,
+            'db_ms': round(metrics.db_time * 1000, 3),
+            'template_ms': round(metrics.render_time * 1000, 3),
+            'response_bytes': size,
+        }
+        app_time = max(duration - metrics.db_time - metrics.render_time, 0)
+        response.headers['Server-Timing'] = ', '.join([
+            f'db;dur={record["db_ms"]};desc="{metrics.db_queries} queries"',
+            f'tpl;dur={record["template_ms"]}',
+            f'app;dur={app_time * 1000:.3f}',
+            f'total;dur={record["duration_ms"]}',
+        ])
+        logger.info(json.dumps(record), extra={'metrics': record})
+        REGISTRY.observe(view, request.method, response.status_code, record)
+        return response
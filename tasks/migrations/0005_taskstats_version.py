@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-18 04:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_task_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskstats',
+            name='changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='taskstats',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.0.2 on 2026-10-18 04:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+from tasks.search import install_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_task_sync'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # SQLite rebuilds tasks_task to add the generated column, which drops
+        # the full-text search triggers; reinstall them in both directions.
+        migrations.RunPython(migrations.RunPython.noop, install_search_index),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_user_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_user_due_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_user_title_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_user_status_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_user_priority_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_user_open_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_user_open_due_idx',
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='priority_rank',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(priority='low', then=models.Value(1)), models.When(priority='medium', then=models.Value(2)), models.When(priority='high', then=models.Value(3)), default=models.Value(0)), output_field=models.PositiveSmallIntegerField()),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='task_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'due_date', 'id'], name='task_user_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'title', 'id'], name='task_user_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', '-priority_rank', '-id'], name='task_user_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'status', '-created_at', '-id'], name='task_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'priority', '-created_at', '-id'], name='task_user_priority_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'completed'), _negated=True), fields=['user', '-created_at', '-id'], name='task_user_open_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'completed'), _negated=True), fields=['user', 'due_date', 'id'], name='task_user_open_due_idx'),
+        ),
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+    ]
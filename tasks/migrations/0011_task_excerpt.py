@@ -0,0 +1,50 @@
+# Generated by Django 5.0.2 on 2026-10-18 05:59
+
+from django.db import migrations, models
+
+from tasks.models import make_excerpt
+from tasks.search import install_search_index
+
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_excerpts(apps, schema_editor):
+    """Compute the excerpt of every existing task and archived task."""
+    for model_name in ('Task', 'ArchivedTask'):
+        model = apps.get_model('tasks', model_name)
+        rows = model.objects.exclude(description=None).exclude(description='').only('description').order_by('pk')
+        last_pk = 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_pk)[:BACKFILL_BATCH_SIZE])
+            if not batch:
+                break
+            for row in batch:
+                row.excerpt = make_excerpt(row.description)
+            model.objects.bulk_update(batch, ['excerpt'])
+            last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_task_archive'),
+    ]
+    
+    operations = [
+        # SQLite rebuilds tasks_task to add the column, which drops the
+        # full-text search triggers; reinstall them in both directions.
+        migrations.RunPython(migrations.RunPython.noop, install_search_index),
+        migrations.AddField(
+            model_name='archivedtask',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=300),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=300),
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,164 @@
 """
 Models for the tasks application.
 """
-from django.db import models
+from asgiref.sync import sync_to_async
+from django.db import models, router, transaction
+from django.db.models import Case, Count, F, Q, Value, When
 from django.contrib.auth.models import User
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.text import Truncator
+from .events import publish_task_event
+from .recurrence import MAX_RULE_LENGTH, RecurrenceRule
+
+
+# Task cards show the first EXCERPT_WORDS words of the description
+EXCERPT_WORDS = 20
+EXCERPT_LENGTH = 300
+
+
+def make_excerpt(description):
+    """Return the card excerpt of a task description."""
+    # The same text as the truncatewords filter, capped for very long words
+    excerpt = Truncator(description or '').words(EXCERPT_WORDS, truncate=' …')
+    return Truncator(excerpt).chars(EXCERPT_LENGTH)
+
+
+class TaskQuerySet(models.QuerySet):
+    """
+    QuerySet for tasks that keeps per-user statistics in sync on bulk writes.
+    """
+    
+    # Fields whose changes affect the counters stored in TaskStats
+    STATS_FIELDS = {'user', 'user_id', 'status', 'priority', 'due_date'}
+    
+    # The sort keys the task list accepts, each mapped to an ordering that
+    # one of the Task indexes serves; anything else gets DEFAULT_SORT.
+    SORT_ORDERINGS = {
+        '-created_at': ('-created_at', '-id'),
+        'created_at': ('created_at', 'id'),
+        # Undated tasks last on every backend, as in cursor mode
+        'due_date': (F('due_date').asc(nulls_last=True), 'id'),
+        '-priority': ('-priority_rank', '-id'),
+        'title': ('title', 'id'),
+    }
+    DEFAULT_SORT = '-created_at'
+    
+    def get_sort(self, params):
+        """Return the validated sort key from a query dict."""
+        sort_by = params.get('sort')
+        if sort_by == 'relevance' and params.get('search'):
+            return sort_by
+        return sort_by if sort_by in self.SORT_ORDERINGS else self.DEFAULT_SORT
+    
+    def filter_for_list(self, params):
+        """
+        Apply the task list filters, search and sort from a query dict.
+        """
+        queryset = self
+        
+        # Filter by status
+        status_filter = params.get('status')
+        if status_filter == 'active':
+            queryset = queryset.exclude(status='completed')
+        elif status_filter == 'completed':
+            queryset = queryset.filter(status='completed')
+        
+        # Filter by priority
+        priority_filter = params.get('priority')
+        if priority_filter:
+            queryset = queryset.filter(priority=priority_filter)
+        
+        # Search
+        search_query = params.get('search')
+        sort_by = self.get_sort(params)
+        if search_query:
+            from .search import search_tasks
+            queryset = search_tasks(queryset, search_query, rank=sort_by == 'relevance')
+        
+        # Sort
+        if sort_by == 'relevance':
+            return queryset.order_by('-search_rank', '-created_at')
+        return queryset.order_by(*self.SORT_ORDERINGS[sort_by])
+    
+    def _affected_user_ids(self):
+        return set(self.order_by().values_list('user_id', flat=True).distinct())
+    
+    def update(self, **kwargs):
+        """Update rows and refresh statistics for every affected user."""
+        user_ids = self._affected_user_ids()
+        new_user = kwargs.get('user', kwargs.get('user_id'))
+        if new_user is not None:
+            user_ids.add(getattr(new_user, 'pk', new_user))
+        # auto_now only applies to save(); cached task cards are keyed on it
+        kwargs.setdefault('updated_at', timezone.now())
+        description = kwargs.get('description')
+        if 'description' in kwargs and not hasattr(description, 'resolve_expression'):
+            kwargs.setdefault('excerpt', make_excerpt(description))
+        
+        rows = super().update(**kwargs)
+        if self.STATS_FIELDS.intersection(kwargs):
+            TaskStats.objects.rebuild(user_ids)
+        elif rows:
+            TaskStats.objects.touch(user_ids)
+        if rows:
+            for user_id in user_ids:
+                publish_task_event(user_id, 'refresh')
+        return rows
+    
+    def toggle_status(self, pk):
+        """
+        Flip a task between completed and pending with one targeted UPDATE.
+        
+        Returns the task's new values (title, status, completed_at, ...), or
+        None if no task in this queryset has the given pk.
+        """
+        fields = ('user_id', 'title', 'status', 'priority', 'due_date')
+        # The task and its owner's counters change together
+        with transaction.atomic():
+            while True:
+                row = self.filter(pk=pk).values(*fields).first()
+                if row is None:
+                    return None
+                now = timezone.now()
+                changes = {'status': 'completed', 'completed_at': now}
+                if row['status'] == 'completed':
+                    changes = {'status': 'pending', 'completed_at': None}
+                
+                # Only apply the change if nobody toggled the task in between
+                matched = super(TaskQuerySet, self.filter(pk=pk, status=row['status'])).update(
+                    updated_at=now,
+                    **changes
+                )
+                if matched:
+                    break
+            
+            old_state = {name: row[name] for name in ('user_id', 'status', 'priority', 'due_date')}
+            TaskStats.objects.apply_delta(old_state, {**old_state, 'status': changes['status']})
+            publish_task_event(row['user_id'], 'toggled', pk)
+        return {**row, **changes, 'pk': pk, 'updated_at': now}
+    
+    async def atoggle_status(self, pk):
+        return await sync_to_async(self.toggle_status)(pk)
+    
+    def bulk_create(self, objs, *args, update_stats=True, **kwargs):
+        """
+        Create rows in bulk and rebuild statistics for their owners.
+        
+        Callers that pass update_stats=False must update TaskStats
+        themselves, e.g. with TaskStats.objects.add_tasks().
+        """
+        objs = list(objs)
+        for obj in objs:
+            obj.excerpt = make_excerpt(obj.description)
+        objs = super().bulk_create(objs, *args, **kwargs)
+        user_ids = {obj.user_id for obj in objs}
+        if update_stats:
+            TaskStats.objects.rebuild(user_ids)
+        for user_id in user_ids:
+            publish_task_event(user_id, 'refresh')
+        return objs
 
 
 class Task(models.Model):
@@ -26,10 +181,14 @@ class Task(models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='tasks'
+        related_name='tasks',
+        # Covered by the leading column of the composite indexes below
+        db_index=False
     )
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
+    # Start of the description for list pages, which defer the full text
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, default='', editable=False)
     priority = models.CharField(
         max_length=10,
         choices=PRIORITY_CHOICES,
@@ -44,15 +203,96 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(blank=True, null=True)
+    # An occurrence of a recurring task, stored once it was edited or completed
+    series = models.ForeignKey(
+        'TaskSeries',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='tasks',
+        editable=False,
+        # Covered by the leading column of the unique constraint below
+        db_index=False
+    )
+    occurrence_date = models.DateField(blank=True, null=True, editable=False)
+    # Sortable priority (low=1, medium=2, high=3), computed by the database
+    priority_rank = models.GeneratedField(
+        expression=Case(
+            When(priority='low', then=Value(1)),
+            When(priority='medium', then=Value(2)),
+            When(priority='high', then=Value(3)),
+            default=Value(0),
+        ),
+        output_field=models.PositiveSmallIntegerField(),
+        db_persist=True,
+    )
+    
+    objects = TaskQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Task'
         verbose_name_plural = 'Tasks'
+        # One index per task list access path: every query is scoped to a
+        # user, then filtered by status/priority and ordered by a sort key,
+        # with id as the tiebreaker in the same direction.
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='task_user_created_idx'),
+            models.Index(fields=['user', 'due_date', 'id'], name='task_user_due_idx'),
+            models.Index(fields=['user', 'title', 'id'], name='task_user_title_idx'),
+            models.Index(fields=['user', '-priority_rank', '-id'], name='task_user_rank_idx'),
+            models.Index(fields=['user', 'status', '-created_at', '-id'], name='task_user_status_idx'),
+            models.Index(fields=['user', 'priority', '-created_at', '-id'], name='task_user_priority_idx'),
+            # Delta sync reads changes in (updated_at, id) order
+            models.Index(fields=['user', 'updated_at', 'id'], name='task_user_updated_idx'),
+            # Partial indexes for the "active" filter and the overdue count;
+            # backends without partial index support skip these.
+            models.Index(
+                fields=['user', '-created_at', '-id'],
+                condition=~Q(status='completed'),
+                name='task_user_open_created_idx'
+            ),
+            models.Index(
+                fields=['user', 'due_date', 'id'],
+                condition=~Q(status='completed'),
+                name='task_user_open_due_idx'
+            ),
+        ]
+        constraints = [
+            # An occurrence is materialized at most once
+            models.UniqueConstraint(fields=['series', 'occurrence_date'], name='task_series_occurrence_uniq'),
+        ]
     
     def __str__(self):
         return self.title
     
+    def save(self, *args, **kwargs):
+        # A deferred description is unchanged, and so is its excerpt
+        if 'description' in self.__dict__:
+            self.excerpt = make_excerpt(self.description)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'description' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the persisted state so saves can apply counter deltas
+        instance._stats_state = instance.stats_state()
+        return instance
+    
+    def stats_state(self):
+        """
+        Return the fields that TaskStats counts, or None if any is deferred.
+        """
+        names = ('user_id', 'status', 'priority', 'due_date')
+        if any(name not in self.__dict__ for name in names):
+            return None
+        state = {name: self.__dict__[name] for name in names}
+        state['due_date'] = self._meta.get_field('due_date').to_python(state['due_date'])
+        return state
+    
     def mark_completed(self):
         """Mark task as completed."""
         self.status = 'completed'
@@ -78,6 +318,164 @@ class Task(models.Model):
         return self.status == 'completed'
 
 
+class TaskSeries(models.Model):
+    """
+    A recurring task: the values of its occurrences and a recurrence rule.
+    
+    Occurrences are not stored. tasks.series expands the ones in the window
+    being viewed, and turns an occurrence into a Task (with series and
+    occurrence_date set) when it is edited or completed. Skipped dates and
+    deleted occurrences are kept in exdates.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='task_series'
+    )
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True, null=True)
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, default='', editable=False)
+    priority = models.CharField(max_length=10, choices=Task.PRIORITY_CHOICES, default='medium')
+    # An RRULE subset, see tasks.recurrence; fixed once the series exists
+    rule = models.CharField(max_length=MAX_RULE_LENGTH)
+    start_date = models.DateField()
+    # ISO dates of occurrences that were skipped or deleted
+    exdates = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['start_date', 'id']
+        verbose_name = 'Task Series'
+        verbose_name_plural = 'Task Series'
+    
+    def __str__(self):
+        return self.title
+    
+    def save(self, *args, **kwargs):
+        if 'description' in self.__dict__:
+            self.excerpt = make_excerpt(self.description)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'description' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
+    
+    @cached_property
+    def recurrence(self):
+        return RecurrenceRule.parse(self.rule)
+    
+    def dates(self, first, last):
+        """Yield the dates of the series within [first, last], without skipped ones."""
+        skipped = set(self.exdates)
+        for day in self.recurrence.between(self.start_date, first, last):
+            if day.isoformat() not in skipped:
+                yield day
+    
+    def occurs_on(self, day):
+        return next(self.dates(day, day), None) is not None
+    
+    def task_values(self, day):
+        """The fields of a Task for the occurrence on day."""
+        return {
+            'user_id': self.user_id,
+            'title': self.title,
+            'description': self.description,
+            'priority': self.priority,
+            'due_date': day,
+            'series': self,
+            'occurrence_date': day,
+        }
+
+
+class ArchivedTask(models.Model):
+    """
+    A completed task moved out of the task table by tasks.archive.
+    
+    Rows keep the id, owner and values of the task they were moved from.
+    """
+    
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_tasks',
+        # Covered by the leading column of the index below
+        db_index=False
+    )
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True, null=True)
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, default='', editable=False)
+    priority = models.CharField(max_length=10, choices=Task.PRIORITY_CHOICES, default='medium')
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES, default='completed')
+    due_date = models.DateField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    completed_at = models.DateTimeField(blank=True, null=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-completed_at', '-id']
+        verbose_name = 'Archived Task'
+        verbose_name_plural = 'Archived Tasks'
+        indexes = [
+            models.Index(fields=['user', '-completed_at', '-id'], name='archive_user_completed_idx'),
+        ]
+    
+    def __str__(self):
+        return self.title
+    
+    # Archived tasks are completed, so never overdue
+    is_overdue = False
+    is_completed = True
+
+
+class TaskTombstone(models.Model):
+    """
+    Record of a deleted task, so that sync clients can drop their copy.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='task_tombstones',
+        # Covered by the leading column of the index below
+        db_index=False
+    )
+    task_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'Task Tombstone'
+        verbose_name_plural = 'Task Tombstones'
+        indexes = [
+            models.Index(fields=['user', 'deleted_at', 'id'], name='tombstone_user_deleted_idx'),
+        ]
+    
+    def __str__(self):
+        return f'Deleted task {self.task_id}'
+
+
+class AccountDeletion(models.Model):
+    """
+    A user account being deleted in the background by tasks.deletion.
+    
+    The row goes together with the user, so one that remains is unfinished.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='account_deletion'
+    )
+    requested_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'Account Deletion'
+        verbose_name_plural = 'Account Deletions'
+    
+    def __str__(self):
+        return f'Deletion of user {self.user_id}'
+
+
 class UserProfile(models.Model):
     """
     Extended user profile model.
@@ -93,6 +491,9 @@ class UserProfile(models.Model):
         blank=True,
         null=True
     )
+    # Resized copies of the avatar, written by tasks.thumbnails:
+    # {'source': <avatar name>, 'files': {<extension>: {<size>: <name>}}}
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)
     phone_number = models.CharField(max_length=20, blank=True)
     birth_date = models.DateField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -109,3 +510,267 @@ class UserProfile(models.Model):
     def full_name(self):
         """Get full name of user."""
         return f"{self.user.first_name} {self.user.last_name}".strip() or self.user.username
+    
+    @property
+    def avatar_variants_ready(self):
+        """Whether the stored variants were made from the current avatar."""
+        return bool(self.avatar) and self.avatar_variants.get('source') == self.avatar.name
+    
+    @property
+    def avatar_thumbnails(self):
+        """
+        URLs of the avatar variants as {extension: {size: url}}, or None.
+        
+        None while the variants of a new upload are still being generated.
+        """
+        if not self.avatar_variants_ready:
+            return None
+        return {
+            extension: {
+                size: reverse('avatar-thumbnail', kwargs={'name': name.rsplit('/', 1)[-1]})
+                for size, name in names.items()
+            }
+            for extension, names in self.avatar_variants['files'].items()
+        }
+
+
+class TaskStatsManager(models.Manager):
+    """
+    Manager that reads, rebuilds and incrementally updates TaskStats rows.
+    """
+    
+    def for_user(self, user):
+        """
+        Return the statistics row for a user in a single lookup.
+        
+        A missing row is rebuilt from the task table, and the overdue counter
+        is recounted once per day because it depends on the current date.
+        Virtual occurrences of recurring tasks are added to the counters of
+        the returned instance (see with_occurrences()).
+        """
+        today = timezone.now().date()
+        stats = self.filter(user=user).first()
+        if stats is None:
+            self.rebuild([user.pk])
+            # A replica may not have the new row yet
+            stats = self.db_manager(router.db_for_write(TaskStats)).get(user=user)
+        elif stats.overdue_as_of != today:
+            stats.overdue_count = Task.objects.db_manager(router.db_for_write(Task)).filter(
+                user=user, due_date__lt=today
+            ).exclude(status='completed').count()
+            stats.overdue_as_of = today
+            self.filter(pk=stats.pk).update(
+                overdue_count=stats.overdue_count,
+                overdue_as_of=today,
+            )
+        return self.with_occurrences(stats, today)
+    
+    async def afor_user(self, user):
+        """Async variant of for_user(); the common case is one async query."""
+        stats = await self.filter(user=user).afirst()
+        if stats is None or stats.overdue_as_of != timezone.now().date() or stats.series_count:
+            return await sync_to_async(self.for_user)(user)
+        return stats
+    
+    def with_occurrences(self, stats, today):
+        """
+        Add the user's virtual occurrences to the counters of stats.
+        
+        Only the instance changes: stored counters cover the task table,
+        while occurrences depend on the date and are cheap to expand for
+        the bounded window that tasks.series counts. Users without series
+        skip the queries.
+        """
+        if stats.series_count:
+            from .series import occurrence_counts
+            for name, count in occurrence_counts(stats.user_id, today).items():
+                setattr(stats, name, getattr(stats, name) + count)
+        return stats
+    
+    def compute(self, user_ids):
+        """Aggregate fresh counters for the given users in one grouped query."""
+        today = timezone.now().date()
+        # The counters are stored on the primary, so count what it holds
+        rows = (
+            Task.objects.db_manager(router.db_for_write(Task))
+            .filter(user_id__in=user_ids)
+            .order_by()
+            .values('user_id')
+            .annotate(
+                total_count=Count('id'),
+                completed_count=Count('id', filter=Q(status='completed')),
+                pending_count=Count('id', filter=Q(status='pending')),
+                high_priority_count=Count('id', filter=Q(priority='high')),
+                overdue_count=Count(
+                    'id',
+                    filter=Q(due_date__lt=today) & ~Q(status='completed')
+                ),
+            )
+        )
+        archived = dict(
+            ArchivedTask.objects.db_manager(router.db_for_write(ArchivedTask))
+            .filter(user_id__in=user_ids)
+            .order_by()
+            .values('user_id')
+            .annotate(count=Count('id'))
+            .values_list('user_id', 'count')
+        )
+        series = dict(
+            TaskSeries.objects.db_manager(router.db_for_write(TaskSeries))
+            .filter(user_id__in=user_ids)
+            .order_by()
+            .values('user_id')
+            .annotate(count=Count('id'))
+            .values_list('user_id', 'count')
+        )
+        counters = {user_id: dict.fromkeys(TaskStats.COUNTER_FIELDS, 0) for user_id in user_ids}
+        for row in rows:
+            counters[row.pop('user_id')] = row
+        for user_id, values in counters.items():
+            values['overdue_as_of'] = today
+            values['archived_count'] = archived.get(user_id, 0)
+            values['series_count'] = series.get(user_id, 0)
+        return counters
+    
+    def rebuild(self, user_ids):
+        """Recompute and store the counters for the given users."""
+        now = timezone.now()
+        for user_id, values in self.compute(set(user_ids)).items():
+            self.update_or_create(
+                user_id=user_id,
+                defaults={**values, 'version': F('version') + 1, 'changed_at': now},
+                create_defaults={**values, 'changed_at': now},
+            )
+    
+    def touch(self, user_ids):
+        """Record that the users' tasks changed without affecting counters."""
+        self.filter(user_id__in=user_ids).update(
+            version=F('version') + 1,
+            changed_at=timezone.now(),
+        )
+    
+    def add_tasks(self, tasks):
+        """
+        Add newly created tasks to their owners' counters, one UPDATE per owner.
+        
+        Unlike rebuild(), the cost depends on the number of new tasks rather
+        than on the size of the task table.
+        """
+        today = timezone.now().date()
+        totals = {}
+        for task in tasks:
+            contributions = TaskStats.contributions(task.stats_state(), today)
+            user_totals = totals.setdefault(task.user_id, dict.fromkeys(TaskStats.COUNTER_FIELDS, 0))
+            for name, value in contributions.items():
+                user_totals[name] += value
+        
+        for user_id, deltas in totals.items():
+            self.update_counters(user_id, deltas, today)
+    
+    def apply_delta(self, old_state, new_state):
+        """
+        Adjust counters for a single task moving from old_state to new_state.
+        
+        Either state may be None for a created or deleted task. Rows that do
+        not exist yet are left alone; they are rebuilt on the next read.
+        """
+        if old_state and new_state and old_state['user_id'] != new_state['user_id']:
+            self.apply_delta(old_state, None)
+            self.apply_delta(None, new_state)
+            return
+        
+        today = timezone.now().date()
+        old = TaskStats.contributions(old_state, today)
+        new = TaskStats.contributions(new_state, today)
+        deltas = {name: new[name] - old[name] for name in TaskStats.COUNTER_FIELDS}
+        self.update_counters((new_state or old_state)['user_id'], deltas, today)
+    
+    def update_counters(self, user_id, deltas, today):
+        """Add deltas to a user's counters and bump the version."""
+        deltas = dict(deltas)
+        overdue_delta = deltas.pop('overdue_count')
+        changes = {name: F(name) + delta for name, delta in deltas.items() if delta}
+        # Every write bumps the version, even one that leaves counters as they are
+        changes['version'] = F('version') + 1
+        changes['changed_at'] = timezone.now()
+        if overdue_delta:
+            # The overdue counter is only valid for the day it was computed on
+            changes['overdue_count'] = Case(
+                When(overdue_as_of=today, then=F('overdue_count') + overdue_delta),
+                default=F('overdue_count'),
+            )
+        self.filter(user_id=user_id).update(**changes)
+
+
+class TaskStats(models.Model):
+    """
+    Per-user task counters, maintained on every task write.
+    """
+    
+    COUNTER_FIELDS = (
+        'total_count',
+        'completed_count',
+        'pending_count',
+        'high_priority_count',
+        'overdue_count',
+    )
+    
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='task_stats'
+    )
+    total_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+    pending_count = models.IntegerField(default=0)
+    high_priority_count = models.IntegerField(default=0)
+    overdue_count = models.IntegerField(default=0)
+    overdue_as_of = models.DateField(blank=True, null=True)
+    # Tasks moved to ArchivedTask; the counters above only cover the task table
+    archived_count = models.IntegerField(default=0)
+    # Recurring task series; their virtual occurrences are counted on read
+    series_count = models.IntegerField(default=0)
+    # Bumped on every write to the user's tasks, including deletes; used as
+    # the validator for conditional GETs and as a cache version.
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(blank=True, null=True)
+    
+    objects = TaskStatsManager()
+    
+    class Meta:
+        verbose_name = 'Task Statistics'
+        verbose_name_plural = 'Task Statistics'
+    
+    def __str__(self):
+        return f"{self.user.username}'s Task Statistics"
+    
+    @property
+    def active_count(self):
+        """Number of tasks that are not completed."""
+        return self.total_count - self.completed_count
+    
+    @property
+    def total_with_archived(self):
+        """Number of tasks, including archived ones."""
+        return self.total_count + self.archived_count
+    
+    @property
+    def completed_with_archived(self):
+        """Number of completed tasks, including archived ones."""
+        return self.completed_count + self.archived_count
+    
+    @staticmethod
+    def contributions(state, today):
+        """Return how much a task in the given state adds to each counter."""
+        if state is None:
+            return dict.fromkeys(TaskStats.COUNTER_FIELDS, 0)
+        due_date = state['due_date']
+        return {
+            'total_count': 1,
+            'completed_count': int(state['status'] == 'completed'),
+            'pending_count': int(state['status'] == 'pending'),
+            'high_priority_count': int(state['priority'] == 'high'),
+            'overdue_count': int(
+                bool(due_date) and state['status'] != 'completed' and due_date < today
+            ),
+        }
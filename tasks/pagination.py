@@ -0,0 +1,260 @@
+"""
+Keyset (cursor) pagination for task querysets.
+
+Instead of ``OFFSET n`` and a ``COUNT(*)`` per page, each page is fetched
+with a ``WHERE (sort_key, id) > (last_sort_key, last_id)`` predicate that
+the composite indexes on Task can satisfy directly, so deep pages cost the
+same as the first one. The row-value comparison is spelled out as an OR
+plus a redundant range bound on the sort key, which is what lets SQLite
+seek instead of scanning from the start.
+"""
+import base64
+import binascii
+import json
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import F, OrderBy, Q
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded for the current ordering."""
+
+
+class KeysetPage:
+    """A page of results with opaque cursors for its neighbours."""
+    
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+    
+    def __iter__(self):
+        return iter(self.object_list)
+    
+    def __len__(self):
+        return len(self.object_list)
+    
+    def has_next(self):
+        return self.next_cursor is not None
+    
+    def has_previous(self):
+        return self.previous_cursor is not None
+    
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset on a single sort field with ``pk`` as tiebreaker.
+    
+    NULL sort values are always placed last so that the page boundaries are
+    the same on every database backend.
+    """
+    
+    def __init__(self, queryset, per_page, ordering=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        if ordering is None:
+            order_by = queryset.query.order_by or queryset.model._meta.ordering
+            ordering = order_by[0] if order_by else 'pk'
+        if isinstance(ordering, OrderBy):
+            # e.g. F('due_date').asc(nulls_last=True); NULLs always go last here
+            self.descending = ordering.descending
+            self.field_name = ordering.expression.name
+        else:
+            self.descending = ordering.startswith('-')
+            self.field_name = ordering.lstrip('-')
+        try:
+            self.field = queryset.model._meta.get_field(self.field_name)
+        except FieldDoesNotExist:
+            raise ValueError(f'Cannot paginate on unknown field {self.field_name!r}.')
+        if self.field.is_relation:
+            raise ValueError(f'Cannot paginate on relation {self.field_name!r}.')
+    
+    @property
+    def count(self):
+        """Exact number of rows; only evaluated when a template asks for it."""
+        if not hasattr(self, '_count'):
+            self._count = self.queryset.count()
+        return self._count
+    
+    def encode_cursor(self, obj, direction):
+        value = getattr(obj, self.field.attname)
+        if value is not None and not isinstance(value, (str, int, float)):
+            value = value.isoformat()
+        payload = json.dumps([direction, value, obj.pk], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+    
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if direction not in ('next', 'previous') or not isinstance(pk, int):
+                raise ValueError
+            if value is not None:
+                value = self.field.to_python(value)
+        except (ValueError, TypeError, binascii.Error, ValidationError) as exc:
+            raise InvalidCursor(str(exc)) from exc
+        return direction, value, pk
+    
+    def _ordering(self, reverse=False):
+        descending = self.descending != reverse
+        expression = F(self.field_name)
+        if self.field.null:
+            # Nulls last going forward means nulls first when walking back
+            nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+            expression = expression.desc(**nulls) if descending else expression.asc(**nulls)
+        else:
+            expression = expression.desc() if descending else expression.asc()
+        return [expression, '-pk' if descending else 'pk']
+    
+    def _beyond(self, value, pk, op):
+        """
+        Non-NULL rows past (value, pk) in the direction of op ('lt' or 'gt').
+        
+        The redundant ``field <= value`` (or ``>=``) bound is implied by the
+        OR, but SQLite cannot seek on the OR alone: without it every earlier
+        row of the user is scanned and deep pages get slower linearly.
+        """
+        name = self.field_name
+        condition = Q(**{f'{name}__{op}': value}) | Q(**{name: value, f'pk__{op}': pk})
+        return condition & Q(**{f'{name}__{op[0]}te': value})
+    
+    def _after(self, value, pk):
+        """Rows that follow (value, pk) in the forward ordering."""
+        op = 'lt' if self.descending else 'gt'
+        name = self.field_name
+        if value is None:
+            return Q(**{f'{name}__isnull': True, f'pk__{op}': pk})
+        condition = self._beyond(value, pk, op)
+        if self.field.null:
+            condition |= Q(**{f'{name}__isnull': True})
+        return condition
+    
+    def _before(self, value, pk):
+        """Rows that precede (value, pk) in the forward ordering."""
+        op = 'gt' if self.descending else 'lt'
+        name = self.field_name
+        if value is None:
+            return Q(**{f'{name}__isnull': False}) | Q(**{f'{name}__isnull': True, f'pk__{op}': pk})
+        return self._beyond(value, pk, op)
+    
+    def page_queryset(self, cursor=None):
+        """
+        Return (queryset, direction, had_cursor) for the requested page.
+        
+        The queryset fetches one extra row to detect whether more rows exist.
+        """
+        direction, had_cursor = 'next', False
+        queryset = self.queryset
+        if cursor:
+            try:
+                direction, value, pk = self.decode_cursor(cursor)
+            except InvalidCursor:
+                direction = 'next'
+            else:
+                had_cursor = True
+                condition = self._after(value, pk) if direction == 'next' else self._before(value, pk)
+                queryset = queryset.filter(condition)
+        queryset = queryset.order_by(*self._ordering(reverse=direction == 'previous'))
+        return queryset[:self.per_page + 1], direction, had_cursor
+    
+    def build_page(self, rows, direction, had_cursor):
+        """Turn the rows fetched by page_queryset() into a KeysetPage."""
+        rows = list(rows)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == 'previous':
+            rows.reverse()
+            has_next, has_previous = had_cursor, has_more
+        else:
+            has_next, has_previous = has_more, had_cursor
+        
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1], 'next')
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0], 'previous')
+        return KeysetPage(rows, self, next_cursor, previous_cursor)
+    
+    def page(self, cursor=None):
+        """Return the page following (or preceding) the given cursor."""
+        return self.build_page(*self.page_queryset(cursor))
+
+
+class CountQuerysetPaginator(Paginator):
+    """
+    Offset paginator that counts rows with a separate, cheaper queryset.
+    
+    Used for relevance-ranked search, where the ranking join makes a plain
+    COUNT(*) much slower than counting the unranked matches.
+    """
+    
+    def __init__(self, object_list, per_page, count_queryset=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_queryset = count_queryset
+    
+    @cached_property
+    def count(self):
+        if self.count_queryset is None:
+            return super().count
+        return self.count_queryset.count()
+
+
+def estimate_row_count(model, using='default'):
+    """
+    Return the database's own estimate of a table's size, or None.
+    
+    PostgreSQL and MySQL keep one up to date; SQLite only has one once
+    ANALYZE has been run (it is stored in sqlite_stat1).
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+            # -1 until the table has been vacuumed or analyzed
+            return row[0] if row and row[0] >= 0 else None
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s',
+                [table]
+            )
+            row = cursor.fetchone()
+            return row[0] if row else None
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+            except DatabaseError:
+                return None
+            # Each row starts with the number of entries in one index; partial
+            # indexes have fewer, so the largest is the table size
+            sizes = [int(stat.split()[0]) for stat, in cursor.fetchall()]
+            return max(sizes) if sizes else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Offset paginator that trusts the database's row estimate for whole tables.
+    
+    Counting every row of a large table is a full scan on most backends.
+    Unfiltered querysets on tables of at least ESTIMATE_THRESHOLD rows use
+    estimate_row_count() instead; filtered or small ones are counted exactly.
+    """
+    ESTIMATE_THRESHOLD = 100000
+    
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
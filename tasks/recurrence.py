@@ -0,0 +1,225 @@
+"""
+Recurrence rules for recurring tasks.
+
+A TaskSeries stores its rule once, as a subset of the iCalendar RRULE
+syntax (RFC 5545):
+
+* ``FREQ``: ``DAILY``, ``WEEKLY`` or ``MONTHLY``,
+* ``INTERVAL``: every n days, weeks or months (default 1),
+* ``BYDAY`` (weekly only): weekdays such as ``MO,WE,FR``,
+* ``BYMONTHDAY`` (monthly only): days of the month, negative counting
+  from the end, so ``-1`` is the last day,
+* ``COUNT`` or ``UNTIL`` (a date, ``YYYYMMDD``) to end the series.
+
+Weeks start on Monday. Days that a month does not have are skipped, as
+RFC 5545 prescribes, so ``BYMONTHDAY=31`` only occurs in long months.
+
+Occurrences are never stored as a whole; RecurrenceRule.between() yields
+the dates inside the window being looked at, skipping straight to it.
+"""
+import calendar
+from datetime import date, timedelta
+
+
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+
+# The repeat choices of the task form
+PRESETS = {
+    'daily': 'FREQ=DAILY',
+    'weekly': 'FREQ=WEEKLY',
+    'monthly': 'FREQ=MONTHLY',
+}
+
+# Stored rules are canonical, so they always fit
+MAX_RULE_LENGTH = 200
+MAX_INTERVAL = 1000
+MAX_COUNT = 10000
+
+
+class InvalidRule(ValueError):
+    """The rule is malformed or outside the supported subset."""
+
+
+class RecurrenceRule:
+    """A parsed recurrence rule; see the module docstring for the syntax."""
+    
+    def __init__(self, freq, interval=1, byday=(), bymonthday=(), count=None, until=None):
+        self.freq = freq
+        self.interval = interval
+        self.byday = tuple(sorted(set(byday)))
+        self.bymonthday = tuple(sorted(set(bymonthday)))
+        self.count = count
+        self.until = until
+    
+    @classmethod
+    def parse(cls, text):
+        """Parse a rule such as ``FREQ=WEEKLY;BYDAY=MO,TH``; raises InvalidRule."""
+        text = (text or '').strip()
+        if text.upper().startswith('RRULE:'):
+            text = text[6:]
+        parts = {}
+        for part in filter(None, text.upper().split(';')):
+            name, sep, value = part.partition('=')
+            if not sep or not value:
+                raise InvalidRule(f'Expected NAME=VALUE, got "{part}".')
+            if name in parts:
+                raise InvalidRule(f'{name} is given twice.')
+            parts[name] = value
+        
+        freq = parts.pop('FREQ', None)
+        if freq not in FREQUENCIES:
+            raise InvalidRule('FREQ must be DAILY, WEEKLY or MONTHLY.')
+        interval = cls.parse_int(parts.pop('INTERVAL', '1'), 'INTERVAL', 1, MAX_INTERVAL)
+        byday = ()
+        if 'BYDAY' in parts:
+            if freq != 'WEEKLY':
+                raise InvalidRule('BYDAY is only supported with FREQ=WEEKLY.')
+            days = parts.pop('BYDAY').split(',')
+            if any(day not in WEEKDAYS for day in days):
+                raise InvalidRule('BYDAY takes weekdays: MO, TU, WE, TH, FR, SA, SU.')
+            byday = [WEEKDAYS.index(day) for day in days]
+        bymonthday = ()
+        if 'BYMONTHDAY' in parts:
+            if freq != 'MONTHLY':
+                raise InvalidRule('BYMONTHDAY is only supported with FREQ=MONTHLY.')
+            bymonthday = [cls.parse_int(day, 'BYMONTHDAY', -31, 31) for day in parts.pop('BYMONTHDAY').split(',')]
+            if 0 in bymonthday:
+                raise InvalidRule('BYMONTHDAY must be between 1 and 31, or -31 and -1.')
+        count = until = None
+        if 'COUNT' in parts:
+            count = cls.parse_int(parts.pop('COUNT'), 'COUNT', 1, MAX_COUNT)
+        if 'UNTIL' in parts:
+            if count is not None:
+                raise InvalidRule('COUNT and UNTIL cannot be combined.')
+            value = parts.pop('UNTIL')
+            try:
+                # Any time of day is ignored; tasks are due on dates
+                until = date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+            except ValueError:
+                raise InvalidRule('UNTIL must be a date written as YYYYMMDD.') from None
+        if parts:
+            raise InvalidRule(f'Unsupported rule part(s): {", ".join(sorted(parts))}.')
+        return cls(freq, interval, byday, bymonthday, count, until)
+    
+    @staticmethod
+    def parse_int(value, name, low, high):
+        try:
+            number = int(value)
+        except ValueError:
+            raise InvalidRule(f'{name} must be a number.') from None
+        if not low <= number <= high:
+            raise InvalidRule(f'{name} must be between {low} and {high}.')
+        return number
+    
+    def __str__(self):
+        parts = [f'FREQ={self.freq}']
+        if self.interval != 1:
+            parts.append(f'INTERVAL={self.interval}')
+        if self.byday:
+            parts.append('BYDAY=' + ','.join(WEEKDAYS[day] for day in self.byday))
+        if self.bymonthday:
+            parts.append('BYMONTHDAY=' + ','.join(map(str, self.bymonthday)))
+        if self.count is not None:
+            parts.append(f'COUNT={self.count}')
+        if self.until is not None:
+            parts.append(f'UNTIL={self.until:%Y%m%d}')
+        return ';'.join(parts)
+    
+    def describe(self):
+        """The rule in words, e.g. "Every 2 weeks on Mon, Thu"."""
+        unit = {'DAILY': 'day', 'WEEKLY': 'week', 'MONTHLY': 'month'}[self.freq]
+        text = f'Every {self.interval} {unit}s' if self.interval != 1 else f'Every {unit}'
+        if self.byday:
+            text += ' on ' + ', '.join(calendar.day_abbr[day] for day in self.byday)
+        if self.bymonthday:
+            text += ' on the ' + ', '.join(
+                ordinal(day) if day > 0 else 'last day' if day == -1 else f'{ordinal(-day)} to last day'
+                for day in self.bymonthday
+            )
+        if self.count is not None:
+            text += f', {self.count} time{"s" if self.count != 1 else ""}'
+        if self.until is not None:
+            text += f', until {self.until:%b %d, %Y}'
+        return text
+    
+    def between(self, start, first, last):
+        """
+        Yield the dates of a series starting on start that fall within [first, last].
+        
+        Without COUNT, expansion begins at the period containing first, so
+        the cost depends on the size of the window, not its distance from
+        start. COUNT is counted from start, so those series are walked from
+        the beginning.
+        """
+        if self.until is not None:
+            last = min(last, self.until)
+        if last < max(start, first):
+            return
+        period = 0 if self.count is not None else self.first_period(start, max(first, start))
+        remaining = self.count
+        while True:
+            period_start, days = self.period(start, period)
+            if period_start > last:
+                return
+            for day in days:
+                if day < start:
+                    continue
+                if day > last:
+                    return
+                if day >= first:
+                    yield day
+                if remaining is not None:
+                    remaining -= 1
+                    if not remaining:
+                        return
+            period += 1
+    
+    def first_period(self, start, first):
+        """The index of the period that contains first."""
+        if self.freq == 'DAILY':
+            return (first - start).days // self.interval
+        if self.freq == 'WEEKLY':
+            weeks = (week_start(first) - week_start(start)).days // 7
+            return weeks // self.interval
+        months = month_index(first) - month_index(start)
+        return months // self.interval
+    
+    def period(self, start, index):
+        """The first day of the index-th period of a series and its dates, in order."""
+        if self.freq == 'DAILY':
+            day = start + timedelta(days=index * self.interval)
+            return day, (day,)
+        if self.freq == 'WEEKLY':
+            monday = week_start(start) + timedelta(weeks=index * self.interval)
+            weekdays = self.byday or (start.weekday(),)
+            return monday, [monday + timedelta(days=weekday) for weekday in weekdays]
+        year, month = divmod(month_index(start) + index * self.interval, 12)
+        month += 1
+        length = calendar.monthrange(year, month)[1]
+        days = set()
+        for day in self.bymonthday or (start.day,):
+            if day < 0:
+                day += length + 1
+            if 1 <= day <= length:
+                days.add(day)
+        return date(year, month, 1), [date(year, month, day) for day in sorted(days)]
+
+
+def week_start(day):
+    """The Monday of the week containing day."""
+    return day - timedelta(days=day.weekday())
+
+
+def month_index(day):
+    return day.year * 12 + day.month - 1
+
+
+def ordinal(number):
+    suffix = 'th' if 10 <= number % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(number % 10, 'th')
+    return f'{number}{suffix}'
+
+
+def parse_rule(text):
+    """Parse a rule or a preset name (see PRESETS); raises InvalidRule."""
+    return RecurrenceRule.parse(PRESETS.get(text, text))
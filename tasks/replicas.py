@@ -0,0 +1,112 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+Database routers do not see the request, so ReplicaRoutingMiddleware puts a
+RoutingState in a context variable for every request. It switches the
+request to the replica (``settings.REPLICA_DATABASE``) when:
+
+* the view opts in with ``replica_reads = True``,
+* the method is GET or HEAD, and
+* the client has not written recently.
+
+Any other method sets a short-lived cookie that pins the client to the
+primary for ``REPLICA_PIN_SECONDS``. Replicas lag behind, and without the
+pin a user who just added a task could be redirected to a list that does
+not show it yet. The cookie travels with the client, so the pin holds
+whichever worker handles its next request.
+
+PrimaryReplicaRouter sends reads to the replica while the state allows
+it. Writes, and reads that are part of a write (``get_or_create``,
+``select_for_update``), always go to the primary. Without a replica
+configured both are no-ops.
+"""
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+
+PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_state = ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    """Whether the current request may read from the replica."""
+    
+    def __init__(self):
+        self.use_replica = False
+
+
+class PrimaryReplicaRouter:
+    """Send reads to the replica for requests that allow it."""
+    
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if settings.REPLICA_DATABASE and state is not None and state.use_replica:
+            return settings.REPLICA_DATABASE
+        return None
+    
+    def db_for_write(self, model, **hints):
+        return 'default'
+    
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        aliases = {'default', settings.REPLICA_DATABASE}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+    
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives its schema through replication
+        if settings.REPLICA_DATABASE and db == settings.REPLICA_DATABASE:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Choose the database for each request and pin clients that write."""
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _state.set(RoutingState())
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin(request, response)
+    
+    async def __acall__(self, request):
+        token = _state.set(RoutingState())
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin(request, response)
+    
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, 'view_class', view_func)
+        _state.get().use_replica = bool(
+            settings.REPLICA_DATABASE and
+            getattr(view, 'replica_reads', False) and
+            request.method in SAFE_METHODS and
+            PIN_COOKIE not in request.COOKIES
+        )
+    
+    def pin(self, request, response):
+        if settings.REPLICA_DATABASE and request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
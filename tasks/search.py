@@ -0,0 +1,171 @@
+"""
+Full-text search over task titles and descriptions.
+
+SQLite uses an external-content FTS5 table kept in sync by triggers, and
+PostgreSQL uses a generated ``tsvector`` column with a GIN index. Other
+backends, or a database that has not been migrated yet, fall back to the
+original ``icontains`` scan.
+"""
+import re
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+
+
+FTS_TABLE = 'tasks_task_fts'
+SEARCH_VECTOR_COLUMN = 'search_vector'
+
+# Title matches weigh more than description matches when ranking
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+SQLITE_FTS_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description,
+        content='tasks_task', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON tasks_task BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON tasks_task BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON tasks_task BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_DROP_FTS_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+POSTGRESQL_FTS_SQL = [
+    f"""
+    ALTER TABLE tasks_task ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR_COLUMN} tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    f'CREATE INDEX IF NOT EXISTS task_search_vector_idx ON tasks_task USING GIN ({SEARCH_VECTOR_COLUMN})',
+]
+
+POSTGRESQL_DROP_FTS_SQL = [
+    'DROP INDEX IF EXISTS task_search_vector_idx',
+    f'ALTER TABLE tasks_task DROP COLUMN IF EXISTS {SEARCH_VECTOR_COLUMN}',
+]
+
+
+def install_search_index(apps, schema_editor):
+    """
+    Create the full-text index for the current backend.
+    
+    On SQLite, Django rebuilds ``tasks_task`` for many schema changes, which
+    drops its triggers; migrations that alter the table call this again.
+    """
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_FTS_SQL, 'postgresql': POSTGRESQL_FTS_SQL}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def remove_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_DROP_FTS_SQL, 'postgresql': POSTGRESQL_DROP_FTS_SQL}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def search_terms(query):
+    """Split a user query into lowercase word tokens."""
+    return re.findall(r'\w+', query.lower())
+
+
+def get_backend(using='default'):
+    """
+    Return the search backend name ('sqlite', 'postgresql' or 'icontains').
+    """
+    configured = getattr(settings, 'TASK_SEARCH_BACKEND', 'auto')
+    if configured != 'auto':
+        return configured
+    connection = connections[using]
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return 'icontains'
+    return connection.vendor
+
+
+def search_tasks(queryset, query, backend=None, rank=False):
+    """
+    Filter a task queryset by a search query.
+    
+    Every term is matched as a prefix, and all terms must match. With
+    ``rank=True`` the rows are annotated with ``search_rank``, where higher
+    is a better match.
+    """
+    backend = backend or get_backend(queryset.db)
+    terms = search_terms(query)
+    if backend == 'icontains' or not terms:
+        return icontains_search(queryset, query, rank=rank)
+    
+    table = queryset.model._meta.db_table
+    if backend == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        # Filtering through IN (...) lets SQLite run the MATCH once; a plain
+        # join can make it probe the FTS index once per candidate task.
+        queryset = queryset.extra(
+            where=[f'{table}.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)'],
+            params=[match],
+        )
+        if rank:
+            queryset = queryset.extra(
+                select={'search_rank': f'-bm25({FTS_TABLE}, %s, %s)'},
+                select_params=[TITLE_WEIGHT, DESCRIPTION_WEIGHT],
+                tables=[FTS_TABLE],
+                where=[f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+                params=[match],
+            )
+        return queryset
+    if backend == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        queryset = queryset.extra(
+            where=[f"{table}.{SEARCH_VECTOR_COLUMN} @@ to_tsquery('english', %s)"],
+            params=[tsquery],
+        )
+        if rank:
+            queryset = queryset.extra(
+                select={
+                    'search_rank': f"ts_rank_cd({table}.{SEARCH_VECTOR_COLUMN}, to_tsquery('english', %s))"
+                },
+                select_params=[tsquery],
+            )
+        return queryset
+    raise ValueError(f'Unknown search backend {backend!r}.')
+
+
+def icontains_search(queryset, query, rank=False):
+    """The unindexed substring search used before full-text search existed."""
+    queryset = queryset.filter(
+        Q(title__icontains=query) |
+        Q(description__icontains=query)
+    )
+    if rank:
+        queryset = queryset.extra(select={'search_rank': '0'})
+    return queryset
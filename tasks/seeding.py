@@ -0,0 +1,92 @@
+"""
+Synthetic task data for benchmarks and load tests.
+"""
+import random
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils import timezone
+from .models import Task, UserProfile
+
+
+TITLE_WORDS = [
+    'review', 'draft', 'call', 'email', 'plan', 'fix', 'update', 'book',
+    'prepare', 'send', 'clean', 'organize', 'report', 'budget', 'meeting',
+    'invoice', 'groceries', 'dentist', 'presentation', 'release', 'backup',
+    'proposal', 'contract', 'design', 'notes', 'travel', 'workout', 'garden',
+]
+
+# Description text: the title words plus a few thousand pseudo-words drawn
+# with Zipf-like weights, so common and rare terms both occur.
+_SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'be', 'da', 'fu', 'go', 'hi', 'ja']
+VOCABULARY = TITLE_WORDS + [a + b + c for a in _SYLLABLES for b in _SYLLABLES for c in _SYLLABLES]
+VOCABULARY_WEIGHTS = [1 / rank for rank in range(1, len(VOCABULARY) + 1)]
+
+# (value, weight) pairs describing a typical task list
+STATUS_WEIGHTS = [('pending', 50), ('in_progress', 20), ('completed', 30)]
+PRIORITY_WEIGHTS = [('low', 30), ('medium', 50), ('high', 20)]
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def build_task(user, rng, today):
+    """Return an unsaved task with a realistic status, priority and due date."""
+    words = rng.sample(TITLE_WORDS, rng.randint(2, 5))
+    status = _weighted(rng, STATUS_WEIGHTS)
+    due_date = None
+    if rng.random() < 0.6:
+        due_date = today + timedelta(days=rng.randint(-30, 60))
+    description = ''
+    if rng.random() < 0.7:
+        description = ' '.join(rng.choices(VOCABULARY, VOCABULARY_WEIGHTS, k=rng.randint(5, 80)))
+    return Task(
+        user=user,
+        title=' '.join(words).capitalize(),
+        description=description,
+        priority=_weighted(rng, PRIORITY_WEIGHTS),
+        status=status,
+        due_date=due_date,
+        completed_at=timezone.now() if status == 'completed' else None,
+    )
+
+
+def seed_tasks(users, tasks_per_user, batch_size=1000, seed=None):
+    """
+    Bulk-create tasks_per_user tasks for each user in bounded batches.
+    
+    Returns the number of tasks created.
+    """
+    rng = random.Random(seed)
+    today = timezone.now().date()
+    created = 0
+    for user in users:
+        remaining = tasks_per_user
+        while remaining > 0:
+            size = min(batch_size, remaining)
+            Task.objects.bulk_create([build_task(user, rng, today) for _ in range(size)])
+            remaining -= size
+            created += size
+    return created
+
+
+def seed_usernames(count, prefix='seed_user'):
+    """The usernames create_users() gives count users: <prefix>_<n>."""
+    return [f'{prefix}_{index}' for index in range(count)]
+
+
+def create_users(count, prefix='seed_user', password=None):
+    """
+    Bulk-create users named <prefix>_<n>, with profiles, and return them.
+    
+    All users share one password hash; without a password they cannot log in.
+    """
+    password_hash = make_password(password)
+    usernames = seed_usernames(count, prefix)
+    User.objects.bulk_create([User(username=username, password=password_hash) for username in usernames])
+    # Matched exactly: a prefix match would also find other prefixes' users
+    users = list(User.objects.filter(username__in=usernames).order_by('pk'))
+    UserProfile.objects.bulk_create([UserProfile(user=user) for user in users])
+    return users
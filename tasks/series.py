@@ -0,0 +1,208 @@
+"""
+Recurring tasks: expanding series into occurrences, and storing them.
+
+The occurrences of a TaskSeries are virtual until one is edited or
+completed; materialize() then stores it as a Task with series and
+occurrence_date set, and from there on it is an ordinary task. Skipped
+and deleted occurrences are recorded in the series' exdates.
+
+Virtual occurrences are listed and counted within a window around today:
+
+* back TASK_RECURRENCE_LOOKBACK_DAYS; older occurrences that were never
+  done count as missed, so an unattended daily series does not pile up
+  overdue tasks forever,
+* ahead TASK_RECURRENCE_HORIZON_DAYS.
+
+The window bounds the work whatever the age of a series: each series
+yields at most one date per day of it, and the stored occurrences inside
+it are found with one query on the (series, occurrence_date) index.
+"""
+import heapq
+from datetime import timedelta
+from itertools import islice
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
+from .models import Task, TaskSeries
+from .search import icontains_search
+
+
+# Virtual occurrences shown above the first page of the task list
+LIST_LIMIT = 10
+
+
+class Occurrence:
+    """
+    A virtual occurrence of a series, with the attributes of a task that
+    the task card shows.
+    """
+    
+    is_virtual = True
+    pk = None
+    status = 'pending'
+    is_completed = False
+    completed_at = None
+    
+    def __init__(self, series, day):
+        self.series = series
+        self.due_date = self.occurrence_date = day
+    
+    def __repr__(self):
+        return f'<Occurrence {self.key}>'
+    
+    @property
+    def key(self):
+        return f'{self.series.pk}:{self.occurrence_date.isoformat()}'
+    
+    @property
+    def sort_key(self):
+        return self.occurrence_date, self.series.pk
+    
+    @property
+    def title(self):
+        return self.series.title
+    
+    @property
+    def excerpt(self):
+        return self.series.excerpt
+    
+    @property
+    def priority(self):
+        return self.series.priority
+    
+    @property
+    def created_at(self):
+        return self.series.created_at
+    
+    @property
+    def is_overdue(self):
+        return self.occurrence_date < timezone.now().date()
+    
+    @property
+    def rule_display(self):
+        return self.series.recurrence.describe()
+    
+    def get_priority_display(self):
+        return self.series.get_priority_display()
+    
+    def get_status_display(self):
+        return dict(Task.STATUS_CHOICES)[self.status]
+    
+    def get_url(self, action):
+        return reverse(f'occurrence-{action}', args=[self.series.pk, self.occurrence_date.isoformat()])
+    
+    @property
+    def toggle_url(self):
+        return self.get_url('toggle')
+    
+    @property
+    def update_url(self):
+        return self.get_url('update')
+    
+    @property
+    def delete_url(self):
+        return self.get_url('delete')
+
+
+def window(today):
+    """The dates whose virtual occurrences are listed and counted."""
+    return (
+        today - timedelta(days=settings.TASK_RECURRENCE_LOOKBACK_DAYS),
+        today + timedelta(days=settings.TASK_RECURRENCE_HORIZON_DAYS),
+    )
+
+
+def occurrences(series_list, first, last):
+    """
+    Yield the virtual occurrences of the series within [first, last], by date.
+    
+    The series are expanded lazily and merged, so taking the first few
+    occurrences only expands the series as far as those.
+    """
+    series_list = list(series_list)
+    if not series_list:
+        return
+    stored = set(
+        Task.objects.filter(series__in=series_list, occurrence_date__range=(first, last))
+        .values_list('series_id', 'occurrence_date')
+    )
+    yield from heapq.merge(
+        *(series_occurrences(series, first, last, stored) for series in series_list),
+        key=lambda occurrence: occurrence.sort_key,
+    )
+
+
+def series_occurrences(series, first, last, stored):
+    for day in series.dates(first, last):
+        if (series.pk, day) not in stored:
+            yield Occurrence(series, day)
+
+
+def series_for_list(user, params):
+    """The user's series whose occurrences pass the task list filters."""
+    if params.get('status') == 'completed':
+        # Virtual occurrences are never completed
+        return TaskSeries.objects.none()
+    queryset = TaskSeries.objects.filter(user=user)
+    if params.get('priority'):
+        queryset = queryset.filter(priority=params['priority'])
+    if params.get('search'):
+        # A user has few series, so they are simply scanned
+        queryset = icontains_search(queryset, params['search'])
+    return queryset
+
+
+def upcoming_occurrences(user, params, today, limit=LIST_LIMIT):
+    """The first virtual occurrences in the window, for the task list."""
+    first, last = window(today)
+    series_list = series_for_list(user, params).defer('description')
+    return list(islice(occurrences(series_list, first, last), limit))
+
+
+def occurrence_counts(user_id, today):
+    """How much the user's virtual occurrences add to their task counters."""
+    counts = dict.fromkeys(('total_count', 'pending_count', 'high_priority_count', 'overdue_count'), 0)
+    first, last = window(today)
+    series_list = TaskSeries.objects.filter(user_id=user_id).defer('description')
+    for occurrence in occurrences(series_list, first, last):
+        counts['total_count'] += 1
+        counts['pending_count'] += 1
+        counts['high_priority_count'] += occurrence.priority == 'high'
+        counts['overdue_count'] += occurrence.occurrence_date < today
+    return counts
+
+
+def stored_occurrence(series, day):
+    """The Task an occurrence was stored as, or None while it is virtual."""
+    return Task.objects.filter(series=series, occurrence_date=day).first()
+
+
+def materialize(series, day, **values):
+    """
+    Store the occurrence of series on day as a Task.
+    
+    values override those taken from the series. Returns (task, created);
+    an occurrence that was stored before is returned unchanged.
+    """
+    task = stored_occurrence(series, day)
+    if task is not None:
+        return task, False
+    try:
+        with transaction.atomic():
+            return Task.objects.create(**{**series.task_values(day), **values}), True
+    except IntegrityError:
+        # Stored by a concurrent request
+        return Task.objects.get(series=series, occurrence_date=day), False
+
+
+def skip_occurrences(series_id, days):
+    """Leave the given dates out of a series from now on."""
+    with transaction.atomic():
+        series = TaskSeries.objects.select_for_update().filter(pk=series_id).first()
+        if series is None:
+            return
+        exdates = set(series.exdates) | {day.isoformat() for day in days}
+        if len(exdates) != len(series.exdates):
+            series.exdates = sorted(exdates)
+            series.save(update_fields=['exdates', 'updated_at'])
@@ -0,0 +1,112 @@
+"""
+Signal handlers for the tasks application.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .accounts import invalidate_user
+from .events import publish_task_event
+from .models import Task, TaskSeries, TaskStats, TaskTombstone, UserProfile
+from .series import skip_occurrences
+from .thumbnails import schedule_avatar_variants
+
+
+@receiver(post_save, sender=Task)
+def update_stats_on_save(sender, instance, created, **kwargs):
+    """Apply the counter delta for a created or updated task."""
+    new_state = instance.stats_state()
+    old_state = None if created else getattr(instance, '_stats_state', None)
+    
+    if new_state is None or (old_state is None and not created):
+        # Partial instance: the previous state is unknown, so recount
+        TaskStats.objects.rebuild([instance.user_id])
+    else:
+        TaskStats.objects.apply_delta(old_state, new_state)
+    instance._stats_state = new_state
+
+
+@receiver(post_delete, sender=Task)
+def update_stats_on_delete(sender, instance, **kwargs):
+    """Remove a deleted task from its owner's counters."""
+    old_state = getattr(instance, '_stats_state', None) or instance.stats_state()
+    if old_state is not None:
+        TaskStats.objects.apply_delta(old_state, None)
+
+
+@receiver(post_delete, sender=Task)
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    """Leave a tombstone so that sync clients learn about the deletion."""
+    # Deleting a task or a queryset of tasks (the views, the admin) leaves
+    # tombstones; cascades from deleting the user do not.
+    if getattr(origin, 'model', type(origin)) is not Task:
+        return
+    TaskTombstone.objects.create(user_id=instance.user_id, task_id=instance.pk)
+
+
+@receiver(post_save, sender=Task)
+def publish_saved_task(sender, instance, created, **kwargs):
+    """Tell the owner's open task pages about a created or updated task."""
+    publish_task_event(instance.user_id, 'created' if created else 'updated', instance.pk)
+
+
+@receiver(post_delete, sender=Task)
+def publish_deleted_task(sender, instance, origin=None, **kwargs):
+    """Tell the owner's open task pages about a deleted task."""
+    # A deleted user has no pages left to update
+    if getattr(origin, 'model', type(origin)) is not Task:
+        return
+    publish_task_event(instance.user_id, 'deleted', instance.pk)
+
+
+@receiver(post_delete, sender=Task)
+def skip_deleted_occurrence(sender, instance, origin=None, **kwargs):
+    """Keep a deleted occurrence of a recurring task from coming back as a virtual one."""
+    if instance.series_id is None or getattr(origin, 'model', type(origin)) is not Task:
+        return
+    skip_occurrences(instance.series_id, [instance.occurrence_date])
+
+
+@receiver(post_save, sender=TaskSeries)
+def update_stats_on_series_save(sender, instance, created, **kwargs):
+    """Count a new series; any change alters its virtual occurrences."""
+    today = timezone.now().date()
+    if created:
+        TaskStats.objects.update_counters(instance.user_id, {'overdue_count': 0, 'series_count': 1}, today)
+    else:
+        TaskStats.objects.touch([instance.user_id])
+    publish_task_event(instance.user_id, 'refresh')
+
+
+@receiver(post_delete, sender=TaskSeries)
+def update_stats_on_series_delete(sender, instance, origin=None, **kwargs):
+    """Stop counting a deleted series."""
+    # The counters of a deleted user go with them
+    if getattr(origin, 'model', type(origin)) is not TaskSeries:
+        return
+    TaskStats.objects.update_counters(
+        instance.user_id, {'overdue_count': 0, 'series_count': -1}, timezone.now().date()
+    )
+    publish_task_event(instance.user_id, 'refresh')
+
+
+@receiver(post_save, sender=UserProfile)
+def schedule_avatar_thumbnails(sender, instance, **kwargs):
+    """Resize a newly uploaded avatar once it is committed, off the request thread."""
+    if instance.avatar and not instance.avatar_variants_ready:
+        transaction.on_commit(lambda: schedule_avatar_variants(instance.pk))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop the cached user when the account changes (including last_login)."""
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    """Drop the cached user whose profile changed."""
+    invalidate_user(instance.user_id)
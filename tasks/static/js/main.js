@@ -84,6 +84,9 @@ document.addEventListener('DOMContentLoaded', function() {
     const forms = document.querySelectorAll('form');
     
     forms.forEach(form => {
+        // Task toggles are submitted in the background (see below)
+        if (form.classList.contains('toggle-form')) return;
+        
         form.addEventListener('submit', function(e) {
             const submitBtn = form.querySelector('button[type="submit"]');
             if (submitBtn) {
@@ -109,16 +112,18 @@ document.addEventListener('DOMContentLoaded', function() {
 // =====================
 // Confirm Delete
 // =====================
+function confirmDelete(e) {
+    if (!confirm('Are you sure you want to delete this item? This action cannot be undone.')) {
+        e.preventDefault();
+    }
+}
+
 document.addEventListener('DOMContentLoaded', function() {
     const deleteLinks = document.querySelectorAll('a[href*="delete"], .action-btn.delete');
     
     deleteLinks.forEach(link => {
         if (!link.closest('.delete-form')) {
-            link.addEventListener('click', function(e) {
-                if (!confirm('Are you sure you want to delete this item? This action cannot be undone.')) {
-                    e.preventDefault();
-                }
-            });
+            link.addEventListener('click', confirmDelete);
         }
     });
 });
@@ -254,6 +259,154 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
+// =====================
+// Background Task Toggle
+// =====================
+function applyTaskState(card, task) {
+    const button = card.querySelector('.btn-toggle');
+    const status = card.querySelector('.task-status');
+    const due = card.querySelector('.task-due');
+    
+    card.classList.toggle('completed', task.is_completed);
+    card.classList.toggle('overdue', task.is_overdue);
+    if (due) due.classList.toggle('overdue-text', task.is_overdue);
+    if (status) status.textContent = task.status_display;
+    if (button) {
+        button.classList.toggle('completed', task.is_completed);
+        button.innerHTML = task.is_completed
+            ? '<i class="fas fa-rotate-left"></i> Mark Pending'
+            : '<i class="fas fa-check"></i> Mark Complete';
+    }
+}
+
+function updateStatCards(stats) {
+    document.querySelectorAll('[data-stat]').forEach(element => {
+        const value = stats[element.dataset.stat];
+        if (value !== undefined) element.textContent = value;
+    });
+    const overdueCard = document.querySelector('.stat-card.overdue-stat');
+    if (overdueCard) overdueCard.classList.toggle('warning', stats.overdue > 0);
+}
+
+function bindToggleForm(form) {
+    form.addEventListener('submit', function(e) {
+        e.preventDefault();
+        
+        const card = form.closest('.task-card');
+        const button = form.querySelector('.btn-toggle');
+        const previous = {
+            is_completed: card.classList.contains('completed'),
+            is_overdue: card.classList.contains('overdue'),
+            status_display: card.querySelector('.task-status')?.textContent,
+        };
+        
+        // Optimistic update; the server response fills in the overdue flag
+        applyTaskState(card, {
+            is_completed: !previous.is_completed,
+            is_overdue: false,
+            status_display: previous.is_completed ? 'Pending' : 'Completed',
+        });
+        button.disabled = true;
+        
+        fetch(form.action, {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: {
+                'Accept': 'application/json',
+                'X-CSRFToken': form.querySelector('[name="csrfmiddlewaretoken"]').value,
+            },
+        })
+            .then(response => {
+                if (!response.ok) throw new Error(`Toggle failed: ${response.status}`);
+                return response.json();
+            })
+            .then(data => {
+                applyTaskState(card, data.task);
+                updateStatCards(data.stats);
+                button.disabled = false;
+            })
+            .catch(() => {
+                // Roll back and fall back to a regular form POST
+                applyTaskState(card, previous);
+                form.submit();
+            });
+    });
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('.task-card .toggle-form').forEach(bindToggleForm);
+});
+
+// =====================
+// Live Task Updates
+// =====================
+function buildTaskCard(html) {
+    const template = document.createElement('template');
+    template.innerHTML = html.trim();
+    const card = template.content.firstElementChild;
+    card.querySelectorAll('.toggle-form').forEach(bindToggleForm);
+    card.querySelectorAll('.action-btn.delete').forEach(link => link.addEventListener('click', confirmDelete));
+    return card;
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    const page = document.querySelector('.tasks-page[data-events-url]');
+    if (!page || !window.EventSource) return;
+    
+    const source = new EventSource(page.dataset.eventsUrl);
+    let version = Number(page.dataset.version);
+    
+    // Bulk changes and missed events: reload, once the tab is visible
+    const reload = () => {
+        source.close();
+        if (document.hidden) {
+            document.addEventListener('visibilitychange', () => window.location.reload(), { once: true });
+        } else {
+            window.location.reload();
+        }
+    };
+    
+    const findCard = id => page.querySelector(`.task-card[data-task-id="${id}"]`);
+    
+    const handlers = {
+        ready(data) {
+            // Also sent after every reconnect
+            if (data.version > version) return reload();
+            updateStatCards(data.stats);
+        },
+        created(data) {
+            // An occurrence of a recurring task that was completed or edited
+            const occurrence = data.occurrence && page.querySelector(`.task-card[data-occurrence="${data.occurrence}"]`);
+            if (occurrence) return occurrence.replaceWith(buildTaskCard(data.html));
+            const grid = page.querySelector('.tasks-grid:not(.recurring-grid)');
+            if (page.dataset.liveInsert !== 'true' || findCard(data.id)) return;
+            if (!grid) return reload();
+            grid.prepend(buildTaskCard(data.html));
+        },
+        updated(data) {
+            const card = findCard(data.id);
+            if (card) card.replaceWith(buildTaskCard(data.html));
+        },
+        deleted(data) {
+            const card = findCard(data.id);
+            if (card) card.remove();
+        },
+        refresh: reload,
+    };
+    handlers.toggled = handlers.updated;
+    
+    Object.entries(handlers).forEach(([type, handler]) => {
+        source.addEventListener(type, event => {
+            const data = event.data ? JSON.parse(event.data) : {};
+            if (type !== 'ready' && data.stats) {
+                version = Math.max(version, data.version);
+                updateStatCards(data.stats);
+            }
+            handler(data);
+        });
+    });
+});
+
 // =====================
 // Slideout animation for alerts
 // =====================
@@ -0,0 +1,156 @@
+"""
+Delta sync of a user's tasks for API clients.
+
+A client keeps an opaque cursor and asks for the tasks created or updated,
+and the tasks deleted, since that cursor. Both feeds are read in
+``(timestamp, id)`` order using the (user, updated_at, id) index on Task and
+the (user, deleted_at, id) index on TaskTombstone.
+
+Timestamps are taken when a row is written but only become visible when its
+transaction commits, so a slow transaction can commit a row that sorts
+before rows a client has already seen. The feeds therefore stop
+``TASK_SYNC_SETTLE_SECONDS`` short of the current time: a change is handed
+out once it is that old. This only covers transactions that commit within
+that time. A write whose transaction stays open longer (a large import
+batch, an archive run, a request blocked on the database lock) can commit
+behind cursors handed out in the meantime; clients holding those cursors
+miss it until the task changes again or they sync from scratch. Keep write
+transactions shorter than the setting, or raise it.
+"""
+import base64
+import binascii
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Task, TaskTombstone
+
+
+TASK_FIELDS = (
+    'id',
+    'title',
+    'description',
+    'priority',
+    'status',
+    'due_date',
+    'created_at',
+    'updated_at',
+    'completed_at',
+)
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+
+class InvalidSyncCursor(ValueError):
+    """Raised when a sync cursor cannot be decoded."""
+
+
+class ExpiredSyncCursor(InvalidSyncCursor):
+    """Raised when tombstones the cursor still needs may have been pruned."""
+
+
+def encode_cursor(tasks_after, deleted_after, synced_at):
+    """
+    Encode the (timestamp, id) positions of both feeds as an opaque string.
+    
+    synced_at is the time up to which every deletion has been reported.
+    """
+    payload = json.dumps(
+        {
+            't': [tasks_after[0].isoformat(), tasks_after[1]] if tasks_after else None,
+            'd': [deleted_after[0].isoformat(), deleted_after[1]],
+            's': synced_at.isoformat(),
+        },
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the (tasks_after, deleted_after, synced_at) stored in a cursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        positions = []
+        for key in ('t', 'd'):
+            value = data[key]
+            if value is None and key == 't':
+                positions.append(None)
+                continue
+            timestamp, pk = parse_datetime(value[0]), value[1]
+            if timestamp is None or not isinstance(pk, int):
+                raise ValueError
+            positions.append((timestamp, pk))
+        positions.append(parse_datetime(data['s']))
+        if positions[-1] is None:
+            raise ValueError
+    except (ValueError, TypeError, KeyError, IndexError, binascii.Error) as exc:
+        raise InvalidSyncCursor(str(exc)) from exc
+    return tuple(positions)
+
+
+def after(field, position):
+    """
+    Rows that sort after position in (field, id) order.
+    
+    The field >= timestamp bound is redundant, but without it SQLite cannot
+    seek on the OR and scans every earlier row of the user.
+    """
+    timestamp, pk = position
+    condition = Q(**{f'{field}__gt': timestamp}) | Q(**{field: timestamp, 'pk__gt': pk})
+    return condition & Q(**{f'{field}__gte': timestamp})
+
+
+def changes_since(user, cursor=None, limit=DEFAULT_LIMIT):
+    """
+    Return the user's task changes and deletions since a cursor.
+    
+    Without a cursor every task is returned (in pages of ``limit``), and only
+    deletions from then on are reported. The result holds the next cursor and
+    ``has_more``, which is True while further pages are ready right away.
+    """
+    now = timezone.now()
+    horizon = now - timedelta(seconds=settings.TASK_SYNC_SETTLE_SECONDS)
+    if cursor:
+        tasks_after, deleted_after, synced_at = decode_cursor(cursor)
+        if synced_at < now - timedelta(days=settings.TASK_SYNC_TOMBSTONE_DAYS):
+            raise ExpiredSyncCursor('Cursor is older than the tombstone retention period.')
+    else:
+        tasks_after, deleted_after = None, (horizon, 0)
+    
+    tasks = Task.objects.filter(user=user, updated_at__lte=horizon)
+    if tasks_after:
+        tasks = tasks.filter(after('updated_at', tasks_after))
+    tasks = list(tasks.order_by('updated_at', 'pk').values(*TASK_FIELDS)[:limit + 1])
+    
+    tombstones = TaskTombstone.objects.filter(user=user, deleted_at__lte=horizon)
+    tombstones = tombstones.filter(after('deleted_at', deleted_after))
+    tombstones = list(
+        tombstones.order_by('deleted_at', 'pk').values('id', 'task_id', 'deleted_at')[:limit + 1]
+    )
+    
+    has_more_deleted = len(tombstones) > limit
+    has_more = len(tasks) > limit or has_more_deleted
+    tasks, tombstones = tasks[:limit], tombstones[:limit]
+    if tasks:
+        tasks_after = (tasks[-1]['updated_at'], tasks[-1]['id'])
+    if tombstones:
+        deleted_after = (tombstones[-1]['deleted_at'], tombstones[-1]['id'])
+    synced_at = deleted_after[0] if has_more_deleted else horizon
+    return {
+        'tasks': tasks,
+        'deleted': [{'id': row['task_id'], 'deleted_at': row['deleted_at']} for row in tombstones],
+        'cursor': encode_cursor(tasks_after, deleted_after, synced_at),
+        'has_more': has_more,
+    }
+
+
+def prune_tombstones(days=None):
+    """Delete tombstones older than the retention period; returns the count."""
+    days = settings.TASK_SYNC_TOMBSTONE_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = TaskTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
@@ -1,12 +1,40 @@
 """
 Tests for the tasks application.
 """
-from django.test import TestCase, Client
-from django.contrib.auth.models import User
-from django.urls import reverse
-from django.utils import timezone
-from datetime import timedelta
-from .models import Task, UserProfile
+import json
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+from PIL import Image
+from asgiref.sync import sync_to_async
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.db import SessionStore
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connection
+from django.db.utils import ConnectionHandler
+from django.test import TestCase, Client, AsyncRequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import AnonymousUser, User
+from django.http import Http404
+from django.urls import resolve, reverse
+from django.utils import dateformat, timezone
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+from todo_project.databases import parse_database_url
+from . import deletion, events, metrics, replicas, thumbnails, transfer, views
+from . import urls as task_urls
+from .management.commands import benchmark_views
+from .archive import archive_tasks
+from .models import AccountDeletion, ArchivedTask, Task, TaskSeries, TaskStats, TaskTombstone, UserProfile
+from .pagination import EstimatedCountPaginator, KeysetPaginator
+from .recurrence import InvalidRule, parse_rule
+from .series import occurrences
+from .sync import after, changes_since
 
 
 class TaskModelTest(TestCase):
@@ -183,3 +211,1705 @@ class UserProfileTest(TestCase):
         self.user.last_name = 'Doe'
         self.user.save()
         self.assertEqual(self.profile.full_name, 'John Doe')
+
+
+class TaskStatsTest(TestCase):
+    """Test cases for the maintained per-user task counters."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        self.yesterday = timezone.now().date() - timedelta(days=1)
+        Task.objects.create(user=self.user, title='Overdue', priority='high', due_date=self.yesterday)
+        Task.objects.create(user=self.user, title='Done', status='completed')
+        self.stats = TaskStats.objects.for_user(self.user)
+    
+    def assertCounters(self, **expected):
+        stats = TaskStats.objects.for_user(self.user)
+        for name, value in expected.items():
+            self.assertEqual(getattr(stats, name), value, name)
+    
+    def test_initial_counters(self):
+        """Test counters are built from existing tasks."""
+        self.assertCounters(
+            total_count=2,
+            active_count=1,
+            completed_count=1,
+            pending_count=1,
+            high_priority_count=1,
+            overdue_count=1,
+        )
+    
+    def test_counters_follow_saves_and_deletes(self):
+        """Test create, update and delete keep the counters in sync."""
+        task = Task.objects.create(user=self.user, title='New', priority='high')
+        self.assertCounters(total_count=3, pending_count=2, high_priority_count=2)
+        
+        task.mark_completed()
+        self.assertCounters(completed_count=2, pending_count=1)
+        
+        overdue = Task.objects.get(title='Overdue')
+        overdue.mark_completed()
+        self.assertCounters(overdue_count=0)
+        
+        task.delete()
+        self.assertCounters(total_count=2, completed_count=2, high_priority_count=1)
+    
+    def test_counters_follow_bulk_update(self):
+        """Test queryset updates rebuild the counters."""
+        Task.objects.filter(user=self.user).update(status='completed')
+        self.assertCounters(completed_count=2, pending_count=0, overdue_count=0)
+    
+    def test_overdue_is_recounted_on_a_new_day(self):
+        """Test a stale overdue counter is refreshed on read."""
+        TaskStats.objects.filter(user=self.user).update(
+            overdue_count=0,
+            overdue_as_of=self.yesterday
+        )
+        self.assertCounters(overdue_count=1)
+    
+    def test_task_list_reads_counters_in_one_query(self):
+        """Test the list view no longer counts tasks per request."""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('task-list'))
+        self.assertEqual(response.context['total_count'], 2)
+        self.assertEqual(response.context['overdue_count'], 1)
+    
+    def test_rebuild_command_verifies_and_repairs(self):
+        """Test the management command detects and fixes drift."""
+        TaskStats.objects.filter(user=self.user).update(total_count=99)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_task_stats', '--verify', stdout=StringIO())
+        call_command('rebuild_task_stats', stdout=StringIO())
+        call_command('rebuild_task_stats', '--verify', stdout=StringIO())
+        self.assertCounters(total_count=2)
+
+
+class TaskQueryBenchmarkTest(TestCase):
+    """Test cases for the task list indexes and query benchmark."""
+    
+    def test_list_queries_use_composite_indexes(self):
+        """Test the default list query is served by a user-scoped index."""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        queryset = Task.objects.filter(user=user).filter_for_list({})
+        self.assertIn('task_user_created_idx', queryset.explain())
+    
+    def test_priority_sort_uses_rank_index(self):
+        """Test the priority sort is served by the integer rank index."""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        queryset = Task.objects.filter(user=user).filter_for_list({'sort': '-priority'})
+        self.assertIn('task_user_rank_idx', queryset.explain())
+    
+    def test_benchmark_command_rolls_back_seeded_data(self):
+        """Test the benchmark runs and leaves no data behind."""
+        out = StringIO()
+        call_command('benchmark_task_queries', users=1, tasks=20, repeat=1, no_explain=True, stdout=out)
+        self.assertIn('Timings', out.getvalue())
+        self.assertFalse(Task.objects.exists())
+
+
+class LoadTestHarnessTest(TestCase):
+    """Test cases for the data generator and the view benchmark."""
+    
+    def test_seed_tasks_command(self):
+        """Test seed_tasks creates users with profiles and tasks."""
+        call_command('seed_tasks', users=2, tasks=5, prefix='load', seed=1, stdout=StringIO())
+        users = User.objects.filter(username__startswith='load_')
+        self.assertEqual(users.count(), 2)
+        self.assertEqual(Task.objects.filter(user__in=users).count(), 10)
+        self.assertEqual(UserProfile.objects.filter(user__in=users).count(), 2)
+        self.assertEqual(TaskStats.objects.get(user=users[0]).total_count, 5)
+        with self.assertRaises(CommandError):
+            call_command('seed_tasks', users=1, tasks=1, prefix='load', stdout=StringIO())
+    
+    def test_overlapping_prefixes(self):
+        """Test a prefix that starts another prefix's usernames only gets its own users."""
+        call_command('seed_tasks', users=1, tasks=1, prefix='load_extra', stdout=StringIO())
+        call_command('seed_tasks', users=1, tasks=1, prefix='load', stdout=StringIO())
+        self.assertEqual(UserProfile.objects.count(), 2)
+        self.assertEqual(Task.objects.filter(user__username='load_0').count(), 1)
+    
+    def test_benchmark_views_reports_and_rolls_back(self):
+        """Test the view benchmark covers every scenario and leaves no data behind."""
+        out = StringIO()
+        call_command('benchmark_views', tasks=15, repeat=1, no_budgets=True, stdout=out)
+        for scenario in ('list-search-relevance', 'detail', 'toggle-json', 'profile', 'sync'):
+            self.assertIn(scenario, out.getvalue())
+        self.assertNotIn(' 500 ', out.getvalue())
+        self.assertFalse(Task.objects.exists())
+    
+    def test_benchmark_views_covers_every_url(self):
+        """Test each task URL but the endless event stream has a scenario."""
+        covered = set()
+        
+        def measure(command, client, method, path, data, extra, repeat):
+            covered.add(resolve(urlsplit(path() if callable(path) else path).path).url_name)
+            return {'rps': 1, 'p50': 1, 'p95': 1, 'p99': 1, 'queries': 0, 'statuses': [200]}
+        
+        with mock.patch.object(benchmark_views.Command, 'measure', measure):
+            call_command('benchmark_views', tasks=5, repeat=1, stdout=StringIO())
+        expected = {pattern.name for pattern in task_urls.urlpatterns} - {'task-events'}
+        self.assertEqual(expected - covered, set())
+    
+    def test_benchmark_views_fails_over_budget(self):
+        """Test a view over its query budget fails the run."""
+        budgets = {'default': {'p95_ms': 10000, 'queries': 0}}
+        with override_settings(TASK_VIEW_BUDGETS=budgets), self.assertRaises(CommandError):
+            call_command('benchmark_views', tasks=5, repeat=1, only=['detail'], stdout=StringIO())
+
+
+class KeysetPaginationTest(TestCase):
+    """Test cases for cursor pagination of the task list."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        today = timezone.now().date()
+        for index in range(25):
+            Task.objects.create(
+                user=self.user,
+                title=f'Task {index:02d}',
+                priority='high' if index % 3 == 0 else 'low',
+                due_date=today + timedelta(days=index % 4) if index % 5 else None
+            )
+        self.client.login(username='testuser', password='testpass123')
+    
+    def walk(self, params):
+        """Follow next links to the end, then previous links back to the start."""
+        pages = []
+        response = self.client.get(reverse('task-list'), params)
+        while True:
+            page = response.context['page_obj']
+            pages.append([task.pk for task in page])
+            if not page.has_next():
+                break
+            response = self.client.get(reverse('task-list'), {**params, 'cursor': page.next_cursor})
+        
+        backwards = [pages[-1]]
+        while page.has_previous():
+            response = self.client.get(reverse('task-list'), {**params, 'cursor': page.previous_cursor})
+            page = response.context['page_obj']
+            backwards.append([task.pk for task in page])
+        return pages, backwards[::-1]
+    
+    def test_pages_match_full_ordering(self):
+        """Test cursor pages cover every task exactly once in order."""
+        for sort in ['-created_at', 'created_at', 'due_date', 'title']:
+            params = {'sort': sort, 'priority': 'low'}
+            pages, backwards = self.walk(params)
+            flat = [pk for page in pages for pk in page]
+            paginator = KeysetPaginator(Task.objects.filter(user=self.user).filter_for_list(params), 10)
+            expected = list(paginator.queryset.order_by(*paginator._ordering()).values_list('pk', flat=True))
+            self.assertEqual(flat, expected, sort)
+            self.assertEqual(pages, backwards, sort)
+    
+    def test_cursor_pages_skip_count_query(self):
+        """Test a cursor page runs no COUNT(*) query."""
+        self.client.get(reverse('task-list'))  # build the statistics row
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('task-list'))
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+    
+    def test_cursor_pages_seek_to_the_cursor(self):
+        """Test a cursor page starts at the cursor in the index instead of scanning up to it."""
+        paginator = KeysetPaginator(Task.objects.filter(user=self.user).filter_for_list({}), 10)
+        queryset, _, _ = paginator.page_queryset(paginator.page().next_cursor)
+        self.assertIn('created_at<', queryset.explain().replace(' ', ''))
+    
+    def test_invalid_cursor_returns_first_page(self):
+        """Test a malformed cursor falls back to the first page."""
+        response = self.client.get(reverse('task-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page_obj'].has_previous())
+    
+    @override_settings(TASK_LIST_PAGINATION='offset')
+    def test_offset_mode_still_available(self):
+        """Test numbered pages are used when configured."""
+        response = self.client.get(reverse('task-list'), {'page': 2})
+        self.assertEqual(response.context['page_obj'].number, 2)
+    
+    def test_offset_and_cursor_modes_agree_on_due_date(self):
+        """Test undated tasks are listed last whichever pagination is configured."""
+        pages, _ = self.walk({'sort': 'due_date'})
+        offset_pages = []
+        with self.settings(TASK_LIST_PAGINATION='offset'):
+            for number in range(1, len(pages) + 1):
+                response = self.client.get(reverse('task-list'), {'sort': 'due_date', 'page': number})
+                offset_pages.append([task.pk for task in response.context['page_obj']])
+        self.assertEqual(offset_pages, pages)
+        self.assertIsNone(Task.objects.get(pk=pages[-1][-1]).due_date)
+
+
+class TaskSearchTest(TestCase):
+    """Test cases for full-text task search."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.title_match = Task.objects.create(user=self.user, title='Quarterly budget', description='Numbers')
+        self.body_match = Task.objects.create(user=self.user, title='Numbers', description='Check the budget')
+        Task.objects.create(user=self.user, title='Groceries', description='Milk and eggs')
+    
+    def search(self, query, **params):
+        return list(Task.objects.filter(user=self.user).filter_for_list({'search': query, **params}))
+    
+    def test_prefix_and_ranking(self):
+        """Test prefixes match and title hits rank above description hits."""
+        results = self.search('budg', sort='relevance')
+        self.assertEqual(results, [self.title_match, self.body_match])
+    
+    def test_all_terms_must_match(self):
+        """Test multi-term queries require every term."""
+        self.assertEqual(self.search('quarter numb'), [self.title_match])
+    
+    def test_index_follows_updates_and_deletes(self):
+        """Test the search index stays in sync with task writes."""
+        self.body_match.description = 'Nothing relevant'
+        self.body_match.save()
+        self.assertEqual(self.search('budget'), [self.title_match])
+        
+        self.title_match.delete()
+        self.assertEqual(self.search('budget'), [])
+    
+    @override_settings(TASK_SEARCH_BACKEND='icontains')
+    def test_icontains_fallback(self):
+        """Test the substring scan is used when configured."""
+        self.assertEqual(len(self.search('udge')), 2)
+    
+    def test_search_view(self):
+        """Test searching from the task list page."""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('task-list'), {'search': 'budget', 'sort': 'relevance'})
+        self.assertEqual(list(response.context['tasks']), [self.title_match, self.body_match])
+
+
+class ConditionalGetTest(TestCase):
+    """Test cases for ETag/Last-Modified handling on task pages."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.task = Task.objects.create(user=self.user, title='Test Task')
+        self.other = Task.objects.create(user=self.user, title='Other Task')
+        self.client.login(username='testuser', password='testpass123')
+        self.url = reverse('task-list')
+    
+    def revalidate(self, url=None):
+        url = url or self.url
+        etag = self.client.get(url)['ETag']
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+    
+    def test_unchanged_list_returns_304(self):
+        """Test a repeat request with a matching ETag is not re-rendered."""
+        response = self.revalidate()
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('no-cache', response['Cache-Control'])
+    
+    def test_unchanged_detail_returns_304(self):
+        """Test the detail page is validated too."""
+        url = reverse('task-detail', kwargs={'pk': self.task.pk})
+        self.assertEqual(self.revalidate(url).status_code, 304)
+    
+    def test_writes_invalidate_etag(self):
+        """Test updates, bulk updates and deletes all change the ETag."""
+        etag = self.client.get(self.url)['ETag']
+        for change in (
+            lambda: Task.objects.filter(pk=self.task.pk).update(title='Renamed'),
+            lambda: self.task.save(),
+            lambda: self.other.delete(),
+        ):
+            change()
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            etag = response['ETag']
+    
+    def test_query_parameters_change_etag(self):
+        """Test each filter combination has its own validator."""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, {'status': 'completed'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_rename_invalidates_etag(self):
+        """Test renaming the user changes the validator of pages showing the name."""
+        etag = self.client.get(self.url)['ETag']
+        self.client.post(reverse('profile'), {
+            'username': 'renamed', 'email': 'test@example.com', 'first_name': '', 'last_name': '',
+            'bio': '', 'phone_number': '', 'birth_date': '',
+        }, follow=True)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'renamed')
+
+
+class TaskPageCacheTest(TestCase):
+    """Test cases for the cached task pages and task cards."""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.task = Task.objects.create(user=self.user, title='Test Task')
+        self.client.login(username='testuser', password='testpass123')
+        self.url = reverse('task-list')
+    
+    def test_repeat_request_is_served_from_cache(self):
+        """Test an unchanged list page is not queried or rendered again."""
+        first = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.url)
+        self.assertEqual(second.content, first.content)
+        self.assertFalse([q for q in queries.captured_queries if 'FROM "tasks_task"' in q['sql']])
+    
+    def test_writes_refresh_cached_pages_and_cards(self):
+        """Test saves and bulk updates show up despite the caches."""
+        self.client.get(self.url)
+        self.task.title = 'Saved Title'
+        self.task.save()
+        self.assertContains(self.client.get(self.url), 'Saved Title')
+        
+        Task.objects.filter(pk=self.task.pk).update(title='Bulk Title')
+        self.assertContains(self.client.get(self.url), 'Bulk Title')
+    
+    def test_profile_edit_refreshes_cached_pages(self):
+        """Test a cached page is not served with the old username after a rename."""
+        self.assertContains(self.client.get(self.url), 'testuser')
+        self.client.post(reverse('profile'), {
+            'username': 'renamed', 'email': 'test@example.com', 'first_name': '', 'last_name': '',
+            'bio': '', 'phone_number': '', 'birth_date': '',
+        }, follow=True)
+        response = self.client.get(self.url)
+        self.assertContains(response, 'renamed')
+        self.assertNotContains(response, 'testuser')
+    
+    def test_cached_cards_show_no_relative_time(self):
+        """Test cards show the creation date, which a cached copy cannot get wrong."""
+        response = self.client.get(self.url)
+        created = dateformat.format(timezone.localtime(self.task.created_at), 'M d, Y')
+        self.assertContains(response, f'Created {created}')
+        self.assertNotContains(response, ' ago</span>')
+    
+    @override_settings(TASK_CACHE_TIMEOUT=0)
+    def test_cache_can_be_disabled(self):
+        """Test a zero timeout renders every request."""
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertTrue([q for q in queries.captured_queries if 'FROM "tasks_task"' in q['sql']])
+
+
+class TaskToggleJsonTest(TestCase):
+    """Test cases for the JSON mode of the toggle endpoint."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.task = Task.objects.create(
+            user=self.user,
+            title='Test Task',
+            due_date=timezone.now().date() - timedelta(days=1)
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.url = reverse('task-toggle', kwargs={'pk': self.task.pk})
+    
+    def test_json_toggle_returns_state_and_counters(self):
+        """Test the JSON response carries the new state and updated counters."""
+        TaskStats.objects.for_user(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, HTTP_ACCEPT='application/json')
+        data = response.json()
+        self.assertEqual(data['task']['status'], 'completed')
+        self.assertFalse(data['task']['is_overdue'])
+        self.assertEqual(data['stats']['completed'], 1)
+        self.assertEqual(data['stats']['overdue'], 0)
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "tasks_task"')]
+        self.assertEqual(len(updates), 1)
+        
+        data = self.client.post(self.url, HTTP_ACCEPT='application/json').json()
+        self.assertEqual(data['task']['status'], 'pending')
+        self.assertTrue(data['task']['is_overdue'])
+        self.task.refresh_from_db()
+        self.assertIsNone(self.task.completed_at)
+    
+    def test_json_toggle_of_other_users_task_is_404(self):
+        """Test users cannot toggle tasks they do not own."""
+        other = User.objects.create_user(username='other', password='testpass123')
+        task = Task.objects.create(user=other, title='Private')
+        url = reverse('task-toggle', kwargs={'pk': task.pk})
+        response = self.client.post(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 404)
+    
+    def test_form_post_still_redirects(self):
+        """Test the plain form POST fallback is unchanged."""
+        response = self.client.post(self.url)
+        self.assertRedirects(response, reverse('task-list'))
+
+
+class AsyncViewTest(TestCase):
+    """Test cases for the async variants of the task views."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.task = Task.objects.create(user=self.user, title='Test Task', priority='high')
+        self.factory = AsyncRequestFactory()
+    
+    def make_request(self, method, path, user=None, **extra):
+        request = getattr(self.factory, method)(path, **extra)
+        user = user or self.user
+        
+        async def auser():
+            return user
+        request.auser = auser
+        request.session = SessionStore()
+        request._messages = FallbackStorage(request)
+        return request
+    
+    async def call(self, view, request, **kwargs):
+        response = await view.as_view()(request, **kwargs)
+        if hasattr(response, 'render'):
+            await sync_to_async(response.render)()
+        return response
+    
+    async def test_task_list(self):
+        """Test the async list view renders the user's tasks and counters."""
+        response = await self.call(views.AsyncTaskListView, self.make_request('get', '/tasks/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Test Task')
+        self.assertEqual(response.context_data['total_count'], 1)
+        self.assertIn('ETag', response)
+    
+    async def test_task_list_with_recurring_task(self):
+        """Test the async list view expands virtual occurrences off the event loop."""
+        await TaskSeries.objects.acreate(user=self.user, title='Daily standup', rule='FREQ=DAILY',
+                                         start_date=timezone.now().date())
+        response = await self.call(views.AsyncTaskListView, self.make_request('get', '/tasks/'))
+        self.assertContains(response, 'Daily standup')
+        self.assertGreater(response.context_data['total_count'], 1)
+    
+    async def test_task_list_offset_pagination(self):
+        """Test the async list view also supports page-number pagination."""
+        request = self.make_request('get', '/tasks/', data={'search': 'test', 'sort': 'relevance'})
+        response = await self.call(views.AsyncTaskListView, request)
+        self.assertEqual(response.context_data['page_obj'].paginator.count, 1)
+    
+    async def test_task_list_not_modified(self):
+        """Test the async list view answers revalidation with 304."""
+        first = self.make_request('get', '/tasks/')
+        response = await self.call(views.AsyncTaskListView, first)
+        request = self.make_request('get', '/tasks/', headers={'If-None-Match': response['ETag']})
+        request.META['CSRF_COOKIE'] = first.META['CSRF_COOKIE']
+        response = await self.call(views.AsyncTaskListView, request)
+        self.assertEqual(response.status_code, 304)
+    
+    async def test_task_detail(self):
+        """Test the async detail view and its 404 for other users' tasks."""
+        request = self.make_request('get', f'/task/{self.task.pk}/')
+        response = await self.call(views.AsyncTaskDetailView, request, pk=self.task.pk)
+        self.assertContains(response, 'Test Task')
+        
+        other = await User.objects.acreate(username='other')
+        request = self.make_request('get', f'/task/{self.task.pk}/', user=other)
+        with self.assertRaises(Http404):
+            await self.call(views.AsyncTaskDetailView, request, pk=self.task.pk)
+    
+    async def test_task_toggle(self):
+        """Test the async toggle updates the task and returns counters."""
+        request = self.make_request(
+            'post', f'/task/{self.task.pk}/toggle/', headers={'Accept': 'application/json'}
+        )
+        request._dont_enforce_csrf_checks = True
+        response = await self.call(views.AsyncTaskToggleView, request, pk=self.task.pk)
+        data = json.loads(response.content)
+        self.assertEqual(data['task']['status'], 'completed')
+        self.assertEqual(data['stats']['completed'], 1)
+        await self.task.arefresh_from_db()
+        self.assertEqual(self.task.status, 'completed')
+    
+    async def test_home_stats(self):
+        """Test the async home view shows the user's statistics."""
+        response = await self.call(views.AsyncHomeView, self.make_request('get', '/'))
+        self.assertEqual(response.context_data['total_tasks'], 1)
+    
+    async def test_login_required(self):
+        """Test anonymous users are redirected to the login page."""
+        request = self.make_request('get', '/tasks/', user=AnonymousUser())
+        response = await self.call(views.AsyncTaskListView, request)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('login'), response.url)
+
+
+@override_settings(TASK_SYNC_SETTLE_SECONDS=0)
+class TaskSyncTest(TestCase):
+    """Test cases for the delta sync API."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.tasks = [Task.objects.create(user=self.user, title=f'Task {i}') for i in range(3)]
+        self.client.login(username='testuser', password='testpass123')
+        self.url = reverse('task-sync')
+    
+    def sync(self, cursor=None, **params):
+        if cursor:
+            params['cursor'] = cursor
+        return self.client.get(self.url, params).json()
+    
+    def test_only_changes_since_cursor_are_returned(self):
+        """Test a resync after an update returns just the updated task."""
+        data = self.sync()
+        self.assertEqual([t['id'] for t in data['tasks']], [t.pk for t in self.tasks])
+        self.assertEqual(self.sync(data['cursor'])['tasks'], [])
+        
+        self.tasks[1].title = 'Renamed'
+        self.tasks[1].save()
+        data = self.sync(data['cursor'])
+        self.assertEqual([t['title'] for t in data['tasks']], ['Renamed'])
+    
+    def test_paging_survives_updates_during_sync(self):
+        """Test a task updated mid-sync is delivered again after its update."""
+        data = self.sync(limit=1)
+        seen = [t['id'] for t in data['tasks']]
+        Task.objects.filter(pk=self.tasks[0].pk).update(title='Changed')
+        while data['has_more']:
+            data = self.sync(data['cursor'], limit=1)
+            seen += [t['id'] for t in data['tasks']]
+        self.assertEqual(seen, [t.pk for t in self.tasks] + [self.tasks[0].pk])
+    
+    def test_deletes_leave_tombstones(self):
+        """Test view and bulk (admin) deletes are reported to sync clients."""
+        cursor = self.sync()['cursor']
+        self.client.post(reverse('task-delete', kwargs={'pk': self.tasks[0].pk}))
+        Task.objects.filter(pk=self.tasks[1].pk).delete()
+        data = self.sync(cursor)
+        self.assertEqual([d['id'] for d in data['deleted']], [self.tasks[0].pk, self.tasks[1].pk])
+        self.assertEqual(data['tasks'], [])
+    
+    def test_deleting_user_leaves_no_tombstones(self):
+        """Test cascaded deletes do not try to record tombstones."""
+        self.user.delete()
+        self.assertFalse(TaskTombstone.objects.exists())
+    
+    @override_settings(TASK_SYNC_SETTLE_SECONDS=60)
+    def test_recent_changes_wait_for_settle_lag(self):
+        """Test changes are held back until they can no longer be overtaken."""
+        self.assertEqual(self.sync()['tasks'], [])
+    
+    def test_cursor_positions_are_seeked_to(self):
+        """Test both feeds start at the cursor in their index instead of scanning up to it."""
+        position = (self.tasks[1].updated_at, self.tasks[1].pk)
+        for queryset, field in (
+            (Task.objects.filter(user=self.user).order_by('updated_at', 'pk'), 'updated_at'),
+            (TaskTombstone.objects.filter(user=self.user).order_by('deleted_at', 'pk'), 'deleted_at'),
+        ):
+            plan = queryset.filter(after(field, position)).explain().replace(' ', '')
+            self.assertIn(f'{field}>', plan)
+    
+    @override_settings(TASK_SYNC_SETTLE_SECONDS=60)
+    def test_late_commits(self):
+        """Test writes committed within the settle lag are delivered and later ones are not."""
+        start = timezone.now()
+        
+        def sync_at(seconds, cursor=None):
+            with mock.patch('django.utils.timezone.now', return_value=start + timedelta(seconds=seconds)):
+                return changes_since(self.user, cursor)
+        
+        def commit_late(task, written_at):
+            Task.objects.filter(pk=task.pk).update(title='Late', updated_at=start + timedelta(seconds=written_at))
+        
+        cursor = sync_at(120)['cursor']
+        # Written before the cursor was handed out, committed within the lag
+        commit_late(self.tasks[0], 90)
+        data = sync_at(200, cursor)
+        self.assertEqual([t['id'] for t in data['tasks']], [self.tasks[0].pk])
+        
+        # Written before the previous horizon: the transaction outlived the lag
+        commit_late(self.tasks[1], 30)
+        self.assertEqual(sync_at(300, data['cursor'])['tasks'], [])
+        self.assertIn(self.tasks[1].pk, [t['id'] for t in sync_at(300)['tasks']])
+    
+    def test_bad_and_expired_cursors(self):
+        """Test invalid cursors are rejected and expired ones ask for a full resync."""
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+        cursor = self.sync()['cursor']
+        with self.settings(TASK_SYNC_TOMBSTONE_DAYS=0):
+            self.assertEqual(self.client.get(self.url, {'cursor': cursor}).status_code, 410)
+        
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class RequestMetricsTest(TestCase):
+    """Test cases for the request instrumentation middleware."""
+    
+    def setUp(self):
+        metrics.install()
+        metrics.REGISTRY.reset()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        Task.objects.create(user=self.user, title='Test Task')
+        self.client.login(username='testuser', password='testpass123')
+        templates = [{**settings.TEMPLATES[0], 'BACKEND': 'tasks.metrics.InstrumentedDjangoTemplates'}]
+        self.settings_override = override_settings(
+            TASK_METRICS=True,
+            TASK_CACHE_TIMEOUT=0,
+            MIDDLEWARE=['tasks.metrics.MetricsMiddleware', *settings.MIDDLEWARE],
+            TEMPLATES=templates,
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+    
+    def test_server_timing_header(self):
+        """Test responses carry SQL, template and total timings."""
+        with self.assertLogs('tasks.metrics', 'INFO') as logs:
+            response = self.client.get(reverse('task-list'))
+        timing = response['Server-Timing']
+        for name in ('db;dur=', 'tpl;dur=', 'app;dur=', 'total;dur='):
+            self.assertIn(name, timing)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'task-list')
+        self.assertGreater(record['db_queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertEqual(record['response_bytes'], len(response.content))
+    
+    def test_prometheus_endpoint(self):
+        """Test requests are aggregated per URL name and exposed for scraping."""
+        self.client.get(reverse('task-list'))
+        self.client.get(reverse('task-list'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'].split(';')[0], 'text/plain')
+        body = response.content.decode()
+        self.assertIn('taskmaster_requests_total{view="task-list",method="GET",status="200"} 2', body)
+        self.assertIn('taskmaster_request_duration_seconds_count{view="task-list",method="GET"} 2', body)
+        self.assertIn('taskmaster_db_queries_total{view="task-list",method="GET"}', body)
+    
+    def test_endpoint_access(self):
+        """Test only allowed addresses and staff can scrape, and only when enabled."""
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.9').status_code, 403)
+        with self.settings(TASK_METRICS=False):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class TaskSortTest(TestCase):
+    """Test cases for the task list sort whitelist and priority ranks."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        for title, priority in [('A', 'medium'), ('B', 'high'), ('C', 'low'), ('D', 'high')]:
+            Task.objects.create(user=self.user, title=title, priority=priority)
+        self.client.login(username='testuser', password='testpass123')
+    
+    def test_priority_sort_is_high_to_low(self):
+        """Test priority sorts by rank, not alphabetically, newest first on ties."""
+        queryset = Task.objects.filter(user=self.user).filter_for_list({'sort': '-priority'})
+        self.assertEqual([task.title for task in queryset], ['D', 'B', 'A', 'C'])
+    
+    def test_rank_follows_priority_changes(self):
+        """Test the rank stays correct for saves, bulk updates and bulk creates."""
+        task = Task.objects.get(title='C')
+        task.priority = 'high'
+        task.save()
+        Task.objects.filter(title='A').update(priority='low')
+        Task.objects.bulk_create([Task(user=self.user, title='E', priority='medium')])
+        ranks = dict(Task.objects.values_list('title', 'priority_rank'))
+        self.assertEqual(ranks, {'A': 1, 'B': 3, 'C': 3, 'D': 3, 'E': 2})
+    
+    def test_unknown_sort_keys_fall_back_to_default(self):
+        """Test arbitrary GET values cannot choose the ORDER BY column."""
+        for sort in ('description', 'user__password', '-updated_at', 'relevance'):
+            response = self.client.get(reverse('task-list'), {'sort': sort})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['sort_by'], '-created_at')
+            self.assertEqual([task.title for task in response.context['tasks']], ['D', 'C', 'B', 'A'])
+
+
+class TaskTransferTest(TestCase):
+    """Test cases for streaming export and batched import of tasks."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.other = User.objects.create_user(username='otheruser', password='testpass123')
+        Task.objects.create(user=self.user, title='Write report', priority='high', due_date='2024-01-15')
+        Task.objects.create(user=self.user, title='Call, "urgently"', status='completed')
+        Task.objects.create(user=self.other, title='Not mine')
+        self.client.login(username='testuser', password='testpass123')
+    
+    def export(self, fmt, **params):
+        response = self.client.get(reverse('task-export'), {'format': fmt, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+    
+    def test_csv_export_streams_own_tasks(self):
+        """Test the CSV export holds a header and only the user's tasks."""
+        lines = self.export('csv').decode().splitlines()
+        self.assertEqual(lines[0], ','.join(transfer.EXPORT_FIELDS))
+        self.assertEqual(len(lines), 3)
+        self.assertIn('"Call, ""urgently"""', lines[2])
+        self.assertEqual(self.export('csv', status='completed').decode().count('\n'), 2)
+        self.assertEqual(self.client.get(reverse('task-export'), {'format': 'xml'}).status_code, 400)
+    
+    def test_json_export_and_import_round_trip(self):
+        """Test an exported file imports as the same tasks for another user."""
+        exported = json.loads(self.export('json'))
+        self.assertEqual([row['title'] for row in exported], ['Write report', 'Call, "urgently"'])
+        
+        for fmt in ('json', 'csv'):
+            data = self.export(fmt)
+            self.client.login(username='otheruser', password='testpass123')
+            upload = SimpleUploadedFile(f'tasks.{fmt}', data)
+            response = self.client.post(reverse('task-import'), {'file': upload})
+            self.assertRedirects(response, reverse('task-list'))
+            self.client.login(username='testuser', password='testpass123')
+        
+        fields = ('title', 'priority', 'status', 'due_date', 'completed_at')
+        imported = list(Task.objects.filter(user=self.other, title__in=[r['title'] for r in exported])
+                        .order_by('pk').values_list(*fields))
+        originals = list(Task.objects.filter(user=self.user).order_by('pk').values_list(*fields))
+        self.assertEqual(imported, originals * 2)
+        stats = TaskStats.objects.for_user(self.other)
+        self.assertEqual((stats.total_count, stats.completed_count, stats.high_priority_count), (5, 2, 2))
+    
+    def test_invalid_rows_are_skipped_and_reported(self):
+        """Test rows failing TaskForm validation are skipped, the rest imported."""
+        data = ('title,priority,status,due_date\n'
+                'Valid,low,pending,2024-02-01\n'
+                ',low,pending,\n'
+                'Bad priority,urgent,pending,not-a-date\n'
+                'Defaults,,,\n').encode()
+        result = transfer.import_tasks(self.other, BytesIO(data), 'csv', batch_size=1)
+        self.assertEqual((result['created'], result['skipped'], result['error']), (1, 3, None))
+        self.assertEqual([number for number, errors in result['errors']], [2, 3, 4])
+        self.assertEqual(len(result['errors'][1][1]), 2)
+        self.assertEqual(TaskStats.objects.for_user(self.other).total_count, 2)
+    
+    def test_json_reader_handles_split_reads_and_bad_input(self):
+        """Test the incremental JSON reader across read boundaries and on bad input."""
+        rows = [{'title': f'Task {i}', 'description': 'x' * i} for i in range(20)]
+        stream = BytesIO(json.dumps(rows, indent=2).encode())
+        self.assertEqual(list(transfer.read_json(stream, read_size=7)), rows)
+        self.assertEqual(list(transfer.read_json(BytesIO(b' [ ] '))), [])
+        for data in (b'{}', b'[{"title": "a"} {"title": "b"}]', b'[1]', b'[{"title": "a"},'):
+            with self.assertRaises(transfer.ImportFormatError):
+                list(transfer.read_json(BytesIO(data), read_size=4))
+    
+    def test_import_command(self):
+        """Test the management command imports a file and reports parse errors."""
+        with tempfile.NamedTemporaryFile(suffix='.json') as upload:
+            upload.write(b'[{"title": "From file", "priority": "high"}, {"title": ')
+            upload.flush()
+            out, err = StringIO(), StringIO()
+            with self.assertRaises(CommandError):
+                call_command('import_tasks', 'otheruser', upload.name, stdout=out, stderr=err)
+        self.assertIn('Imported 1 tasks', out.getvalue())
+        self.assertTrue(Task.objects.filter(user=self.other, title='From file', priority='high').exists())
+
+
+class TaskAdminTest(TestCase):
+    """Test cases for the Task admin changelist and bulk actions."""
+    
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='adminpass123')
+        self.client.login(username='admin', password='adminpass123')
+        self.url = reverse('admin:tasks_task_changelist')
+        yesterday = timezone.now().date() - timedelta(days=1)
+        self.overdue = Task.objects.create(user=self.admin, title='Overdue', due_date=yesterday)
+        self.done = Task.objects.create(user=self.admin, title='Done late', due_date=yesterday,
+                                        status='completed', completed_at=timezone.now() - timedelta(days=3))
+    
+    def add_tasks(self, count):
+        for index in range(count):
+            user = User.objects.create_user(username=f'owner{Task.objects.count()}')
+            Task.objects.create(user=user, title=f'Task {index}')
+    
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Test owners are joined in and overdue is computed by the database."""
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.add_tasks(10)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(self.url)
+        self.assertEqual(len(large), len(small))
+        flags = {task.title: task.overdue_flag for task in response.context['cl'].result_list}
+        self.assertTrue(flags['Overdue'])
+        self.assertFalse(flags['Done late'])
+    
+    def test_unfiltered_count_uses_estimate(self):
+        """Test whole-table counts come from the planner statistics once available."""
+        self.add_tasks(3)
+        queryset = Task.objects.all()
+        paginator = EstimatedCountPaginator(queryset, 100)
+        self.assertEqual(paginator.count, 5)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            cursor.execute("UPDATE sqlite_stat1 SET stat = '2000000 1' WHERE tbl = 'tasks_task'")
+        self.assertEqual(EstimatedCountPaginator(queryset, 100).count, 2000000)
+        self.assertEqual(EstimatedCountPaginator(queryset.filter(status='pending'), 100).count, 4)
+    
+    def test_bulk_actions_keep_completed_at_consistent(self):
+        """Test completing sets completed_at once and pending clears it."""
+        original = self.done.completed_at
+        data = {'action': 'mark_as_completed', '_selected_action': [self.overdue.pk, self.done.pk]}
+        self.client.post(self.url, data)
+        self.overdue.refresh_from_db()
+        self.done.refresh_from_db()
+        self.assertEqual(self.overdue.status, 'completed')
+        self.assertIsNotNone(self.overdue.completed_at)
+        self.assertEqual(self.done.completed_at, original)
+        
+        self.client.post(self.url, {**data, 'action': 'mark_as_pending'})
+        self.assertEqual(
+            list(Task.objects.order_by().values_list('status', 'completed_at').distinct()),
+            [('pending', None)]
+        )
+
+
+@override_settings(AVATAR_THUMBNAIL_WORKERS=0)
+class AvatarThumbnailTest(TestCase):
+    """Test cases for the background avatar thumbnail pipeline."""
+    
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        storage_settings = override_settings(MEDIA_ROOT=media_root.name)
+        storage_settings.enable()
+        self.addCleanup(storage_settings.disable)
+        
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.profile = UserProfile.objects.create(user=self.user)
+        self.client.login(username='testuser', password='testpass123')
+    
+    def upload(self, color='red', size=(400, 300)):
+        buffer = BytesIO()
+        Image.new('RGBA', size, color).save(buffer, 'PNG')
+        data = {'username': 'testuser', 'email': 'test@example.com', 'first_name': '', 'last_name': '',
+                'bio': '', 'phone_number': '', 'birth_date': '',
+                'avatar': SimpleUploadedFile('me.png', buffer.getvalue(), content_type='image/png')}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('profile'), data)
+        self.assertRedirects(response, reverse('profile'))
+        self.profile.refresh_from_db()
+    
+    def test_upload_generates_square_variants(self):
+        """Test every size is written as WebP and JPEG after the upload commits."""
+        self.upload()
+        self.assertTrue(self.profile.avatar_variants_ready)
+        files = self.profile.avatar_variants['files']
+        for extension, pil_format in (('webp', 'WEBP'), ('jpg', 'JPEG')):
+            for size in thumbnails.AVATAR_SIZES:
+                with self.profile.avatar.storage.open(files[extension][str(size)]) as variant:
+                    image = Image.open(variant)
+                    self.assertEqual((image.format, image.size), (pil_format, (size, size)))
+    
+    def test_profile_page_uses_cached_variants(self):
+        """Test the profile serves variants with long-lived cache headers."""
+        response = self.client.get(reverse('profile'))
+        self.assertNotContains(response, '<picture>')
+        self.upload()
+        response = self.client.get(reverse('profile'))
+        url = self.profile.avatar_thumbnails['webp']['64']
+        self.assertContains(response, f'{url} 64w')
+        self.assertNotContains(response, self.profile.avatar.url)
+        
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get(reverse('avatar-thumbnail', args=['missing.webp'])).status_code, 404)
+    
+    def test_new_upload_is_resized_in_worker_pool(self):
+        """Test uploads are handed to the thread pool and stale variants are ignored."""
+        self.upload()
+        first = self.profile.avatar_variants['files']
+        with self.settings(AVATAR_THUMBNAIL_WORKERS=2), \
+                mock.patch.object(thumbnails, 'get_executor') as get_executor:
+            self.upload(color='blue')
+        get_executor.return_value.submit.assert_called_once_with(thumbnails._run_in_worker, self.profile.pk)
+        self.assertIsNone(self.profile.avatar_thumbnails)
+        
+        thumbnails.generate_avatar_variants(self.profile.pk)
+        self.profile.refresh_from_db()
+        self.assertNotEqual(self.profile.avatar_variants['files'], first)
+
+
+@override_settings(USER_CACHE_TIMEOUT=300)
+class UserCacheTest(TestCase):
+    """Test cases for the cached user and profile lookups."""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        UserProfile.objects.create(user=self.user, bio='Original bio')
+        self.client.login(username='testuser', password='testpass123')
+    
+    def user_queries(self, url):
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        tables = [query['sql'] for query in queries if 'auth_user' in query['sql'] or
+                  'tasks_userprofile' in query['sql']]
+        return response, tables
+    
+    def test_user_and_profile_come_from_cache(self):
+        """Test repeat requests load neither the user nor the profile."""
+        response, queries = self.user_queries(reverse('profile'))
+        self.assertEqual(queries, [])
+        self.assertContains(response, 'Original bio')
+    
+    def test_writes_invalidate_cache(self):
+        """Test saving the user or profile is visible on the next request."""
+        self.user_queries(reverse('profile'))
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        profile = UserProfile.objects.get(user=self.user)
+        profile.bio = 'New bio'
+        profile.save()
+        response = self.client.get(reverse('profile'))
+        self.assertContains(response, 'Renamed')
+        self.assertContains(response, 'New bio')
+        
+        self.user.is_active = False
+        self.user.save()
+        self.assertRedirects(self.client.get(reverse('profile')), f'{reverse("login")}?next=/profile/')
+    
+    def test_profile_view_does_not_write(self):
+        """Test the profile page never inserts once the profile exists."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('profile'))
+        self.assertFalse([q for q in queries if q['sql'].startswith('INSERT INTO "tasks_userprofile"')])
+        
+        legacy = User.objects.create_user(username='legacy', password='testpass123')
+        self.client.login(username='legacy', password='testpass123')
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 200)
+        self.assertTrue(UserProfile.objects.filter(user=legacy).exists())
+    
+    def test_registration_creates_user_and_profile_atomically(self):
+        """Test a failed profile insert leaves no half-registered user behind."""
+        data = {'username': 'newuser', 'first_name': 'New', 'last_name': 'User', 'email': 'new@example.com',
+                'password1': 'S3cure-pass-123', 'password2': 'S3cure-pass-123'}
+        with mock.patch.object(UserProfile.objects, 'create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse('register'), data)
+        self.assertFalse(User.objects.filter(username='newuser').exists())
+        
+        self.assertRedirects(self.client.post(reverse('register'), data), reverse('login'))
+        self.assertTrue(UserProfile.objects.filter(user__username='newuser').exists())
+
+
+class SessionStorageTest(TestCase):
+    """Test cases for the cached session and cookie message configuration."""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.task = Task.objects.create(user=self.user, title='Test Task')
+    
+    def session_queries(self, method, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url)
+        return response, [query['sql'] for query in queries if 'django_session' in query['sql']]
+    
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_session_skips_database(self):
+        """Test the task list reads the session from the cache, not the database."""
+        self.client.login(username='testuser', password='testpass123')
+        self.client.get(reverse('task-list'))
+        response, queries = self.session_queries('get', reverse('task-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+        
+        # A cache miss falls back to the database copy
+        cache.clear()
+        response, queries = self.session_queries('get', reverse('task-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+    
+    def test_flash_messages_use_cookie(self):
+        """Test a flash message is carried in a cookie without writing the session."""
+        self.client.login(username='testuser', password='testpass123')
+        response, queries = self.session_queries('post', reverse('task-toggle', kwargs={'pk': self.task.pk}))
+        self.assertIn('messages', response.cookies)
+        self.assertFalse([sql for sql in queries if not sql.startswith('SELECT')])
+        self.assertContains(self.client.get(reverse('task-list')), 'marked as completed')
+    
+    def test_benchmark_sessions_reports_and_rolls_back(self):
+        """Test the session benchmark covers every configuration and leaves no data behind."""
+        out = StringIO()
+        call_command('benchmark_sessions', tasks=5, repeat=1, stdout=out)
+        for engine in ('db', 'cached_db', 'cache', 'signed_cookies'):
+            self.assertIn(engine, out.getvalue())
+        self.assertEqual(Task.objects.count(), 1)
+
+
+class DatabaseRoutingTest(TestCase):
+    """Test cases for database URLs and read-replica routing."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.task = Task.objects.create(user=self.user, title='Test Task')
+        self.client.login(username='testuser', password='testpass123')
+    
+    def routed_reads(self, method, url):
+        """Return the response and the aliases the router picked for each read."""
+        original = replicas.PrimaryReplicaRouter.db_for_read
+        routed = []
+        
+        def record(router, model, **hints):
+            alias = original(router, model, **hints)
+            routed.append(alias)
+            return alias
+        
+        with mock.patch.object(replicas.PrimaryReplicaRouter, 'db_for_read', record):
+            response = getattr(self.client, method)(url)
+        return response, routed
+    
+    def test_parse_database_url(self):
+        """Test database URLs become DATABASES entries."""
+        config = parse_database_url('postgres://todo:p%40ss@db:5432/todo_db?sslmode=require', '/app',
+                                    conn_max_age=60, health_checks=True)
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((config['USER'], config['PASSWORD'], config['HOST'], config['PORT']),
+                         ('todo', 'p@ss', 'db', '5432'))
+        self.assertEqual(config['NAME'], 'todo_db')
+        self.assertEqual(config['OPTIONS'], {'sslmode': 'require'})
+        self.assertEqual((config['CONN_MAX_AGE'], config['CONN_HEALTH_CHECKS']), (60, True))
+        
+        self.assertEqual(str(parse_database_url('sqlite:///db.sqlite3', '/app')['NAME']), '/app/db.sqlite3')
+        self.assertEqual(str(parse_database_url('sqlite:////var/db.sqlite3', '/app')['NAME']), '/var/db.sqlite3')
+        with self.assertRaises(ValueError):
+            parse_database_url('oracle://db/todo', '/app')
+    
+    @override_settings(REPLICA_DATABASE='default')
+    def test_read_only_views_use_replica(self):
+        """Test the task list and detail read from the replica; other views do not."""
+        for url in (reverse('task-list'), reverse('task-detail', kwargs={'pk': self.task.pk}), reverse('home')):
+            response, routed = self.routed_reads('get', url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('default', routed)
+        
+        response, routed = self.routed_reads('get', reverse('task-update', kwargs={'pk': self.task.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('default', routed)
+    
+    @override_settings(REPLICA_DATABASE='default')
+    def test_writes_pin_client_to_primary(self):
+        """Test a POST pins the client's next reads to the primary."""
+        response, routed = self.routed_reads('post', reverse('task-toggle', kwargs={'pk': self.task.pk}))
+        self.assertEqual(response.cookies[replicas.PIN_COOKIE]['max-age'], settings.REPLICA_PIN_SECONDS)
+        self.assertNotIn('default', routed)
+        
+        response, routed = self.routed_reads('get', reverse('task-list'))
+        self.assertContains(response, 'marked as completed')
+        self.assertNotIn('default', routed)
+        
+        del self.client.cookies[replicas.PIN_COOKIE]
+        response, routed = self.routed_reads('get', reverse('task-list'))
+        self.assertIn('default', routed)
+    
+    def test_no_replica_configured(self):
+        """Test nothing is routed or pinned without a replica."""
+        response, routed = self.routed_reads('post', reverse('task-toggle', kwargs={'pk': self.task.pk}))
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+        response, routed = self.routed_reads('get', reverse('task-list'))
+        self.assertEqual(set(routed), {None})
+    
+    def test_health_check(self):
+        """Test the health endpoint reports every database."""
+        response = self.client.get(reverse('health'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok', 'databases': {'default': 'ok'}})
+        self.assertIn('no-store', response['Cache-Control'])
+
+
+class SQLiteBackendTest(TestCase):
+    """Test cases for the tuned SQLite backend."""
+    
+    def open_connection(self, path, **options):
+        # A handler of its own, so that the test database is not touched
+        handler = ConnectionHandler({'default': {
+            'ENGINE': 'todo_project.sqlite3',
+            'NAME': path,
+            'OPTIONS': {'timeout': 0.05, **options},
+        }})
+        wrapper = handler['default']
+        self.addCleanup(wrapper.close)
+        wrapper.ensure_connection()
+        return wrapper
+    
+    def test_init_command_sets_pragmas(self):
+        """Test every new connection runs the configured pragmas."""
+        path = tempfile.mkdtemp() + '/db.sqlite3'
+        wrapper = self.open_connection(path, init_command=settings.SQLITE_PRAGMAS)
+        with wrapper.cursor() as cursor:
+            self.assertEqual(cursor.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            self.assertEqual(cursor.execute('PRAGMA synchronous').fetchone()[0], 1)
+    
+    def test_immediate_transactions_lock_at_begin(self):
+        """Test IMMEDIATE transactions take the write lock when they start."""
+        path = tempfile.mkdtemp() + '/db.sqlite3'
+        first = self.open_connection(path, transaction_mode='IMMEDIATE')
+        second = self.open_connection(path, transaction_mode='IMMEDIATE')
+        first._start_transaction_under_autocommit()
+        with self.assertRaisesMessage(OperationalError, 'database is locked'):
+            second._start_transaction_under_autocommit()
+        first.connection.rollback()
+        
+        deferred = self.open_connection(path)
+        deferred._start_transaction_under_autocommit()
+        second._start_transaction_under_autocommit()
+        second.connection.rollback()
+        deferred.connection.rollback()
+    
+    def test_invalid_transaction_mode(self):
+        """Test an unknown transaction mode is reported as a configuration error."""
+        with self.assertRaises(ImproperlyConfigured):
+            self.open_connection(tempfile.mkdtemp() + '/db.sqlite3', transaction_mode='LAZY')
+    
+    def test_write_views_are_atomic(self):
+        """Test a task is not saved when updating its owner's counters fails."""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        data = {'title': 'New Task', 'description': '', 'priority': 'medium', 'status': 'pending', 'due_date': ''}
+        with mock.patch.object(TaskStats.objects, 'apply_delta', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse('task-create'), data)
+        self.assertFalse(Task.objects.filter(user=user).exists())
+
+
+class TaskArchiveTest(TestCase):
+    """Test cases for archiving old completed tasks."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        long_ago = timezone.now() - timedelta(days=400)
+        self.old = Task.objects.create(user=self.user, title='Old report', priority='high', status='completed')
+        self.imported = Task.objects.create(user=self.user, title='Imported report', status='completed')
+        self.recent = Task.objects.create(user=self.user, title='Recent report', status='completed')
+        self.pending = Task.objects.create(user=self.user, title='Pending report')
+        Task.objects.filter(pk=self.old.pk).update(completed_at=long_ago)
+        Task.objects.filter(pk=self.imported.pk).update(completed_at=None, updated_at=long_ago)
+        Task.objects.filter(pk=self.pending.pk).update(created_at=long_ago)
+        Task.objects.filter(pk=self.recent.pk).update(completed_at=timezone.now())
+        # Counters are created on first read
+        TaskStats.objects.for_user(self.user)
+        self.client.login(username='testuser', password='testpass123')
+    
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_tasks', '--days', '365', *args, stdout=out)
+        return out.getvalue()
+    
+    def test_archive_moves_old_completed_tasks(self):
+        """Test only tasks completed before the cutoff move, keeping their ids."""
+        self.assertIn('2 task(s) would be archived', self.archive('--dry-run'))
+        self.assertIn('Archived 2 task(s)', self.archive())
+        self.assertEqual(
+            set(ArchivedTask.objects.values_list('pk', flat=True)),
+            {self.old.pk, self.imported.pk}
+        )
+        self.assertEqual(set(Task.objects.values_list('pk', flat=True)), {self.recent.pk, self.pending.pk})
+        self.assertEqual(ArchivedTask.objects.get(pk=self.old.pk).priority, 'high')
+        self.assertFalse(TaskTombstone.objects.exists())
+    
+    def test_archive_keeps_counters_correct(self):
+        """Test archived tasks leave the counters and are counted as archived."""
+        before = TaskStats.objects.for_user(self.user)
+        self.archive()
+        stats = TaskStats.objects.for_user(self.user)
+        self.assertEqual((stats.total_count, stats.completed_count, stats.high_priority_count), (2, 1, 0))
+        self.assertEqual(stats.archived_count, 2)
+        self.assertEqual(stats.total_with_archived, before.total_count)
+        self.assertEqual(stats.completed_with_archived, before.completed_count)
+        self.assertGreater(stats.version, before.version)
+        call_command('rebuild_task_stats', '--verify', stdout=StringIO())
+    
+    def test_archive_is_resumable(self):
+        """Test a limited run stops early and the next run continues."""
+        self.assertIn('Archived 1 task(s)', self.archive('--limit', '1', '--batch-size', '1'))
+        self.assertEqual(ArchivedTask.objects.count(), 1)
+        self.assertIn('Archived 1 task(s)', self.archive())
+        self.assertIn('Archived 0 task(s)', self.archive())
+        call_command('rebuild_task_stats', '--verify', stdout=StringIO())
+    
+    def test_archive_view_and_search(self):
+        """Test archived tasks are listed and searched only in the archive view."""
+        self.archive()
+        response = self.client.get(reverse('task-list'), {'search': 'report'})
+        self.assertNotContains(response, 'Old report')
+        self.assertContains(response, f'{reverse("task-archive")}?search=report')
+        
+        response = self.client.get(reverse('task-archive'))
+        self.assertContains(response, 'Old report')
+        self.assertContains(response, 'Imported report')
+        self.assertNotContains(response, 'Recent report')
+        response = self.client.get(reverse('task-archive'), {'search': 'imported'})
+        self.assertNotContains(response, 'Old report')
+        self.assertContains(response, 'Imported report')
+        
+        response = self.client.get(reverse('task-export'), {'format': 'csv', 'archived': '1'})
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('Old report', content)
+        self.assertNotIn('Pending report', content)
+
+
+class TaskExcerptTest(TestCase):
+    """Test cases for the stored description excerpt."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.long_description = ' '.join(f'word{index}' for index in range(500))
+        self.task = Task.objects.create(user=self.user, title='Long notes', description=self.long_description)
+        self.client.login(username='testuser', password='testpass123')
+    
+    def test_excerpt_follows_description(self):
+        """Test the excerpt is recomputed by save, update and bulk_create."""
+        self.assertEqual(self.task.excerpt, ' '.join(f'word{index}' for index in range(20)) + ' …')
+        self.task.description = 'x' * 1000
+        self.task.save(update_fields=['description'])
+        self.task.refresh_from_db()
+        self.assertEqual(len(self.task.excerpt), 300)
+        
+        Task.objects.filter(pk=self.task.pk).update(description='Short notes')
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.excerpt, 'Short notes')
+        
+        created, = Task.objects.bulk_create([Task(user=self.user, title='Bulk', description='Bulk notes')])
+        self.assertEqual(Task.objects.get(pk=created.pk).excerpt, 'Bulk notes')
+        self.assertEqual(Task.objects.create(user=self.user, title='Empty').excerpt, '')
+    
+    def test_list_pages_never_load_descriptions(self):
+        """Test the task list and archive render excerpts without selecting descriptions."""
+        for url in (reverse('task-list'), reverse('task-archive')):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse([query['sql'] for query in queries if '."description"' in query['sql']])
+        response = self.client.get(reverse('task-list'))
+        self.assertContains(response, 'word19 …')
+        self.assertNotContains(response, 'word20')
+        
+        response = self.client.get(reverse('task-detail', kwargs={'pk': self.task.pk}))
+        self.assertContains(response, 'word499')
+    
+    def test_admin_changelist_defers_descriptions(self):
+        """Test the admin task list loads descriptions only on the change form."""
+        User.objects.create_superuser(username='admin', password='adminpass123')
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.get(reverse('admin:tasks_task_changelist'))
+        task, = response.context['cl'].result_list
+        self.assertIn('description', task.get_deferred_fields())
+        response = self.client.get(reverse('admin:tasks_task_change', args=[self.task.pk]))
+        self.assertContains(response, 'word499')
+    
+    def test_migration_backfills_excerpts(self):
+        """Test the migration computes excerpts for existing rows."""
+        from importlib import import_module
+        from django.apps import apps
+        migration = import_module('tasks.migrations.0011_task_excerpt')
+        Task.objects.update(excerpt='')
+        migration.backfill_excerpts(apps, None)
+        self.task.refresh_from_db()
+        self.assertTrue(self.task.excerpt.endswith('word19 …'))
+
+
+class TaskEventsTest(TestCase):
+    """Test cases for live task events and their server-sent event stream."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.task = Task.objects.create(user=self.user, title='Live task')
+        self.broker = events.LocalBroker()
+        patcher = mock.patch('tasks.events._broker', self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_writes_publish_events_on_commit(self):
+        """Test every kind of task write publishes an event for its owner."""
+        with mock.patch.object(self.broker, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                task = Task.objects.create(user=self.user, title='New')
+                task_id = task.pk
+                self.assertFalse(publish.called)
+            with self.captureOnCommitCallbacks(execute=True):
+                task.title = 'Renamed'
+                task.save()
+                Task.objects.toggle_status(task.pk)
+                Task.objects.filter(pk=task.pk).update(priority='high')
+                task.delete()
+        self.assertEqual([call.args for call in publish.call_args_list], [
+            (self.user.pk, {'type': 'created', 'id': task_id}),
+            (self.user.pk, {'type': 'updated', 'id': task_id}),
+            (self.user.pk, {'type': 'toggled', 'id': task_id}),
+            (self.user.pk, {'type': 'refresh'}),
+            (self.user.pk, {'type': 'deleted', 'id': task_id}),
+        ])
+    
+    async def test_local_broker_fans_out_per_user(self):
+        """Test events published from another thread reach only the owner's streams."""
+        first, second = self.broker.subscribe(1), self.broker.subscribe(1)
+        other = self.broker.subscribe(2)
+        await sync_to_async(self.broker.publish, thread_sensitive=False)(1, {'type': 'deleted', 'id': 5})
+        self.assertEqual(await first.get(1), {'type': 'deleted', 'id': 5})
+        self.assertEqual(await second.get(1), {'type': 'deleted', 'id': 5})
+        self.assertTrue(other.queue.empty())
+        
+        # A stream that stops reading is told to reload instead
+        for index in range(events.QUEUE_SIZE + 1):
+            first.put({'type': 'deleted', 'id': index})
+        self.assertEqual(await first.get(1), {'type': 'refresh'})
+        self.assertTrue(first.queue.empty())
+        
+        for subscription in (first, second, other):
+            subscription.close()
+        self.assertEqual(self.broker.subscriptions, {})
+    
+    @override_settings(ASYNC_VIEWS=True, TASK_EVENTS_KEEPALIVE=0.01)
+    async def test_stream_sends_cards_and_counters(self):
+        """Test the stream starts with the counters' version and renders changed cards."""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('task-events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        self.assertTrue((await anext(stream)).startswith(b'event: ready\n'))
+        self.assertEqual(await anext(stream), b': keep-alive\n\n')
+        
+        await sync_to_async(Task.objects.toggle_status)(self.task.pk)
+        self.broker.publish(self.user.pk, {'type': 'toggled', 'id': self.task.pk})
+        chunk = await anext(stream)
+        event_type, data = chunk.decode().strip().split('\n')
+        data = json.loads(data.removeprefix('data: '))
+        self.assertEqual(event_type, 'event: toggled')
+        self.assertIn(f'data-task-id="{self.task.pk}"', data['html'])
+        self.assertIn('Mark Pending', data['html'])
+        self.assertEqual(data['stats']['completed'], 1)
+        
+        self.broker.publish(self.user.pk, {'type': 'deleted', 'id': self.task.pk})
+        self.assertIn(f'"id":{self.task.pk}'.encode(), await anext(stream))
+        await stream.aclose()
+    
+    def test_stream_requires_asgi_and_login(self):
+        """Test the stream is refused to anonymous users and declined under WSGI."""
+        self.assertEqual(self.client.get(reverse('task-events')).status_code, 403)
+        self.client.login(username='testuser', password='testpass123')
+        self.assertEqual(self.client.get(reverse('task-events')).status_code, 204)
+        self.assertNotContains(self.client.get(reverse('task-list')), 'data-events-url')
+        # Rendered pages are cached per counters' version
+        cache.clear()
+        with override_settings(ASYNC_VIEWS=True):
+            response = self.client.get(reverse('task-list'))
+            self.assertContains(response, f'data-events-url="{reverse("task-events")}"')
+            self.assertContains(response, 'data-live-insert="true"')
+            response = self.client.get(reverse('task-list'), {'status': 'completed'})
+            self.assertContains(response, 'data-live-insert="false"')
+
+
+@override_settings(ACCOUNT_DELETION_WORKERS=0)
+class AccountDeletionTest(TestCase):
+    """Test cases for deleting accounts in batches."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='leaving', password='testpass123')
+        self.other = User.objects.create_user(username='staying', password='testpass123')
+        UserProfile.objects.create(user=self.user)
+        Task.objects.bulk_create(Task(user=self.user, title=f'Task {index}') for index in range(5))
+        self.kept = Task.objects.create(user=self.other, title='Kept')
+        ArchivedTask.objects.create(id=10**6, user=self.user, title='Old', created_at=timezone.now(),
+                                    updated_at=timezone.now())
+        TaskTombstone.objects.create(user=self.user, task_id=10**6 + 1)
+    
+    def assert_deleted(self):
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        for model in (Task, ArchivedTask, TaskTombstone, UserProfile, TaskStats):
+            self.assertFalse(model.objects.filter(user_id=self.user.pk).exists(), model)
+        self.assertTrue(Task.objects.filter(pk=self.kept.pk).exists())
+        self.assertFalse(AccountDeletion.objects.exists())
+    
+    def test_request_deactivates_then_deletes_in_batches(self):
+        """Test the account is deactivated at once and its rows deleted a batch at a time."""
+        self.client.login(username='leaving', password='testpass123')
+        deletion.request_account_deletion(self.user, schedule=False)
+        self.assertFalse(User.objects.get(pk=self.user.pk).is_active)
+        self.assertEqual(self.client.get(reverse('task-list')).status_code, 302)
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(deletion.delete_account(self.user.pk, batch_size=2), 7)
+        task_deletes = [query for query in queries if query['sql'].startswith('DELETE FROM "tasks_task"')]
+        self.assertEqual(len(task_deletes), 3)
+        self.assert_deleted()
+        self.assertIsNone(deletion.delete_account(self.user.pk))
+    
+    def test_interrupted_deletion_resumes(self):
+        """Test delete_accounts finishes a deletion that stopped half way."""
+        deletion.request_account_deletion(self.user, schedule=False)
+        deletion.delete_batch(Task, self.user.pk, 2, 'default')
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 3)
+        
+        out = StringIO()
+        call_command('delete_accounts', stdout=out)
+        self.assertIn('Deleted 1 account(s)', out.getvalue())
+        self.assert_deleted()
+    
+    def test_admin_delete_uses_pipeline(self):
+        """Test the admin confirms with counts and deletes through the pipeline."""
+        User.objects.create_superuser(username='admin', password='adminpass123')
+        self.client.login(username='admin', password='adminpass123')
+        url = reverse('admin:auth_user_delete', args=[self.user.pk])
+        response = self.client.get(url)
+        self.assertEqual(
+            dict(response.context['model_count']),
+            {'users': 1, 'Tasks': 5, 'Archived Tasks': 1, 'Task Tombstones': 1}
+        )
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assert_deleted()
+
+
+@override_settings(TASK_RECURRENCE_LOOKBACK_DAYS=5, TASK_RECURRENCE_HORIZON_DAYS=2)
+class RecurringTaskTest(TestCase):
+    """Test cases for recurring tasks and their virtual occurrences."""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.today = timezone.now().date()
+        TaskStats.objects.for_user(self.user)
+    
+    def create_series(self, **kwargs):
+        values = {'user': self.user, 'title': 'Water plants', 'priority': 'high', 'rule': 'FREQ=DAILY',
+                  'start_date': self.today - timedelta(days=3)}
+        return TaskSeries.objects.create(**{**values, **kwargs})
+    
+    def url(self, action, series, day):
+        return reverse(f'occurrence-{action}', args=[series.pk, day.isoformat()])
+    
+    def test_rule_expansion(self):
+        """Test the supported RRULE subset expands to the expected dates."""
+        rule = parse_rule('FREQ=MONTHLY;BYMONTHDAY=31,-1')
+        self.assertEqual(
+            list(rule.between(date(2027, 1, 1), date(2027, 1, 1), date(2027, 4, 30))),
+            [date(2027, 1, 31), date(2027, 2, 28), date(2027, 3, 31), date(2027, 4, 30)]
+        )
+        rule = parse_rule('RRULE:FREQ=WEEKLY;INTERVAL=2;BYDAY=TH,MO;COUNT=3')
+        self.assertEqual(str(rule), 'FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH;COUNT=3')
+        self.assertEqual(rule.describe(), 'Every 2 weeks on Mon, Thu, 3 times')
+        self.assertEqual(
+            list(rule.between(date(2027, 1, 7), date(2027, 1, 1), date(2027, 12, 31))),
+            [date(2027, 1, 7), date(2027, 1, 18), date(2027, 1, 21)]
+        )
+        rule = parse_rule('FREQ=DAILY;INTERVAL=3;UNTIL=20270110')
+        self.assertEqual(
+            list(rule.between(date(2027, 1, 1), date(2027, 1, 2), date(2027, 2, 1))),
+            [date(2027, 1, 4), date(2027, 1, 7), date(2027, 1, 10)]
+        )
+        for text in ('FREQ=YEARLY', 'FREQ=DAILY;BYDAY=MO', 'FREQ=WEEKLY;BYDAY=1MO', 'FREQ=DAILY;COUNT=2;UNTIL=20270101'):
+            with self.assertRaises(InvalidRule):
+                parse_rule(text)
+    
+    def test_expansion_skips_to_window(self):
+        """Test an old series is expanded from the window, not from its start."""
+        rule = parse_rule('daily')
+        dates = rule.between(date(1990, 1, 1), date(2027, 1, 1), date(2027, 1, 3))
+        with mock.patch.object(rule, 'period', wraps=rule.period) as period:
+            self.assertEqual(len(list(dates)), 3)
+        self.assertLessEqual(period.call_count, 4)
+    
+    def test_create_recurring_task_counts_virtual_occurrences(self):
+        """Test a repeating task creates one series whose occurrences are counted, not stored."""
+        response = self.client.post(reverse('task-create'), {
+            'title': 'Water plants',
+            'priority': 'high',
+            'status': 'pending',
+            'due_date': (self.today - timedelta(days=3)).isoformat(),
+            'repeat': 'daily',
+        })
+        self.assertRedirects(response, reverse('task-list'))
+        series = TaskSeries.objects.get(user=self.user)
+        self.assertEqual(series.rule, 'FREQ=DAILY')
+        self.assertFalse(Task.objects.exists())
+        
+        stats = TaskStats.objects.for_user(self.user)
+        # Three days ago through the two-day horizon
+        self.assertEqual(stats.total_count, 6)
+        self.assertEqual(stats.pending_count, 6)
+        self.assertEqual(stats.high_priority_count, 6)
+        self.assertEqual(stats.overdue_count, 3)
+        self.assertEqual(stats.series_count, 1)
+        
+        response = self.client.get(reverse('task-list'))
+        self.assertEqual(len(response.context['occurrences']), 6)
+        self.assertContains(response, self.url('toggle', series, self.today))
+        response = self.client.get(reverse('task-list'), {'status': 'completed'})
+        self.assertEqual(response.context['occurrences'], [])
+        
+        response = self.client.post(reverse('task-create'), {
+            'title': 'Bad', 'priority': 'low', 'status': 'pending', 'repeat': 'custom', 'rule': 'FREQ=HOURLY',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('rule', response.context['form'].errors)
+    
+    def test_old_occurrences_are_missed(self):
+        """Test only occurrences within the lookback window are counted."""
+        self.create_series(start_date=self.today - timedelta(days=400))
+        stats = TaskStats.objects.for_user(self.user)
+        self.assertEqual(stats.total_count, 8)
+        self.assertEqual(stats.overdue_count, 5)
+    
+    def test_toggle_materializes_occurrence(self):
+        """Test completing a virtual occurrence stores it once, then toggles the stored task."""
+        series = self.create_series()
+        day = self.today - timedelta(days=1)
+        response = self.client.post(self.url('toggle', series, day), HTTP_ACCEPT='application/json')
+        data = response.json()
+        self.assertTrue(data['task']['is_completed'])
+        task = Task.objects.get(series=series, occurrence_date=day)
+        self.assertEqual(task.status, 'completed')
+        self.assertEqual(task.due_date, day)
+        self.assertEqual(data['stats']['total'], 6)
+        self.assertEqual(data['stats']['completed'], 1)
+        self.assertEqual(data['stats']['overdue'], 2)
+        self.assertNotIn(day, [occurrence.occurrence_date for occurrence in occurrences([series], day, day)])
+        
+        self.client.post(self.url('toggle', series, day))
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'pending')
+        self.assertEqual(Task.objects.filter(series=series).count(), 1)
+        self.assertEqual(TaskStats.objects.for_user(self.user).total_count, 6)
+        
+        # Occurrences beyond the horizon can be completed ahead of time
+        far = self.today + timedelta(days=400)
+        self.assertRedirects(self.client.post(self.url('toggle', series, far)), reverse('task-list'))
+        self.assertTrue(Task.objects.filter(series=series, occurrence_date=far, status='completed').exists())
+        weekly = self.create_series(rule='FREQ=WEEKLY', start_date=self.today)
+        response = self.client.post(self.url('toggle', weekly, self.today + timedelta(days=1)))
+        self.assertEqual(response.status_code, 404)
+    
+    def test_edit_occurrence(self):
+        """Test editing a virtual occurrence stores it with the new values."""
+        series = self.create_series()
+        response = self.client.get(self.url('update', series, self.today))
+        self.assertEqual(response.context['form'].initial['title'], 'Water plants')
+        response = self.client.post(self.url('update', series, self.today), {
+            'title': 'Water the ferns', 'priority': 'low', 'status': 'in_progress',
+            'due_date': self.today.isoformat(),
+        })
+        self.assertRedirects(response, reverse('task-list'))
+        task = Task.objects.get(series=series, occurrence_date=self.today)
+        self.assertEqual(task.title, 'Water the ferns')
+        response = self.client.get(self.url('update', series, self.today))
+        self.assertRedirects(response, reverse('task-update', args=[task.pk]))
+    
+    def test_skip_and_delete(self):
+        """Test skipped and deleted occurrences stay gone, and deleting a series keeps stored tasks."""
+        series = self.create_series()
+        self.client.post(self.url('delete', series, self.today), {'scope': 'occurrence'})
+        series.refresh_from_db()
+        self.assertEqual(series.exdates, [self.today.isoformat()])
+        self.assertEqual(TaskStats.objects.for_user(self.user).total_count, 5)
+        
+        day = self.today + timedelta(days=1)
+        task, _ = views.materialize(series, day)
+        self.client.post(reverse('task-delete', args=[task.pk]))
+        series.refresh_from_db()
+        self.assertIn(day.isoformat(), series.exdates)
+        self.assertEqual(TaskStats.objects.for_user(self.user).total_count, 4)
+        
+        kept, _ = views.materialize(series, self.today - timedelta(days=1), status='completed')
+        self.client.post(self.url('delete', series, self.today - timedelta(days=2)), {'scope': 'series'})
+        self.assertFalse(TaskSeries.objects.exists())
+        kept.refresh_from_db()
+        self.assertIsNone(kept.series_id)
+        stats = TaskStats.objects.for_user(self.user)
+        self.assertEqual((stats.series_count, stats.total_count), (0, 1))
+        call_command('rebuild_task_stats', '--verify', stdout=StringIO())
+    
+    def test_archived_occurrence_stays_done(self):
+        """Test archiving a stored occurrence skips its date in the series."""
+        series = self.create_series(start_date=self.today - timedelta(days=1))
+        task, _ = views.materialize(series, self.today, status='completed')
+        Task.objects.filter(pk=task.pk).update(completed_at=timezone.now() - timedelta(days=400))
+        self.assertEqual(sum(archive_tasks(365)), 1)
+        series.refresh_from_db()
+        self.assertEqual(series.exdates, [self.today.isoformat()])
+        self.assertEqual(TaskStats.objects.for_user(self.user).total_count, 3)
+
+
+class TaskCalendarTest(TestCase):
+    """Test cases for the calendar view and its JSON feed."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.today = timezone.now().date()
+        self.month = self.today.replace(day=15)
+        self.feed_url = reverse('task-calendar-feed')
+        for index, (status, priority) in enumerate([
+            ('pending', 'high'), ('completed', 'high'), ('in_progress', 'low'), ('pending', 'medium'), ('pending', 'low'),
+        ]):
+            Task.objects.create(user=self.user, title=f'Task {index}', status=status, priority=priority,
+                                due_date=self.month)
+    
+    def get_day(self, data, day):
+        return next(entry for entry in data['days'] if entry['date'] == day.isoformat())
+    
+    def test_feed_counts_and_day_limit(self):
+        """Test per-day counts cover every task while the month lists the first few."""
+        response = self.client.get(self.feed_url, {'month': self.month.strftime('%Y-%m')})
+        data = response.json()
+        self.assertEqual(data['kind'], 'month')
+        self.assertEqual(len(data['days']) % 7, 0)
+        day = self.get_day(data, self.month)
+        self.assertEqual(day['counts']['total'], 5)
+        self.assertEqual(day['counts']['completed'], 1)
+        self.assertEqual(day['counts']['in_progress'], 1)
+        self.assertEqual(day['counts']['high'], 2)
+        self.assertEqual([task['priority'] for task in day['tasks']], ['high', 'high', 'medium'])
+        self.assertEqual(day['more'], 2)
+        
+        response = self.client.get(self.feed_url, {'week': self.month.isoformat()})
+        self.assertEqual(len(self.get_day(response.json(), self.month)['tasks']), 5)
+        self.assertEqual(self.client.get(self.feed_url, {'month': '2026-13'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('task-calendar'), {'week': 'soon'}).status_code, 404)
+    
+    def test_fixed_number_of_task_queries(self):
+        """Test a month is read with one counts query and one range query."""
+        Task.objects.bulk_create(
+            Task(user=self.user, title=f'Extra {index}', due_date=self.month - timedelta(days=index % 10))
+            for index in range(40)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('task-calendar'), {'month': self.month.strftime('%Y-%m')})
+        self.assertEqual(response.status_code, 200)
+        task_queries = [query for query in queries if 'FROM "tasks_task"' in query['sql']]
+        self.assertEqual(len(task_queries), 2)
+        self.assertContains(response, 'Task 0')
+    
+    def test_recurring_occurrences(self):
+        """Test virtual occurrences of recurring tasks appear on their days."""
+        day = self.month + timedelta(days=1)
+        TaskSeries.objects.create(user=self.user, title='Standup', rule='FREQ=DAILY', start_date=day)
+        data = self.client.get(self.feed_url, {'week': day.isoformat()}).json()
+        entry = self.get_day(data, day)
+        self.assertEqual([occurrence['title'] for occurrence in entry['occurrences']], ['Standup'])
+        self.assertEqual((entry['counts']['total'], entry['counts']['pending']), (1, 1))
+    
+    def test_etag_per_month(self):
+        """Test a month revalidates to 304 until one of its own tasks changes."""
+        params = {'month': self.month.strftime('%Y-%m')}
+        etag = self.client.get(self.feed_url, params)['ETag']
+        response = self.client.get(self.feed_url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        
+        Task.objects.create(user=self.user, title='Next year', due_date=self.month + timedelta(days=365))
+        self.assertEqual(self.client.get(self.feed_url, params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        
+        Task.objects.filter(user=self.user, title='Task 4').update(title='Renamed')
+        self.assertEqual(self.client.get(self.feed_url, params, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+    
+    def test_rename_invalidates_page_etag(self):
+        """Test the calendar page, whose header shows the username, revalidates after a rename."""
+        url = reverse('task-calendar')
+        etag = self.client.get(url)['ETag']
+        self.user.username = 'renamed'
+        self.user.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'renamed')
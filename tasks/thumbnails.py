@@ -0,0 +1,117 @@
+"""
+Resized avatar variants, generated in a background thread pool.
+
+Saving a profile whose avatar has no variants yet schedules
+generate_avatar_variants() once the transaction commits. The worker
+crops the upload to a square, resizes it to every size in AVATAR_SIZES and
+stores each one as WebP and JPEG under ``avatars/thumbs/``. File names
+start with a hash of the uploaded bytes, so a URL always serves the same
+image and can be cached forever.
+
+Until the variants exist, templates fall back to the original upload.
+"""
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger('tasks.thumbnails')
+
+AVATAR_SIZES = (64, 256)
+THUMBNAIL_DIR = 'avatars/thumbs'
+
+# (extension, Pillow format, content type, save options), preferred first
+THUMBNAIL_FORMATS = (
+    ('webp', 'WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+CONTENT_TYPES = {extension: content_type for extension, _, content_type, _ in THUMBNAIL_FORMATS}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide thumbnail thread pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.AVATAR_THUMBNAIL_WORKERS,
+                thread_name_prefix='avatar-thumbnails',
+            )
+        return _executor
+
+
+def schedule_avatar_variants(profile_pk):
+    """Generate a profile's avatar variants in the pool, or inline without workers."""
+    if settings.AVATAR_THUMBNAIL_WORKERS <= 0:
+        generate_avatar_variants(profile_pk)
+    else:
+        get_executor().submit(_run_in_worker, profile_pk)
+
+
+def _run_in_worker(profile_pk):
+    try:
+        generate_avatar_variants(profile_pk)
+    except Exception:
+        logger.exception('Could not generate avatar variants for profile %s', profile_pk)
+    finally:
+        # Pool threads outlive requests, so nothing else closes their connections
+        connections.close_all()
+
+
+def render_variant(image, size, pil_format, options):
+    """Return the bytes of image cropped to a size x size square."""
+    variant = ImageOps.fit(image, (size, size), Image.LANCZOS)
+    buffer = BytesIO()
+    variant.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def open_upload(data):
+    """Decode an upload into an upright RGB image on a white background."""
+    image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def generate_avatar_variants(profile_pk):
+    """Write every avatar variant for a profile and record their names."""
+    from .accounts import invalidate_user
+    from .models import UserProfile
+    
+    profile = UserProfile.objects.filter(pk=profile_pk).first()
+    if profile is None or not profile.avatar:
+        return
+    source = profile.avatar.name
+    storage = profile.avatar.storage
+    with storage.open(source, 'rb') as upload:
+        data = upload.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    image = open_upload(data)
+    
+    files = {}
+    for extension, pil_format, _, options in THUMBNAIL_FORMATS:
+        for size in AVATAR_SIZES:
+            name = f'{THUMBNAIL_DIR}/{digest}-{size}.{extension}'
+            if not storage.exists(name):
+                name = storage.save(name, ContentFile(render_variant(image, size, pil_format, options)))
+            files.setdefault(extension, {})[str(size)] = name
+    
+    # Only record them if the avatar has not been replaced in the meantime
+    updated = UserProfile.objects.filter(pk=profile_pk, avatar=source).update(
+        avatar_variants={'source': source, 'files': files}
+    )
+    if updated:
+        invalidate_user(profile.user_id)
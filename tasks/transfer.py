@@ -0,0 +1,272 @@
+"""
+Export and import of a user's tasks as CSV or JSON.
+
+Both directions work on a bounded window of rows, so memory stays flat
+however many tasks are involved:
+
+* Exports read the queryset with ``iterator(chunk_size=...)`` (or
+  ``aiterator()`` under ASGI) and encode it row by row for a
+  StreamingHttpResponse.
+* Imports parse the upload incrementally, validate each row with the
+  TaskForm fields and write valid rows with ``bulk_create`` in batches,
+  one transaction per batch. Invalid rows are skipped and reported.
+"""
+import codecs
+import csv
+import io
+import json
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .forms import TaskForm
+from .models import Task, TaskStats
+
+
+EXPORT_FIELDS = (
+    'id',
+    'title',
+    'description',
+    'priority',
+    'status',
+    'due_date',
+    'created_at',
+    'updated_at',
+    'completed_at',
+)
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+}
+
+EXPORT_CHUNK_SIZE = 2000
+IMPORT_BATCH_SIZE = 1000
+# Errors kept in the import result; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+
+class ImportFormatError(ValueError):
+    """Raised when an upload cannot be parsed as the given format."""
+
+
+def export_rows(queryset):
+    return queryset.order_by('pk').values_list(*EXPORT_FIELDS)
+
+
+class Echo:
+    """A file-like object whose write() returns what it is given."""
+    
+    def write(self, value):
+        return value
+
+
+class CSVEncoder:
+    """Encode exported rows as CSV lines under a header line."""
+    
+    def __init__(self):
+        self.writer = csv.writer(Echo())
+    
+    def header(self):
+        return self.writer.writerow(EXPORT_FIELDS)
+    
+    def row(self, values, first):
+        return self.writer.writerow(['' if value is None else value for value in values])
+    
+    def footer(self):
+        return ''
+
+
+class JSONEncoder:
+    """Encode exported rows as the objects of one JSON array."""
+    
+    def header(self):
+        return '['
+    
+    def row(self, values, first):
+        data = json.dumps(dict(zip(EXPORT_FIELDS, values)), cls=DjangoJSONEncoder)
+        return ('\n' if first else ',\n') + data
+    
+    def footer(self):
+        return '\n]\n'
+
+
+ENCODERS = {'csv': CSVEncoder, 'json': JSONEncoder}
+
+
+def stream_export(queryset, fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the tasks in queryset encoded as fmt, a chunk of rows at a time."""
+    encoder = ENCODERS[fmt]()
+    yield encoder.header()
+    first, lines = True, []
+    for values in export_rows(queryset).iterator(chunk_size=chunk_size):
+        lines.append(encoder.row(values, first))
+        first = False
+        if len(lines) >= chunk_size:
+            yield ''.join(lines)
+            lines = []
+    yield ''.join(lines) + encoder.footer()
+
+
+async def astream_export(queryset, fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    """Async variant of stream_export(), for StreamingHttpResponse under ASGI."""
+    encoder = ENCODERS[fmt]()
+    yield encoder.header()
+    first, lines = True, []
+    async for values in export_rows(queryset).aiterator(chunk_size=chunk_size):
+        lines.append(encoder.row(values, first))
+        first = False
+        if len(lines) >= chunk_size:
+            yield ''.join(lines)
+            lines = []
+    yield ''.join(lines) + encoder.footer()
+
+
+def read_csv(stream):
+    """Yield each row of a binary CSV stream as a dict keyed by the header."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.DictReader(text)
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise ImportFormatError(f'Invalid CSV: {exc}') from exc
+    finally:
+        # Leave the underlying upload open for its owner to close
+        text.detach()
+
+
+def read_json(stream, read_size=64 * 1024):
+    """
+    Yield each object of a binary stream holding a JSON array.
+    
+    Only the object being decoded and one read are held in memory.
+    """
+    decoder = json.JSONDecoder()
+    reader = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer, position, eof = '', 0, False
+    started = False
+    
+    def fill():
+        nonlocal buffer, position, eof
+        try:
+            data = stream.read(read_size)
+            buffer = buffer[position:] + reader.decode(data, final=not data)
+        except UnicodeDecodeError as exc:
+            raise ImportFormatError(f'Invalid JSON: {exc}') from exc
+        position, eof = 0, not data
+    
+    def next_char():
+        """Skip whitespace and return the next character, or '' at the end."""
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer) or eof:
+                return buffer[position:position + 1]
+            fill()
+    
+    if next_char() != '[':
+        raise ImportFormatError('Invalid JSON: expected an array of tasks.')
+    position += 1
+    while True:
+        char = next_char()
+        if char == ']':
+            return
+        if started:
+            if char != ',':
+                raise ImportFormatError('Invalid JSON: expected "," or "]".')
+            position += 1
+            next_char()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as exc:
+                # The object may continue in the next read
+                if eof:
+                    raise ImportFormatError(f'Invalid JSON: {exc}') from exc
+                fill()
+                continue
+            break
+        if not isinstance(value, dict):
+            raise ImportFormatError('Invalid JSON: every task must be an object.')
+        position, started = end, True
+        yield value
+
+
+READERS = {'csv': read_csv, 'json': read_json}
+
+
+def clean_row(row):
+    """
+    Validate one imported row with the TaskForm fields.
+    
+    Missing columns get the model default. Returns the cleaned values, or
+    raises ValidationError with one message per invalid field.
+    """
+    cleaned, errors = {}, []
+    for name, field in TaskForm.base_fields.items():
+        value = row.get(name)
+        if value is None:
+            value = Task._meta.get_field(name).get_default()
+        try:
+            cleaned[name] = field.clean(value)
+        except ValidationError as exc:
+            errors.append(f'{name}: {" ".join(exc.messages)}')
+    if errors:
+        raise ValidationError(errors)
+    
+    cleaned['completed_at'] = None
+    if cleaned['status'] == 'completed':
+        cleaned['completed_at'] = clean_completed_at(row.get('completed_at'))
+    return cleaned
+
+
+def clean_completed_at(value):
+    """Parse an exported completion time; empty values give None."""
+    try:
+        completed_at = parse_datetime(str(value or ''))
+    except ValueError:
+        raise ValidationError('completed_at: Enter a valid date/time.')
+    if completed_at is not None and timezone.is_naive(completed_at):
+        completed_at = timezone.make_aware(completed_at)
+    return completed_at
+
+
+def import_tasks(user, stream, fmt, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Create tasks for user from a binary stream in the given format.
+    
+    Every batch of valid rows is committed on its own, so an unreadable
+    file keeps the batches before the point where parsing failed. Returns a
+    dict with the number of tasks ``created``, the number of ``skipped``
+    rows, the first ``errors`` as (row number, messages) pairs and the
+    parse ``error`` that stopped the import, if any.
+    """
+    result = {'created': 0, 'skipped': 0, 'errors': [], 'error': None}
+    batch = []
+    
+    def flush():
+        # One grouped counter update per batch; a rebuild would recount the
+        # user's whole task table every time
+        with transaction.atomic():
+            Task.objects.bulk_create(batch, update_stats=False)
+            TaskStats.objects.add_tasks(batch)
+        result['created'] += len(batch)
+        batch.clear()
+    
+    try:
+        for number, row in enumerate(READERS[fmt](stream), start=1):
+            try:
+                batch.append(Task(user=user, **clean_row(row)))
+            except ValidationError as exc:
+                result['skipped'] += 1
+                if len(result['errors']) < MAX_REPORTED_ERRORS:
+                    result['errors'].append((number, exc.messages))
+                continue
+            if len(batch) >= batch_size:
+                flush()
+    except ImportFormatError as exc:
+        result['error'] = str(exc)
+    if batch:
+        flush()
+    return result
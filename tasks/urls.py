@@ -1,13 +1,26 @@
 """
 URL configuration for tasks application.
 """
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from . import views
 
+# The hot views have async variants, used when serving over ASGI
+if settings.ASYNC_VIEWS:
+    HomeView = views.AsyncHomeView
+    TaskListView = views.AsyncTaskListView
+    TaskDetailView = views.AsyncTaskDetailView
+    TaskToggleView = views.AsyncTaskToggleView
+else:
+    HomeView = views.HomeView
+    TaskListView = views.TaskListView
+    TaskDetailView = views.TaskDetailView
+    TaskToggleView = views.TaskToggleView
+
 urlpatterns = [
     # Home and About
-    path('', views.HomeView.as_view(), name='home'),
+    path('', HomeView.as_view(), name='home'),
     path('about/', views.AboutView.as_view(), name='about'),
     
     # Authentication
@@ -15,12 +28,33 @@ urlpatterns = [
     path('login/', auth_views.LoginView.as_view(template_name='registration/login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
     path('profile/', views.ProfileView.as_view(), name='profile'),
+    path('avatars/<str:name>', views.AvatarThumbnailView.as_view(), name='avatar-thumbnail'),
     
     # Task Management
-    path('tasks/', views.TaskListView.as_view(), name='task-list'),
-    path('task/<int:pk>/', views.TaskDetailView.as_view(), name='task-detail'),
+    path('tasks/', TaskListView.as_view(), name='task-list'),
+    path('task/<int:pk>/', TaskDetailView.as_view(), name='task-detail'),
     path('task/create/', views.TaskCreateView.as_view(), name='task-create'),
     path('task/<int:pk>/update/', views.TaskUpdateView.as_view(), name='task-update'),
     path('task/<int:pk>/delete/', views.TaskDeleteView.as_view(), name='task-delete'),
-    path('task/<int:pk>/toggle/', views.TaskToggleView.as_view(), name='task-toggle'),
+    path('task/<int:pk>/toggle/', TaskToggleView.as_view(), name='task-toggle'),
+    path('task/series/<int:pk>/<str:day>/toggle/', views.OccurrenceToggleView.as_view(), name='occurrence-toggle'),
+    path('task/series/<int:pk>/<str:day>/update/', views.OccurrenceUpdateView.as_view(), name='occurrence-update'),
+    path('task/series/<int:pk>/<str:day>/delete/', views.OccurrenceDeleteView.as_view(), name='occurrence-delete'),
+    path('tasks/export/', views.TaskExportView.as_view(), name='task-export'),
+    path('tasks/import/', views.TaskImportView.as_view(), name='task-import'),
+    path('tasks/archive/', views.ArchivedTaskListView.as_view(), name='task-archive'),
+    path('tasks/calendar/', views.TaskCalendarView.as_view(), name='task-calendar'),
+    
+    # Sync API
+    path('api/tasks/sync/', views.TaskSyncView.as_view(), name='task-sync'),
+    
+    # Calendar feed
+    path('api/tasks/calendar/', views.TaskCalendarFeedView.as_view(), name='task-calendar-feed'),
+    
+    # Live updates (server-sent events, served under ASGI)
+    path('api/tasks/events/', views.TaskEventStreamView.as_view(), name='task-events'),
+    
+    # Monitoring
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
+    path('health/', views.HealthView.as_view(), name='health'),
 ]
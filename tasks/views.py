@@ -1,10 +1,16 @@
 """
 Views for the tasks application.
 """
+import asyncio
+import hashlib
+from datetime import date
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.core.exceptions import PermissionDenied
 from django.views.generic import (
     ListView,
     DetailView,
@@ -14,30 +20,153 @@ from django.views.generic import (
     TemplateView,
     View
 )
-from django.urls import reverse_lazy
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.urls import reverse, reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.db import DatabaseError, connections, transaction
 from django.db.models import Q, Count
 from django.utils import timezone
-from .models import Task, UserProfile
-from .forms import TaskForm, UserRegisterForm, UserUpdateForm, ProfileUpdateForm
+from .accounts import get_profile
+from .agenda import CalendarRange, InvalidRange, build_days, calendar_etag, day_counts, range_tasks, user_series
+from .archive import search_archive
+from .events import format_event, get_broker
+from .models import ArchivedTask, Task, TaskQuerySet, TaskSeries, TaskStats, UserProfile
+from .forms import TaskCreateForm, TaskForm, TaskImportForm, UserRegisterForm, UserUpdateForm, ProfileUpdateForm
+from .metrics import REGISTRY
+from .pagination import CountQuerysetPaginator, KeysetPaginator
+from .series import Occurrence, materialize, skip_occurrences, stored_occurrence, upcoming_occurrences
+from .sync import DEFAULT_LIMIT, MAX_LIMIT, ExpiredSyncCursor, InvalidSyncCursor, changes_since
+from .thumbnails import CONTENT_TYPES, THUMBNAIL_DIR
+from .transfer import FORMATS, astream_export, import_tasks, stream_export
+
+
+class WriteTransactionMixin:
+    """
+    Handle POST and other unsafe requests in a single transaction.
+    
+    A task is committed together with its owner's counters and tombstone,
+    a user with the profile. On SQLite the transaction takes the write lock
+    up front (see todo_project/sqlite3/base.py) instead of failing half way
+    through.
+    """
+    
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return super().dispatch(request, *args, **kwargs)
+        with transaction.atomic():
+            return super().dispatch(request, *args, **kwargs)
+
+
+class ConditionalTaskViewMixin:
+    """
+    Answer repeat GETs with 304 Not Modified while the user's tasks are unchanged.
+    
+    The validators come from the user's TaskStats row, whose version is
+    bumped by every task write including deletes, so checking freshness
+    costs a single lookup. The header shows the username, so it is part of
+    the ETag as well. Rendered pages are cached under the same ETag, which
+    makes that version the per-user cache key for whole pages.
+    """
+    
+    def get_task_stats(self):
+        if not hasattr(self, 'task_stats'):
+            self.task_stats = TaskStats.objects.for_user(self.request.user)
+        return self.task_stats
+    
+    def get_etag(self, stats):
+        request = self.request
+        # Make sure the CSRF secret exists before it is folded into the ETag
+        get_token(request)
+        parts = [
+            request.user.pk,
+            # Profile edits can rename the user shown in the header
+            request.user.username,
+            stats.pk,
+            stats.version,
+            stats.changed_at.isoformat() if stats.changed_at else '',
+            # Overdue badges depend on the date
+            timezone.now().date().isoformat(),
+            request.get_full_path(),
+            # Rendered forms embed a token derived from the CSRF secret
+            request.META.get('CSRF_COOKIE', ''),
+        ]
+        digest = hashlib.sha256('|'.join(map(str, parts)).encode()).hexdigest()
+        return f'"{digest[:32]}"'
+    
+    def get_last_modified(self, stats):
+        return int(stats.changed_at.timestamp()) if stats.changed_at else None
+    
+    def has_pending_messages(self):
+        return bool(len(messages.get_messages(self.request)))
+    
+    def get_page_cache_key(self, etag):
+        # The ETag already covers everything the rendered page depends on,
+        # including the username, so renaming the user skips stale pages
+        return 'task_page:' + etag.strip('"')
+    
+    def get_cached_response(self, etag):
+        if not settings.TASK_CACHE_TIMEOUT:
+            return None
+        content = cache.get(self.get_page_cache_key(etag))
+        return None if content is None else HttpResponse(content)
+    
+    def cache_rendered_page(self, response, etag):
+        """Store the page in the cache once it has been rendered."""
+        def store(response):
+            if response.status_code == 200:
+                cache.set(self.get_page_cache_key(etag), response.content, settings.TASK_CACHE_TIMEOUT)
+        if settings.TASK_CACHE_TIMEOUT and hasattr(response, 'add_post_render_callback'):
+            response.add_post_render_callback(store)
+        return response
+    
+    def add_validators(self, response, etag, last_modified):
+        response.headers['ETag'] = etag
+        if last_modified is not None:
+            response.headers['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    
+    def get(self, request, *args, **kwargs):
+        stats = self.get_task_stats()
+        etag = self.get_etag(stats)
+        last_modified = self.get_last_modified(stats)
+        
+        # Pending flash messages must be rendered, so never short-circuit them
+        if self.has_pending_messages():
+            response = super().get(request, *args, **kwargs)
+        else:
+            response = (
+                get_conditional_response(request, etag=etag, last_modified=last_modified) or
+                self.get_cached_response(etag)
+            )
+            if response is None:
+                response = self.cache_rendered_page(super().get(request, *args, **kwargs), etag)
+        return self.add_validators(response, etag, last_modified)
 
 
 class HomeView(TemplateView):
     """Home page view."""
     template_name = 'tasks/home.html'
+    replica_reads = True
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         if self.request.user.is_authenticated:
-            context['total_tasks'] = Task.objects.filter(user=self.request.user).count()
-            context['completed_tasks'] = Task.objects.filter(
-                user=self.request.user,
-                status='completed'
-            ).count()
-            context['pending_tasks'] = Task.objects.filter(
-                user=self.request.user,
-                status='pending'
-            ).count()
+            context.update(self.get_stats_context(TaskStats.objects.for_user(self.request.user)))
         return context
+    
+    def get_stats_context(self, stats):
+        return {
+            'stats': stats,
+            'total_tasks': stats.total_with_archived,
+            'completed_tasks': stats.completed_with_archived,
+            'pending_tasks': stats.pending_count,
+        }
 
 
 class AboutView(TemplateView):
@@ -57,42 +186,41 @@ class RegisterView(View):
     def post(self, request):
         form = UserRegisterForm(request.POST)
         if form.is_valid():
-            user = form.save()
-            # Create user profile
-            UserProfile.objects.create(user=user)
+            # The user and the profile exist together or not at all
+            with transaction.atomic():
+                user = form.save()
+                UserProfile.objects.create(user=user)
             messages.success(request, f'Account created successfully for {user.username}! You can now log in.')
             return redirect('login')
         return render(request, 'registration/register.html', {'form': form})
 
 
-class ProfileView(LoginRequiredMixin, View):
+class ProfileView(LoginRequiredMixin, WriteTransactionMixin, View):
     """User profile view."""
+    replica_reads = True
     
     def get(self, request):
-        # Get or create user profile
-        user_profile, created = UserProfile.objects.get_or_create(user=request.user)
+        user_profile = get_profile(request.user)
         
         user_form = UserUpdateForm(instance=request.user)
         profile_form = ProfileUpdateForm(instance=user_profile)
         
         # Get user statistics
-        total_tasks = Task.objects.filter(user=request.user).count()
-        completed_tasks = Task.objects.filter(user=request.user, status='completed').count()
-        pending_tasks = Task.objects.filter(user=request.user, status='pending').count()
-        high_priority = Task.objects.filter(user=request.user, priority='high').count()
+        stats = TaskStats.objects.for_user(request.user)
         
         context = {
             'user_form': user_form,
             'profile_form': profile_form,
-            'total_tasks': total_tasks,
-            'completed_tasks': completed_tasks,
-            'pending_tasks': pending_tasks,
-            'high_priority': high_priority,
+            'stats': stats,
+            'total_tasks': stats.total_with_archived,
+            'completed_tasks': stats.completed_with_archived,
+            'pending_tasks': stats.pending_count,
+            'high_priority': stats.high_priority_count,
         }
         return render(request, 'registration/profile.html', context)
     
     def post(self, request):
-        user_profile, created = UserProfile.objects.get_or_create(user=request.user)
+        user_profile = get_profile(request.user)
         
         user_form = UserUpdateForm(request.POST, instance=request.user)
         profile_form = ProfileUpdateForm(request.POST, request.FILES, instance=user_profile)
@@ -110,63 +238,133 @@ class ProfileView(LoginRequiredMixin, View):
         return render(request, 'registration/profile.html', context)
 
 
-class TaskListView(LoginRequiredMixin, ListView):
+class AvatarThumbnailView(View):
+    """
+    Serve a resized avatar with far-future cache headers.
+    
+    Variant names start with a hash of the image, so a URL never changes
+    content and browsers never need to revalidate it.
+    """
+    
+    def get(self, request, name):
+        extension = name.rsplit('.', 1)[-1]
+        path = f'{THUMBNAIL_DIR}/{name}'
+        if extension not in CONTENT_TYPES or name.startswith('.') or not default_storage.exists(path):
+            raise Http404('No such avatar')
+        response = FileResponse(default_storage.open(path, 'rb'), content_type=CONTENT_TYPES[extension])
+        patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+        return response
+
+
+class TaskListView(LoginRequiredMixin, ConditionalTaskViewMixin, ListView):
     """List view for tasks."""
     model = Task
+    replica_reads = True
     template_name = 'tasks/task_list.html'
     context_object_name = 'tasks'
     paginate_by = 10
     
     def get_queryset(self):
-        queryset = Task.objects.filter(user=self.request.user)
-        
-        # Filter by status
-        status_filter = self.request.GET.get('status')
-        if status_filter:
-            if status_filter == 'active':
-                queryset = queryset.exclude(status='completed')
-            elif status_filter == 'completed':
-                queryset = queryset.filter(status='completed')
-        
-        # Filter by priority
-        priority_filter = self.request.GET.get('priority')
-        if priority_filter:
-            queryset = queryset.filter(priority=priority_filter)
-        
-        # Search
-        search_query = self.request.GET.get('search')
-        if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(description__icontains=search_query)
-            )
-        
-        # Sort
-        sort_by = self.request.GET.get('sort', '-created_at')
-        queryset = queryset.order_by(sort_by)
+        # Cards show the stored excerpt; the detail view loads the full text
+        return Task.objects.filter(user=self.request.user).filter_for_list(self.request.GET).defer('description')
+    
+    def get_sort(self):
+        return Task.objects.get_sort(self.request.GET)
+    
+    def uses_cursor_pagination(self):
+        # Relevance ranks are computed per query, so they have no stable keyset
+        if self.get_sort() == 'relevance':
+            return False
+        return settings.TASK_LIST_PAGINATION == 'cursor'
+    
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        count_queryset = None
+        if self.get_sort() == 'relevance':
+            params = self.request.GET.copy()
+            params['sort'] = '-created_at'
+            count_queryset = Task.objects.filter(user=self.request.user).filter_for_list(params)
+        return CountQuerysetPaginator(
+            queryset,
+            per_page,
+            count_queryset=count_queryset,
+            orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+            **kwargs
+        )
+    
+    def get_keyset_paginator(self, queryset, page_size):
+        try:
+            return KeysetPaginator(queryset, page_size)
+        except ValueError:
+            return KeysetPaginator(queryset, page_size, ordering='-created_at')
+    
+    def paginate_queryset(self, queryset, page_size):
+        if not self.uses_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
         
-        return queryset
+        paginator = self.get_keyset_paginator(queryset, page_size)
+        page = paginator.page(self.request.GET.get('cursor'))
+        return paginator, page, page.object_list, page.has_other_pages()
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context.update(self.get_list_context())
+        context['occurrences'] = self.get_occurrences()
+        return context
+    
+    def get_list_context(self):
+        """Filter state and statistics shown around the paginated tasks."""
+        context = {}
+        context['cursor_pagination'] = self.uses_cursor_pagination()
         context['status_filter'] = self.request.GET.get('status', 'all')
         context['priority_filter'] = self.request.GET.get('priority', '')
         context['search_query'] = self.request.GET.get('search', '')
-        context['sort_by'] = self.request.GET.get('sort', '-created_at')
+        context['sort_by'] = self.get_sort()
+        
+        # Live updates (ASGI only); new tasks are only inserted into the
+        # unfiltered first page, which is where they belong
+        context['events_url'] = reverse('task-events') if settings.ASYNC_VIEWS else ''
+        params = self.request.GET
+        context['live_insert'] = (
+            context['status_filter'] == 'all' and
+            context['sort_by'] == TaskQuerySet.DEFAULT_SORT and
+            not context['priority_filter'] and
+            not context['search_query'] and
+            not params.get('cursor') and
+            params.get('page', '1') == '1'
+        )
         
         # Statistics
-        all_tasks = Task.objects.filter(user=self.request.user)
-        context['total_count'] = all_tasks.count()
-        context['active_count'] = all_tasks.exclude(status='completed').count()
-        context['completed_count'] = all_tasks.filter(status='completed').count()
-        context['overdue_count'] = sum(1 for task in all_tasks if task.is_overdue)
+        stats = self.get_task_stats()
+        context['stats'] = stats
+        context['total_count'] = stats.total_count
+        context['active_count'] = stats.active_count
+        context['completed_count'] = stats.completed_count
+        context['overdue_count'] = stats.overdue_count
+        context['archived_count'] = stats.archived_count
+        
+        # Task card fragment cache; cards embed a CSRF token, so they are
+        # only shared between pages rendered for the same session
+        context['card_cache_timeout'] = settings.TASK_CACHE_TIMEOUT
+        context['card_cache_scope'] = hashlib.sha256(
+            self.request.META.get('CSRF_COOKIE', '').encode()
+        ).hexdigest()[:16]
+        context['today'] = timezone.now().date()
         
         return context
+    
+    def get_occurrences(self):
+        """Virtual occurrences of recurring tasks, which lead the first page."""
+        params = self.request.GET
+        if not self.get_task_stats().series_count or params.get('cursor') or params.get('page', '1') != '1':
+            return []
+        return upcoming_occurrences(self.request.user, params, timezone.now().date())
 
 
-class TaskDetailView(LoginRequiredMixin, DetailView):
+class TaskDetailView(LoginRequiredMixin, ConditionalTaskViewMixin, DetailView):
     """Detail view for a single task."""
     model = Task
+    replica_reads = True
     template_name = 'tasks/task_detail.html'
     context_object_name = 'task'
     
@@ -174,18 +372,180 @@ class TaskDetailView(LoginRequiredMixin, DetailView):
         return Task.objects.filter(user=self.request.user)
 
 
-class TaskCreateView(LoginRequiredMixin, CreateView):
-    """Create view for tasks."""
+class ArchivedTaskListView(LoginRequiredMixin, ListView):
+    """
+    Read-only list of the user's archived tasks, newest completion first.
+    
+    The archive is only read here, so the task list and its search never
+    pay for it.
+    """
+    model = ArchivedTask
+    replica_reads = True
+    template_name = 'tasks/task_archive.html'
+    context_object_name = 'tasks'
+    paginate_by = 10
+    
+    def get_queryset(self):
+        queryset = ArchivedTask.objects.filter(user=self.request.user).order_by('-completed_at', '-id').defer('description')
+        search_query = self.request.GET.get('search')
+        if search_query:
+            queryset = search_archive(queryset, search_query)
+        return queryset
+    
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size)
+        page = paginator.page(self.request.GET.get('cursor'))
+        return paginator, page, page.object_list, page.has_other_pages()
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['search_query'] = self.request.GET.get('search', '')
+        context['archived_count'] = TaskStats.objects.for_user(self.request.user).archived_count
+        context['archive_days'] = settings.TASK_ARCHIVE_DAYS
+        return context
+
+
+class TaskCalendarMixin:
+    """
+    A month or week of tasks by due date (see agenda.py).
+    
+    Revalidation only runs the per-day counts and series queries that the
+    ETag is made of, so a month that did not change answers 304 Not
+    Modified however much changed in other months.
+    """
+    
+    def get(self, request):
+        today = timezone.now().date()
+        try:
+            calendar_range = CalendarRange.from_params(request.GET, today)
+        except InvalidRange as exc:
+            return self.invalid_range(exc)
+        counts = day_counts(request.user, calendar_range.first, calendar_range.last)
+        series_list = user_series(request.user)
+        etag = calendar_etag(calendar_range, counts, series_list, today, self.get_etag_extra())
+        
+        response = None if self.has_pending_messages() else get_conditional_response(request, etag=etag)
+        if response is None:
+            tasks = range_tasks(request.user, calendar_range.first, calendar_range.last, calendar_range.per_day)
+            days = build_days(calendar_range, counts, tasks, series_list, today)
+            response = self.render_calendar(calendar_range, days, today)
+        response.headers['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    
+    def get_etag_extra(self):
+        return self.request.get_full_path()
+    
+    def has_pending_messages(self):
+        return False
+
+
+class TaskCalendarView(LoginRequiredMixin, TaskCalendarMixin, View):
+    """Month grid or week agenda of the user's tasks."""
+    replica_reads = True
+    template_name = 'tasks/task_calendar.html'
+    
+    def get_etag_extra(self):
+        # Make sure the CSRF secret exists before it is folded into the ETag
+        get_token(self.request)
+        # The header shows the username
+        return '|'.join((
+            super().get_etag_extra(), self.request.user.username, self.request.META.get('CSRF_COOKIE', ''),
+        ))
+    
+    def has_pending_messages(self):
+        return bool(len(messages.get_messages(self.request)))
+    
+    def invalid_range(self, exc):
+        raise Http404(str(exc))
+    
+    def render_calendar(self, calendar_range, days, today):
+        context = {
+            'calendar': calendar_range,
+            'days': days,
+            'weeks': [days[start:start + 7] for start in range(0, len(days), 7)],
+            'weekdays': [day.date for day in days[:7]],
+            'today': today,
+            'day_limit': calendar_range.per_day,
+        }
+        return render(self.request, self.template_name, context)
+
+
+class TaskCalendarFeedView(LoginRequiredMixin, TaskCalendarMixin, View):
+    """JSON feed of the calendar, for the same month and week parameters."""
+    replica_reads = True
+    raise_exception = True
+    
+    def invalid_range(self, exc):
+        return JsonResponse({'error': str(exc)}, status=400)
+    
+    def render_calendar(self, calendar_range, days, today):
+        return JsonResponse({
+            'kind': calendar_range.kind,
+            'start': calendar_range.first.isoformat(),
+            'end': calendar_range.last.isoformat(),
+            'previous': reverse('task-calendar-feed') + '?' + calendar_range.previous.param,
+            'next': reverse('task-calendar-feed') + '?' + calendar_range.next.param,
+            'days': [
+                {
+                    'date': day.date.isoformat(),
+                    'counts': {**day.counts, 'overdue': day.overdue},
+                    'more': day.more,
+                    'tasks': [
+                        {
+                            'id': task.pk,
+                            'title': task.title,
+                            'status': task.status,
+                            'priority': task.priority,
+                            'url': reverse('task-detail', args=[task.pk]),
+                        }
+                        for task in day.tasks
+                    ],
+                    'occurrences': [
+                        {
+                            'series': occurrence.series.pk,
+                            'title': occurrence.title,
+                            'priority': occurrence.priority,
+                            'toggle_url': occurrence.toggle_url,
+                            'update_url': occurrence.update_url,
+                        }
+                        for occurrence in day.occurrences
+                    ],
+                }
+                for day in days
+            ],
+        })
+
+
+class TaskCreateView(LoginRequiredMixin, WriteTransactionMixin, CreateView):
+    """Create view for tasks, and for recurring tasks."""
     model = Task
-    form_class = TaskForm
+    form_class = TaskCreateForm
     template_name = 'tasks/task_form.html'
     success_url = reverse_lazy('task-list')
     
     def form_valid(self, form):
+        recurrence = form.cleaned_data['recurrence']
+        if recurrence is not None:
+            return self.create_series(form, recurrence)
         form.instance.user = self.request.user
         messages.success(self.request, 'Task created successfully!')
         return super().form_valid(form)
     
+    def create_series(self, form, recurrence):
+        """Store the rule once; occurrences stay virtual until they are done."""
+        data = form.cleaned_data
+        TaskSeries.objects.create(
+            user=self.request.user,
+            title=data['title'],
+            description=data['description'],
+            priority=data['priority'],
+            rule=str(recurrence),
+            start_date=data['due_date'] or timezone.now().date(),
+        )
+        messages.success(self.request, f'Recurring task created ({recurrence.describe().lower()})!')
+        return redirect(self.success_url)
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['form_title'] = 'Create New Task'
@@ -193,7 +553,7 @@ class TaskCreateView(LoginRequiredMixin, CreateView):
         return context
 
 
-class TaskUpdateView(LoginRequiredMixin, UpdateView):
+class TaskUpdateView(LoginRequiredMixin, WriteTransactionMixin, UpdateView):
     """Update view for tasks."""
     model = Task
     form_class = TaskForm
@@ -214,7 +574,7 @@ class TaskUpdateView(LoginRequiredMixin, UpdateView):
         return context
 
 
-class TaskDeleteView(LoginRequiredMixin, DeleteView):
+class TaskDeleteView(LoginRequiredMixin, WriteTransactionMixin, DeleteView):
     """Delete view for tasks."""
     model = Task
     template_name = 'tasks/task_confirm_delete.html'
@@ -229,16 +589,456 @@ class TaskDeleteView(LoginRequiredMixin, DeleteView):
 
 
 class TaskToggleView(LoginRequiredMixin, View):
-    """Toggle task completion status."""
+    """
+    Toggle task completion status.
+    
+    Requests that accept JSON get the new task state and counters back
+    instead of a flash message and a redirect.
+    """
+    
+    def wants_json(self, request):
+        return (
+            'application/json' in request.headers.get('Accept', '') or
+            request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+        )
     
     def post(self, request, pk):
-        task = get_object_or_404(Task, pk=pk, user=request.user)
+        task = Task.objects.filter(user=request.user).toggle_status(pk)
+        if task is None:
+            raise Http404('No task found matching the query')
+        
+        if self.wants_json(request):
+            return JsonResponse(self.get_json_data(task, TaskStats.objects.for_user(request.user)))
         
-        if task.status == 'completed':
-            task.mark_pending()
-            messages.info(request, f'Task "{task.title}" marked as pending.')
+        return self.redirect_with_message(request, task)
+    
+    def redirect_with_message(self, request, task):
+        if task['status'] == 'completed':
+            messages.success(request, f'Task "{task["title"]}" marked as completed!')
         else:
-            task.mark_completed()
-            messages.success(request, f'Task "{task.title}" marked as completed!')
+            messages.info(request, f'Task "{task["title"]}" marked as pending.')
         
         return redirect('task-list')
+    
+    def get_json_data(self, task, stats):
+        due_date = task['due_date']
+        return {
+            'task': {
+                'id': task['pk'],
+                'status': task['status'],
+                'status_display': dict(Task.STATUS_CHOICES)[task['status']],
+                'is_completed': task['status'] == 'completed',
+                'is_overdue': bool(
+                    due_date and task['status'] != 'completed' and due_date < timezone.now().date()
+                ),
+                'completed_at': task['completed_at'].isoformat() if task['completed_at'] else None,
+            },
+            'stats': stats_json(stats),
+        }
+
+
+def stats_json(stats):
+    """The counters shown on the task list's stat cards."""
+    return {
+        'total': stats.total_count,
+        'active': stats.active_count,
+        'completed': stats.completed_count,
+        'pending': stats.pending_count,
+        'high_priority': stats.high_priority_count,
+        'overdue': stats.overdue_count,
+    }
+
+
+class OccurrenceMixin:
+    """
+    Views of one occurrence of a recurring task, by series and date.
+    
+    Occurrences that were stored as a Task are handed to the task views.
+    """
+    
+    def get_occurrence(self):
+        series = get_object_or_404(TaskSeries, pk=self.kwargs['pk'], user=self.request.user)
+        try:
+            day = date.fromisoformat(self.kwargs['day'])
+        except ValueError:
+            raise Http404('No occurrence found matching the query')
+        if not series.occurs_on(day):
+            raise Http404('No occurrence found matching the query')
+        return series, day
+    
+    def redirect_to_task(self, url_name):
+        """Look up the occurrence; redirect to url_name if it is stored as a task."""
+        self.series, self.occurrence_date = self.get_occurrence()
+        task = stored_occurrence(self.series, self.occurrence_date)
+        return None if task is None else redirect(url_name, task.pk)
+
+
+class OccurrenceToggleView(OccurrenceMixin, TaskToggleView):
+    """Complete a virtual occurrence, or toggle the task it was stored as."""
+    
+    def post(self, request, pk, day):
+        series, day = self.get_occurrence()
+        with transaction.atomic():
+            task, created = materialize(series, day, status='completed', completed_at=timezone.now())
+            if created:
+                task = {
+                    'pk': task.pk,
+                    'title': task.title,
+                    'status': task.status,
+                    'due_date': task.due_date,
+                    'completed_at': task.completed_at,
+                }
+            else:
+                task = Task.objects.filter(user=request.user).toggle_status(task.pk)
+        
+        if self.wants_json(request):
+            return JsonResponse(self.get_json_data(task, TaskStats.objects.for_user(request.user)))
+        return self.redirect_with_message(request, task)
+
+
+class OccurrenceUpdateView(LoginRequiredMixin, WriteTransactionMixin, OccurrenceMixin, CreateView):
+    """Edit a virtual occurrence, which stores it as a task."""
+    model = Task
+    form_class = TaskForm
+    template_name = 'tasks/task_form.html'
+    success_url = reverse_lazy('task-list')
+    
+    def get(self, request, *args, **kwargs):
+        return self.redirect_to_task('task-update') or super().get(request, *args, **kwargs)
+    
+    def post(self, request, *args, **kwargs):
+        return self.redirect_to_task('task-update') or super().post(request, *args, **kwargs)
+    
+    def get_initial(self):
+        return self.series.task_values(self.occurrence_date)
+    
+    def form_valid(self, form):
+        form.instance.user = self.request.user
+        form.instance.series = self.series
+        form.instance.occurrence_date = self.occurrence_date
+        messages.success(self.request, 'Task updated successfully!')
+        return super().form_valid(form)
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['form_title'] = f'Update Task ({self.occurrence_date:%b %d, %Y})'
+        context['button_text'] = 'Update Task'
+        return context
+
+
+class OccurrenceDeleteView(LoginRequiredMixin, WriteTransactionMixin, OccurrenceMixin, View):
+    """Skip a virtual occurrence, or delete its whole series."""
+    template_name = 'tasks/occurrence_confirm_delete.html'
+    
+    def get(self, request, pk, day):
+        redirect_response = self.redirect_to_task('task-delete')
+        if redirect_response is not None:
+            return redirect_response
+        occurrence = Occurrence(self.series, self.occurrence_date)
+        return render(request, self.template_name, {'task': occurrence})
+    
+    def post(self, request, pk, day):
+        series, day = self.get_occurrence()
+        if request.POST.get('scope') == 'series':
+            # Stored occurrences remain as ordinary tasks
+            series.delete()
+            messages.success(request, 'Recurring task deleted successfully!')
+        else:
+            skip_occurrences(series.pk, [day])
+            messages.success(request, f'Skipped "{series.title}" on {day:%b %d, %Y}.')
+        return redirect('task-list')
+
+
+class TaskExportView(LoginRequiredMixin, View):
+    """
+    Download the user's tasks as CSV or JSON.
+    
+    The list filters (status, priority, search) apply, and the file is
+    streamed from the database a chunk at a time. With ``archived=1`` the
+    archived tasks are exported instead.
+    """
+    
+    def get(self, request):
+        fmt = request.GET.get('format', 'csv')
+        if fmt not in FORMATS:
+            return HttpResponse('Unknown export format.', status=400, content_type='text/plain')
+        
+        if request.GET.get('archived'):
+            queryset = ArchivedTask.objects.filter(user=request.user)
+            if request.GET.get('search'):
+                queryset = search_archive(queryset, request.GET['search'])
+        else:
+            queryset = Task.objects.filter(user=request.user).filter_for_list(request.GET)
+        # Under ASGI the response is consumed on the event loop, so it needs
+        # an async iterator to avoid being buffered in full
+        stream = astream_export if settings.ASYNC_VIEWS else stream_export
+        response = StreamingHttpResponse(stream(queryset, fmt), content_type=FORMATS[fmt])
+        filename = f'tasks-{request.user.username}-{timezone.now().date().isoformat()}.{fmt}'
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class TaskImportView(LoginRequiredMixin, View):
+    """Create tasks from an uploaded CSV or JSON export."""
+    template_name = 'tasks/task_import.html'
+    
+    # Invalid rows listed in the flash message
+    REPORTED_ERRORS = 5
+    
+    def get(self, request):
+        return render(request, self.template_name, {'form': TaskImportForm()})
+    
+    def post(self, request):
+        form = TaskImportForm(request.POST, request.FILES)
+        if not form.is_valid():
+            return render(request, self.template_name, {'form': form})
+        
+        upload = form.cleaned_data['file']
+        try:
+            result = import_tasks(request.user, upload, form.cleaned_data['format'])
+        finally:
+            upload.close()
+        
+        if result['created']:
+            messages.success(request, f'Imported {result["created"]} tasks.')
+        if result['skipped']:
+            details = '; '.join(
+                f'row {number}: {" ".join(errors)}'
+                for number, errors in result['errors'][:self.REPORTED_ERRORS]
+            )
+            messages.warning(request, f'Skipped {result["skipped"]} invalid rows ({details}).')
+        if result['error']:
+            messages.error(request, f'Import stopped: {result["error"]}')
+        elif not result['created'] and not result['skipped']:
+            messages.info(request, 'The file did not contain any tasks.')
+        return redirect('task-list')
+
+
+class TaskSyncView(LoginRequiredMixin, View):
+    """
+    JSON feed of the tasks changed and deleted since a sync cursor.
+    
+    Clients pass back the returned cursor, and keep requesting while
+    has_more is true, to apply every change exactly once in order.
+    """
+    raise_exception = True
+    
+    def get(self, request):
+        try:
+            limit = min(max(int(request.GET.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except ValueError:
+            return JsonResponse({'error': 'limit must be an integer.'}, status=400)
+        
+        try:
+            changes = changes_since(request.user, request.GET.get('cursor'), limit)
+        except ExpiredSyncCursor:
+            # Tombstones may be gone; the client has to start over
+            return JsonResponse({'error': 'Cursor expired, sync again without a cursor.'}, status=410)
+        except InvalidSyncCursor:
+            return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+        return JsonResponse(changes)
+
+
+class MetricsView(View):
+    """Request metrics in Prometheus text format, for scrapers and staff."""
+    
+    def get(self, request):
+        if not settings.TASK_METRICS:
+            raise Http404('Metrics are disabled')
+        allowed = request.META.get('REMOTE_ADDR') in settings.TASK_METRICS_ALLOWED_IPS
+        if not (allowed or request.user.is_staff):
+            raise PermissionDenied
+        return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class HealthView(View):
+    """Check every configured database, for load balancers and container health checks."""
+    
+    def get(self, request):
+        databases = {}
+        for alias in connections:
+            try:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                databases[alias] = 'ok'
+            except DatabaseError as exc:
+                databases[alias] = f'error: {exc}'
+        healthy = all(state == 'ok' for state in databases.values())
+        response = JsonResponse({'status': 'ok' if healthy else 'error', 'databases': databases},
+                                status=200 if healthy else 503)
+        patch_cache_control(response, no_store=True)
+        return response
+
+
+# Async variants of the hot views, routed in place of the sync ones when the
+# project runs under ASGI (see todo_project/asgi.py). Queries use Django's
+# async ORM API; template rendering is moved off the event loop by Django.
+
+
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    """LoginRequiredMixin for views whose handlers are coroutines."""
+    
+    async def dispatch(self, request, *args, **kwargs):
+        # Resolve the lazy user once so that templates never query it from
+        # inside the event loop.
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return await super(LoginRequiredMixin, self).dispatch(request, *args, **kwargs)
+
+
+class AsyncConditionalTaskViewMixin(ConditionalTaskViewMixin):
+    """Async counterpart of ConditionalTaskViewMixin."""
+    
+    async def get(self, request, *args, **kwargs):
+        if not hasattr(self, 'task_stats'):
+            self.task_stats = await TaskStats.objects.afor_user(request.user)
+        etag = self.get_etag(self.task_stats)
+        last_modified = self.get_last_modified(self.task_stats)
+        
+        # Message storage may fall back to the session, which is sync-only
+        if await sync_to_async(self.has_pending_messages)():
+            response = await self.aget_response(request, *args, **kwargs)
+        else:
+            response = (
+                get_conditional_response(request, etag=etag, last_modified=last_modified) or
+                await sync_to_async(self.get_cached_response)(etag)
+            )
+            if response is None:
+                response = self.cache_rendered_page(await self.aget_response(request, *args, **kwargs), etag)
+        return self.add_validators(response, etag, last_modified)
+
+
+class AsyncHomeView(HomeView):
+    """Async home page view."""
+    
+    async def get(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        context = super(HomeView, self).get_context_data(**kwargs)
+        if request.user.is_authenticated:
+            context.update(self.get_stats_context(await TaskStats.objects.afor_user(request.user)))
+        return self.render_to_response(context)
+
+
+class AsyncTaskListView(AsyncLoginRequiredMixin, AsyncConditionalTaskViewMixin, TaskListView):
+    """Async list view for tasks."""
+    
+    async def aget_response(self, request, *args, **kwargs):
+        self.object_list = queryset = self.get_queryset()
+        page_size = self.get_paginate_by(queryset)
+        
+        if self.uses_cursor_pagination():
+            paginator = self.get_keyset_paginator(queryset, page_size)
+            page_queryset, direction, had_cursor = paginator.page_queryset(request.GET.get('cursor'))
+            rows = [task async for task in page_queryset]
+            page = paginator.build_page(rows, direction, had_cursor)
+            tasks, is_paginated = page.object_list, page.has_other_pages()
+        else:
+            paginator, page, tasks, is_paginated = await sync_to_async(self.fetch_page)(queryset, page_size)
+        
+        context = {
+            'view': self,
+            'paginator': paginator,
+            'page_obj': page,
+            'is_paginated': is_paginated,
+            'object_list': tasks,
+            self.context_object_name: tasks,
+        }
+        context.update(self.get_list_context())
+        context['occurrences'] = await sync_to_async(self.get_occurrences)()
+        return self.render_to_response(context)
+    
+    def fetch_page(self, queryset, page_size):
+        """Paginate and evaluate the page in one trip to a worker thread."""
+        paginator, page, tasks, is_paginated = self.paginate_queryset(queryset, page_size)
+        page.object_list = tasks = list(tasks)
+        return paginator, page, tasks, is_paginated
+
+
+class AsyncTaskDetailView(AsyncLoginRequiredMixin, AsyncConditionalTaskViewMixin, TaskDetailView):
+    """Async detail view for a single task."""
+    
+    async def aget_response(self, request, *args, **kwargs):
+        try:
+            self.object = await self.get_queryset().aget(pk=self.kwargs['pk'])
+        except Task.DoesNotExist:
+            raise Http404('No task found matching the query')
+        return self.render_to_response(self.get_context_data(object=self.object))
+
+
+class AsyncTaskToggleView(AsyncLoginRequiredMixin, TaskToggleView):
+    """Async toggle of task completion status."""
+    
+    async def post(self, request, pk):
+        task = await Task.objects.filter(user=request.user).atoggle_status(pk)
+        if task is None:
+            raise Http404('No task found matching the query')
+        
+        if self.wants_json(request):
+            stats = await TaskStats.objects.afor_user(request.user)
+            return JsonResponse(self.get_json_data(task, stats))
+        return self.redirect_with_message(request, task)
+
+
+class TaskEventStreamView(AsyncLoginRequiredMixin, View):
+    """
+    Server-sent events that keep the user's open task lists up to date.
+    
+    Each stream starts with a ``ready`` event carrying the counters'
+    version: a page rendered from an older version has missed writes and
+    reloads. Every task event then carries the counters, and the task card
+    rendered afresh unless the task was deleted (see events.py).
+    
+    A stream holds its connection for as long as the page is open, which
+    only the event loop under ASGI can afford; under WSGI the view answers
+    204, which tells EventSource not to reconnect.
+    """
+    raise_exception = True
+    
+    async def get(self, request):
+        if not settings.ASYNC_VIEWS:
+            return HttpResponse(status=204)
+        response = StreamingHttpResponse(self.stream(request), content_type='text/event-stream')
+        patch_cache_control(response, no_cache=True)
+        # Proxies such as nginx would otherwise buffer the stream
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    
+    async def stream(self, request):
+        # Subscribe first, so that no write falls between the version and the events
+        subscription = get_broker().subscribe(request.user.pk)
+        try:
+            stats = await TaskStats.objects.afor_user(request.user)
+            yield format_event('ready', {'version': stats.version, 'stats': stats_json(stats)})
+            while True:
+                try:
+                    event = await subscription.get(settings.TASK_EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Keeps idle connections open through proxies
+                    yield ': keep-alive\n\n'
+                    continue
+                data = await self.get_event_data(request, event)
+                if data is not None:
+                    yield format_event(event['type'], data)
+        finally:
+            subscription.close()
+    
+    async def get_event_data(self, request, event):
+        """The counters and, for a task that still exists, its card."""
+        data = {}
+        if event['type'] in ('created', 'updated', 'toggled'):
+            task = await Task.objects.filter(user=request.user, pk=event['id']).defer('description').afirst()
+            if task is None:
+                # Deleted since; its own event follows
+                return None
+            data['html'] = await sync_to_async(render_to_string)(
+                'tasks/task_card.html', {'task': task}, request=request
+            )
+            if task.series_id is not None:
+                # Replaces the card of the occurrence while it was virtual
+                data['occurrence'] = f'{task.series_id}:{task.occurrence_date.isoformat()}'
+        if 'id' in event:
+            data['id'] = event['id']
+        stats = await TaskStats.objects.afor_user(request.user)
+        data.update(version=stats.version, stats=stats_json(stats))
+        return data
@@ -1,5 +1,13 @@
 """
 ASGI config for todo_project.
+
+Serves the async task views and the live task event stream. Run it with
+Uvicorn workers under Gunicorn:
+
+    gunicorn todo_project.asgi:application -k uvicorn.workers.UvicornWorker
+
+With more than one worker, set TASK_EVENTS_BROKER=redis so that events
+reach the streams of every worker.
 """
 
 import os
@@ -7,5 +15,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo_project.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
@@ -0,0 +1,47 @@
+"""
+SQLite backend with per-connection setup and a configurable transaction mode.
+
+Two OPTIONS are understood on top of Django's backend:
+
+* ``init_command``: SQL run on every new connection, e.g. PRAGMA statements.
+* ``transaction_mode``: ``DEFERRED`` (SQLite's default), ``IMMEDIATE`` or
+  ``EXCLUSIVE``, used for the BEGIN that opens every ``atomic()`` block.
+
+A deferred transaction takes the write lock at its first write. If another
+connection has written since the transaction's first read, the lock cannot
+be upgraded, and SQLite fails at once with "database is locked" without
+waiting for the busy timeout. IMMEDIATE takes the lock at BEGIN instead,
+so writers queue on the busy timeout.
+
+Django 5.1 adds both options to its own backend under the same names;
+after upgrading, the ENGINE can go back to django.db.backends.sqlite3.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # Not arguments of sqlite3.connect()
+        params.pop('init_command', None)
+        mode = params.pop('transaction_mode', None)
+        if mode is not None and mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'transaction_mode must be one of {", ".join(TRANSACTION_MODES)}, not {mode!r}.'
+            )
+        return params
+    
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        init_command = self.settings_dict['OPTIONS'].get('init_command')
+        if init_command:
+            conn.executescript(init_command)
+        return conn
+    
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        self.cursor().execute(f'BEGIN {mode.upper()}' if mode else 'BEGIN')